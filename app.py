@@ -1,23 +1,30 @@
+import hashlib
 import os
-import yaml
 import threading
-from flask import Flask, render_template, request, redirect, url_for, jsonify, send_from_directory
+from datetime import datetime, timezone
+from flask import Flask, Response, render_template, request, redirect, url_for, jsonify, send_from_directory, send_file
 from waitress import serve
 from loguru import logger
-from automation_task import execute_automation
-from link_opener import open_links_from_file
-import asyncio
+from utils.metrics import metrics
+from utils.result_writer import is_result_file
+from utils.job_manager import JobManager, JobRejected
+from utils.job_store import JobStore
+from utils.event_bus import event_bus, sse_stream, DirectoryWatcher
+from utils.config_store import ConfigStore
+from utils.dir_index import DirectoryIndex, parse_time
+from utils.thumbnails import ThumbnailCache, thumbnail_width
+from utils.upload_store import UploadStore
+from jobs import CONFIG_FILE, run_automation_job, run_link_opener_job, init_worker
 
 # --- Configuration ---
-CONFIG_FILE = 'config.yaml'
 IMAGE_FOLDER = 'uploads'
-
-# --- In-memory state ---
-# For a real application, you might use a database or a more robust solution
-task_state = {
-    "status": "idle", # idle, running, completed, failed
-    "results": []
-}
+LINKS_FOLDER = 'shared_links'
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif')
+# Every open /api/events stream holds one server thread until the client goes away. Streams beyond
+# MAX_EVENT_STREAMS are refused with 503 (the UI falls back to polling), so the rest of the pool stays free for requests
+MAX_EVENT_STREAMS = 8
+SERVER_THREADS = MAX_EVENT_STREAMS + 8
+event_stream_slots = threading.BoundedSemaphore(MAX_EVENT_STREAMS)
 
 app = Flask(__name__, static_url_path='/static', static_folder='static')
 app.config['IMAGE_FOLDER'] = IMAGE_FOLDER
@@ -27,58 +34,141 @@ if not os.path.exists(IMAGE_FOLDER):
     os.makedirs(IMAGE_FOLDER)
     logger.info(f"Created missing image folder: {IMAGE_FOLDER}")
 
+# Parsed config.yaml, cached until the file changes; saves are locked and atomic
+config_store = ConfigStore.for_path(CONFIG_FILE)
+
 # --- Helper Functions ---
 def load_config():
-    """Loads the YAML configuration file."""
-    with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
-
-def save_config(config_data):
-    """Saves the configuration data to the YAML file."""
-    with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-        yaml.dump(config_data, f, allow_unicode=True)
-
-# --- Link Opener Task ---
-def run_link_opener_task_wrapper(filename, config):
-    """Wrapper to run the link opener task with a specific file and configuration."""
-    logger.info(f"Starting link opener task for file: {filename}...")
+    """Returns a read-only snapshot of the configuration (use config_store.copy() for a mutable one)."""
+    return config_store.get()
+
+# Cached folder listings: a folder is only rescanned when its mtime changes.
+# A running job appends to its result file in place, so result files modified in the last day are also re-stated
+# on every check (otherwise /api/link_files would keep answering 304 with the ETag from before the new links)
+image_index = DirectoryIndex(IMAGE_FOLDER, accept=lambda name: name.lower().endswith(IMAGE_EXTENSIONS))
+result_index = DirectoryIndex(LINKS_FOLDER, accept=is_result_file, restat=24 * 3600)
+
+def list_image_files():
+    """Image files in the upload folder, by name."""
+    return image_index.names(order='name')
+
+def list_result_files():
+    """Per-run result files (collected_links_*.jsonl/.txt) and legacy links-*.txt, newest first."""
+    return result_index.names()
+
+def listing_response(index, default_order):
+    """
+    Serves a folder index as a JSON array of file names.
+    Supports ?prefix=, ?since=/&until= (ISO date/time or Unix timestamp), ?offset=/&limit= and ?order=name|mtime;
+    the total before paging is sent in X-Total-Count. Conditional requests get 304 while the folder is unchanged.
+    """
+    args = request.args
     try:
-        # We run the async function in a new event loop
-        asyncio.run(open_links_from_file(filename, config))
-        logger.success(f"Link opener task for {filename} finished.")
-    except Exception as e:
-        logger.error(f"Link opener task for {filename} failed in wrapper: {e}")
-
-# --- Automation Task ---
-def run_automation_task_wrapper(pc_image_path):
-    """Wrapper to run the task and update state."""
-    global task_state
-    task_state['status'] = 'running'
-    task_state['results'] = []
-    logger.info("Starting automation task...")
-    
+        since, until = parse_time(args.get('since')), parse_time(args.get('until'))
+        offset = max(int(args.get('offset', 0)), 0)
+        limit = int(args['limit']) if args.get('limit') else None
+    except ValueError:
+        return jsonify({"error": "Invalid filter or paging parameter."}), 400
+    total, names = index.query(prefix=args.get('prefix'), since=since, until=until, offset=offset, limit=limit,
+                               order=args.get('order', default_order))
+
+    response = jsonify(names)
+    response.headers['X-Total-Count'] = str(total)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.set_etag(f"{index.etag}-{hashlib.sha1(request.query_string).hexdigest()[:8]}")
+    if index.last_modified:
+        response.last_modified = datetime.fromtimestamp(index.last_modified, timezone.utc)
+    return response.make_conditional(request)
+
+# Automation backends (Appium, Playwright) are imported on first use, so the web UI starts without them;
+# the `backends` section of config.yaml can point a backend at another module (worker processes do the same)
+init_worker()
+
+# --- Job Manager ---
+# Each job type gets its own bounded worker pool; submissions beyond workers + queue are rejected.
+# The automation job owns the Appium device(s), so by default only one runs at a time.
+# Jobs live in a SQLite queue (jobs.db_path), so queued work and results survive a server restart
+# and jobs interrupted by the restart are re-queued (up to jobs.max_attempts runs).
+# With jobs.isolation 'process' (the default) each worker runs its jobs in a supervised child process:
+# a job exceeding `timeout` seconds or `max_memory_mb` is killed along with its browser/driver processes,
+# and a worker is recycled after `max_jobs` jobs. The link opener keeps its browser open until the user
+# closes it, so it has no time limit by default.
+JOB_LIMITS = {
+    'automation': {'workers': 1, 'queue': 100, 'timeout': 4 * 3600, 'max_memory_mb': 2048, 'max_jobs': 50},
+    'link_opener': {'workers': 2, 'queue': 4, 'timeout': None, 'max_memory_mb': None, 'max_jobs': 20},
+}
+
+def create_job_manager():
+    """Registers the job types with the limits from the `jobs` section of config.yaml."""
     try:
         config = load_config()
-        # Dynamically set the pc_image_path for this run
-        # config['task']['pc_image_path'] = pc_image_path
-        
-        results = execute_automation(config)
-        if results is None: # Check for failure signal
-             task_state['status'] = 'failed'
-             logger.error("Automation task failed. Please check logs for details.")
-        else:
-            task_state['results'] = results
-            task_state['status'] = 'completed'
-            logger.success("Automation task finished successfully.")
     except Exception as e:
-        task_state['status'] = 'failed'
-        logger.error(f"Automation task failed in wrapper: {e}")
+        logger.warning(f"Could not read job settings from {CONFIG_FILE}, using defaults: {e}")
+        config = {}
+    options = config.get('jobs') or {}
+    manager = JobManager(JobStore.from_config(config), max_attempts=options.get('max_attempts', 3))
+    isolated = options.get('isolation', 'process') == 'process'
+    for job_type, func in (('automation', run_automation_job), ('link_opener', run_link_opener_job)):
+        limits = dict(JOB_LIMITS[job_type], **(options.get(job_type) or {}))
+        process = None
+        if isolated:
+            process = {'timeout': limits['timeout'], 'max_memory_mb': limits['max_memory_mb'],
+                       'max_jobs': limits['max_jobs'], 'initializer': 'jobs:init_worker'}
+        manager.register(job_type, func, workers=limits['workers'], max_queued=limits['queue'], process=process)
+    return manager
+
+job_manager = create_job_manager()
+
+# One stat per folder every couple of seconds feeds the `images`/`link_files` events for all clients
+directory_watcher = DirectoryWatcher(event_bus)
+
+def watch_index(index, event_type, order):
+    def lister():
+        # The watcher has just seen the change; don't let the index skip it as a recent check
+        index.refresh(force=True)
+        return index.names(order)
+    directory_watcher.watch(index.path, event_type, lister)
+
+watch_index(image_index, 'images', 'name')
+watch_index(result_index, 'link_files', 'mtime')
+directory_watcher.start()
+
+# Resized copies of the uploads for the UI; new or changed images get their preview-size thumbnail in the background
+THUMBNAIL_WIDTH = 300
+THUMBNAIL_MAX_AGE = 365 * 24 * 3600
+thumbnails = ThumbnailCache.from_config(load_config(), IMAGE_FOLDER)
+event_bus.subscribe(['images'], callback=lambda event: thumbnails.prefetch(event['data'], THUMBNAIL_WIDTH))
+
+# Uploaded images are streamed to disk and deduplicated by content hash
+upload_store = UploadStore.from_config(load_config(), IMAGE_FOLDER)
+
+def automation_params(data):
+    """Builds automation job parameters from a request body, resolving image names against the upload folder."""
+    params = {}
+    selected_image = data.get('pc_image_path')
+    if selected_image:
+        # Construct the full, absolute path for the image
+        params['pc_image_path'] = os.path.abspath(os.path.join(app.config['IMAGE_FOLDER'], selected_image))
+    # Several images run as a batch (one session), sharded across the device pool when there is one
+    if data.get('pc_image_paths'):
+        params['pc_image_paths'] = [
+            os.path.abspath(os.path.join(app.config['IMAGE_FOLDER'], name)) for name in data['pc_image_paths']
+        ]
+    return params
+
+def automation_state():
+    """Status and results of the most recent automation job, in the shape /status always returned."""
+    job = job_manager.latest('automation')
+    if job is None:
+        return {"status": "idle", "results": [], "job_id": None}
+    return {"status": job.status, "results": job.results or [], "job_id": job.id, "progress": job.progress}
 
 # --- Routes ---
 @app.route('/', methods=['GET'])
 def index():
     """Main page to display configuration and list of link files."""
-    config = load_config()
+    # The template gets its own view of the shared snapshot, which must not be modified
+    config = dict(load_config())
     
     # Ensure web_automation key exists with default values to prevent Jinja errors
     if 'web_automation' not in config:
@@ -92,19 +182,14 @@ def index():
 
     # Ensure the image path uses forward slashes for JavaScript compatibility
     if config.get('task', {}).get('pc_image_path'):
-        config['task']['pc_image_path'] = config['task']['pc_image_path'].replace('\\', '/')
+        config['task'] = dict(config['task'], pc_image_path=config['task']['pc_image_path'].replace('\\', '/'))
 
-    # List and sort link files
-    links_dir = 'shared_links'
+    # List link files, newest first
     link_files = []
-    if os.path.exists(links_dir):
-        try:
-            # Get all .txt files and sort them descending by name (which includes the timestamp)
-            files = [f for f in os.listdir(links_dir) if f.startswith('links-') and f.endswith('.txt')]
-            files.sort(reverse=True)
-            link_files = files
-        except Exception as e:
-            logger.error(f"Error reading or sorting link files: {e}")
+    try:
+        link_files = list_result_files()
+    except Exception as e:
+        logger.error(f"Error reading or sorting link files: {e}")
 
     return render_template('index.html', config=config, link_files=link_files)
 
@@ -118,123 +203,202 @@ def list_images():
         return jsonify([])
 
     try:
-        files = [f for f in os.listdir(image_folder) if os.path.isfile(os.path.join(image_folder, f))]
-        # Filter for common image extensions
-        image_files = [f for f in files if f.lower().endswith(('.png', '.jpg', '.jpeg', '.gif'))]
-        return jsonify(image_files)
+        return listing_response(image_index, 'name')
     except Exception as e:
         logger.error(f"Error reading image folder '{image_folder}': {e}")
         return jsonify({"error": "Could not read image directory"}), 500
 
 @app.route('/start', methods=['POST'])
 def start_task():
-    """Starts the automation task in a background thread."""
-    global task_state
-    if task_state['status'] == 'running':
-        return jsonify({"status": "error", "message": "Task is already running."}), 400
-
-    # Get the selected image from the request
-    image_path=None
-    selected_image = request.json.get('pc_image_path')
-    if not selected_image:
-        # Construct the full, absolute path for the image
-        image_path = os.path.abspath(os.path.join(app.config['IMAGE_FOLDER'], selected_image))
-        logger.info(f"Received request to start automation task with image: {image_path}")
-    
-    # Pass the dynamic image path to the task wrapper
-    task_thread = threading.Thread(target=run_automation_task_wrapper, args=(image_path,))
-    task_thread.start()
-    
-    return jsonify({"status": "success", "message": "Automation task started in the background."})
+    """Submits an automation job."""
+    params = automation_params(request.json or {})
+    logger.info(f"Received request to start automation task: {params}")
+    try:
+        job = job_manager.submit('automation', **params)
+    except JobRejected as e:
+        return jsonify({"status": "error", "message": str(e)}), 429
+    return jsonify({"status": "success", "message": "Automation task started in the background.", "job_id": job.id})
+
+@app.route('/api/uploads', methods=['POST'])
+def upload_images():
+    """
+    Bulk image upload (multipart/form-data, any number of files). Files are streamed to disk in chunks and hashed
+    while they are written; exact duplicates of an existing image are not stored again and report its name instead.
+    Returns per-file results and `stored`, the image names in upload order, ready for pc_image_paths.
+    With ?start=1 a batch automation job is submitted for them.
+    """
+    boundary = request.mimetype_params.get('boundary')
+    if request.mimetype != 'multipart/form-data' or not boundary:
+        return jsonify({"status": "error", "message": "Expected a multipart/form-data body."}), 400
+    try:
+        files = upload_store.receive_multipart(request.stream, boundary)
+    except Exception as e:
+        logger.error(f"Error receiving upload: {e}")
+        return jsonify({"status": "error", "message": "Malformed or interrupted upload."}), 400
+
+    stored = list(dict.fromkeys(f['stored'] for f in files if f['stored']))
+    body = {"status": "success", "files": files, "stored": stored}
+    if request.args.get('start') in ('1', 'true') and stored:
+        try:
+            job = job_manager.submit('automation', **automation_params({'pc_image_paths': stored}))
+            body['job_id'] = job.id
+        except JobRejected as e:
+            body.update(status="error", message=str(e))
+            return jsonify(body), 429
+    return jsonify(body), 201 if any(f['status'] == 'stored' for f in files) else 200
 
 @app.route('/save_task_config', methods=['POST'])
 def save_task_config():
     """Saves the task-related configuration."""
-    config = load_config()
-    
-    config['task']['max_products_to_process'] = int(request.form['max_products_to_process'])
+    def apply(config):
+        config['task']['max_products_to_process'] = int(request.form['max_products_to_process'])
     
     # The pc_image_path is no longer saved to config
     # It's now provided dynamically when the task starts
     
-    save_config(config)
+    config_store.update(apply)
     logger.success("Task configuration saved.")
     return jsonify({"status": "success", "message": "APP自动化任务已保存。"})
 
 @app.route('/save_web_config', methods=['POST'])
 def save_web_config():
     """Saves the web automation configuration."""
-    config = load_config()
+    def apply(config):
+        if 'web_automation' not in config:
+            config['web_automation'] = {}
+            
+        config['web_automation']['proxy_server'] = request.form['proxy_server']
+        config['web_automation']['miaoshou_url'] = request.form['miaoshou_url']
+        config['web_automation']['miaoshou_username'] = request.form['miaoshou_username']
+        config['web_automation']['miaoshou_password'] = request.form['miaoshou_password']
+        config['web_automation']['extension_path'] = request.form['extension_path']
     
-    if 'web_automation' not in config:
-        config['web_automation'] = {}
-        
-    config['web_automation']['proxy_server'] = request.form['proxy_server']
-    config['web_automation']['miaoshou_url'] = request.form['miaoshou_url']
-    config['web_automation']['miaoshou_username'] = request.form['miaoshou_username']
-    config['web_automation']['miaoshou_password'] = request.form['miaoshou_password']
-    config['web_automation']['extension_path'] = request.form['extension_path']
-    
-    save_config(config)
+    config_store.update(apply)
     logger.success("Web automation configuration saved.")
     return jsonify({"status": "success", "message": "Web自动化配置已保存。"})
 
 @app.route('/save_mobile_config', methods=['POST'])
 def save_mobile_config():
     """Saves the mobile device configuration."""
-    config = load_config()
+    def apply(config):
+        config['device']['platform_version'] = request.form['platform_version']
+        config['device']['device_name'] = request.form['device_name']
+        config['tiktok']['app_package'] = request.form['tiktok_app_package']
+        config['tiktok']['app_activity'] = request.form['tiktok_app_activity']
     
-    config['device']['platform_version'] = request.form['platform_version']
-    config['device']['device_name'] = request.form['device_name']
-    config['tiktok']['app_package'] = request.form['tiktok_app_package']
-    config['tiktok']['app_activity'] = request.form['tiktok_app_activity']
-    
-    save_config(config)
+    config_store.update(apply)
     logger.success("Mobile configuration saved.")
     return jsonify({"status": "success", "message": "APP自动化配置已保存。"})
 
 @app.route('/api/link_files')
 def list_link_files():
     """API endpoint to list collected link files."""
-    links_dir = 'shared_links'
     try:
-        if not os.path.exists(links_dir):
-            return jsonify([])
-        
-        # Get all .txt files starting with links- and sort them descending by name
-        files = [f for f in os.listdir(links_dir) if f.startswith('links-') and f.endswith('.txt')]
-        files.sort(reverse=True)
-        
-        return jsonify(files)
+        return listing_response(result_index, 'mtime')
     except Exception as e:
         logger.error(f"Error reading link files directory: {e}")
         return jsonify({"error": "Could not read directory"}), 500
 
 @app.route('/open_links', methods=['POST'])
 def start_link_opener():
-    """Starts the link opener task in a background thread."""
+    """Submits a link opener job."""
     data = request.get_json()
     filename = data.get('filename')
     if not filename:
         return jsonify({"status": "error", "message": "No filename provided."}), 400
 
-    config = load_config()
-    web_config = config.get('web_automation', {})
-
     logger.info(f"Received request to open links from file: {filename}")
-    task_thread = threading.Thread(target=run_link_opener_task_wrapper, args=(filename, web_config))
-    task_thread.start()
-    return jsonify({"status": "success", "message": f"正在后台打开文件 '{filename}' 中的链接..."})
+    try:
+        job = job_manager.submit('link_opener', filename=filename)
+    except JobRejected as e:
+        return jsonify({"status": "error", "message": str(e)}), 429
+    return jsonify({"status": "success", "message": f"正在后台打开文件 '{filename}' 中的链接...", "job_id": job.id})
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Submits a job: {"type": "automation", "pc_image_path"/"pc_image_paths": ...} or {"type": "link_opener", "filename": ...}."""
+    data = request.get_json() or {}
+    job_type = data.get('type')
+    if job_type == 'automation':
+        params = automation_params(data)
+    elif job_type == 'link_opener' and data.get('filename'):
+        params = {'filename': data['filename']}
+    else:
+        return jsonify({"status": "error", "message": "Unknown job type or missing parameters."}), 400
+    try:
+        job = job_manager.submit(job_type, **params)
+    except JobRejected as e:
+        return jsonify({"status": "error", "message": str(e)}), 429
+    return jsonify(job.to_dict()), 202
+
+@app.route('/api/jobs')
+def list_jobs():
+    """Lists jobs, newest first, optionally filtered by ?type= and ?status=."""
+    jobs = job_manager.list(request.args.get('type'), request.args.get('status'))
+    return jsonify([job.to_dict() for job in jobs])
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """Returns the status, progress and results of one job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Job not found."}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancels a queued job, or a running one by killing its worker process."""
+    if job_manager.get(job_id) is None:
+        return jsonify({"status": "error", "message": "Job not found."}), 404
+    if not job_manager.cancel(job_id):
+        return jsonify({"status": "error", "message": "Job is not queued or running in a worker process."}), 409
+    return jsonify({"status": "success", "message": "Job cancelled."}), 202
 
 @app.route('/status')
 def status():
     """Returns the current status of the automation task."""
-    return jsonify(task_state)
+    return jsonify(automation_state())
 
 @app.route('/results')
 def results():
     """Displays the collected links."""
-    return render_template('results.html', results=task_state['results'], status=task_state['status'])
+    state = automation_state()
+    return render_template('results.html', results=state['results'], status=state['status'])
+
+@app.route('/api/events')
+def events():
+    """
+    Server-Sent Events stream replacing the UI's polling: `job` (state changes and per-product progress),
+    `images` and `link_files` (new listings when the folders change). ?types=job,images limits the stream.
+    The current listings and the latest automation job are sent first.
+    At most MAX_EVENT_STREAMS streams are open at a time; further clients get 503 and should poll instead.
+    """
+    if not event_stream_slots.acquire(blocking=False):
+        logger.warning(f"Refusing event stream: {MAX_EVENT_STREAMS} streams already open")
+        return Response("Too many open event streams.", status=503, headers={'Retry-After': '30'})
+    try:
+        types = [t for t in request.args.get('types', '').split(',') if t] or ['job', 'images', 'link_files']
+        initial = []
+        if 'images' in types:
+            initial.append({'id': None, 'type': 'images', 'data': list_image_files()})
+        if 'link_files' in types:
+            initial.append({'id': None, 'type': 'link_files', 'data': list_result_files()})
+        latest = job_manager.latest('automation')
+        if 'job' in types and latest is not None:
+            initial.append({'id': None, 'type': 'job', 'data': latest.to_dict()})
+        response = Response(sse_stream(event_bus, types, initial_events=initial), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    except Exception:
+        event_stream_slots.release()
+        raise
+    # Called when the client disconnects (or the server shuts the stream down), even if the body was never read
+    response.call_on_close(event_stream_slots.release)
+    return response
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Exposes span timings (device round trips, waits, sleeps, navigation, shares) in Prometheus text format."""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
@@ -246,7 +410,42 @@ def uploaded_file(filename):
         logger.error(f"Error serving file {filename}: {e}")
         return "File not found", 404
 
+@app.route('/api/thumbnails')
+def thumbnail_versions():
+    """Current thumbnail version of every uploaded image ({name: version}), for the cacheable ?v= preview URLs."""
+    response = jsonify({name: thumbnails.version(name) for name in list_image_files()})
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/thumbnails/<filename>')
+def thumbnail(filename):
+    """
+    Serves a thumbnail of an uploaded image (?w= width, rounded up to a preset size), with ETag and Range support.
+    URLs carrying the image's current version (?v=) never change content and are cached for a year.
+    """
+    if os.path.basename(filename) != filename:
+        return "File not found", 404
+    try:
+        width = thumbnail_width(int(request.args.get('w', THUMBNAIL_WIDTH)))
+    except ValueError:
+        return "Invalid width", 400
+    try:
+        path, version = thumbnails.get(filename, width)
+    except Exception as e:
+        logger.error(f"Error creating thumbnail for {filename}: {e}")
+        return "Could not create thumbnail", 500
+    if path is None:
+        return "File not found", 404
+
+    response = send_file(path, mimetype=thumbnails.mimetype, conditional=True)
+    if request.args.get('v') == version:
+        response.headers['Cache-Control'] = f'public, max-age={THUMBNAIL_MAX_AGE}, immutable'
+    else:
+        response.headers['Cache-Control'] = 'public, no-cache'
+    response.headers['X-Thumbnail-Version'] = version
+    return response
+
 # --- Main Entry Point ---
 if __name__ == '__main__':
     logger.info("Starting web server...")
-    serve(app, host='0.0.0.0', port=8080)
+    serve(app, host='0.0.0.0', port=8080, threads=SERVER_THREADS)
@@ -1,11 +1,15 @@
+import os
 import time
 from loguru import logger
 from appium.webdriver.common.appiumby import AppiumBy
 from datetime import datetime
 
 from pages.tiktok_page import TikTokPage
-from utils.driver_manager import DriverManager
+from utils.session_manager import session_manager
+from utils.locator_registry import locator_registry
 from utils.share_service import ShareService
+from utils.checkpoint import RunCheckpoint
+from utils.product_index import ProductIndex
 
 def _collect_and_share_links_logic(driver, driver_manager, tiktok_page, share_service, config):
     """Helper function containing the core link collection logic."""
@@ -35,9 +39,9 @@ def _collect_and_share_links_logic(driver, driver_manager, tiktok_page, share_se
                 processed_element_uids.add(uid)
                 
                 if tiktok_page.enter_product_detail(product):
-                    if tiktok_page.share_product_link():
-                        link = driver.get_clipboard_text()
-                        if link and link.startswith('http'):
+                    link = tiktok_page.share_product_link()
+                    if link:
+                        if link.startswith('http'):
                             logger.info(f"成功获取到链接: {link}")
                             if share_service.share_link(link):
                                 shared_links.append(link)
@@ -67,75 +71,204 @@ def _collect_and_share_links_logic(driver, driver_manager, tiktok_page, share_se
         
     return shared_links
 
-def execute_automation(config):
+def execute_automation(config, device=None, checkpoint_path=None):
     """
     Main function to execute the full automation process.
-    Takes a config dictionary as input.
+    Takes a config dictionary as input, and optionally a device entry from the device pool.
     Returns a list of shared links.
+    Collection progress is checkpointed; if the Appium session dies mid-run (e.g. UiAutomator2 crashed),
+    the session is rebuilt, the same search is repeated and collection continues from the checkpoint
+    instead of starting over, up to task.max_resumes times.
+    When checkpoint_path points at the checkpoint of an interrupted run (e.g. a job re-queued after a
+    server restart), that run is continued, appending to its result file.
     """
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        checkpoint = RunCheckpoint.load(checkpoint_path)
+        output_filename = checkpoint.output_filename
+        logger.info(f"从检查点继续上次中断的采集任务: {checkpoint_path} (已分享 {len(checkpoint.links)} 个链接)")
+    else:
+        # Generate a unique filename with a timestamp for the current task
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        output_filename = f"collected_links_{timestamp}.txt"
+        checkpoint = RunCheckpoint.create(config, output_filename, path=checkpoint_path)
+    logger.info(f"本次采集任务将保存到文件: {output_filename}")
+    max_resumes = config['task'].get('max_resumes', 2)
+    share_service = None
+
+    # One dedupe index per run, shared by every resume of it
+    product_index = ProductIndex.from_config(config)
+    try:
+        while True:
+            driver_manager = None
+            try:
+                # Reuse the device's warm Appium session; a new one is only created when it is dead
+                driver_manager = session_manager.acquire(config, device)
+                if not driver_manager:
+                    raise Exception("Failed to initialize driver")
+
+                # Initialize page objects and services
+                tiktok_page = TikTokPage(driver_manager)
+
+                # Setup environment
+                if not tiktok_page.reset_to_home(config['tiktok']['app_package'], warm=driver_manager.reused):
+                    logger.warning("未能确认TikTok首页已加载，继续尝试执行任务")
+
+                if share_service is None:
+                    share_service = ShareService(driver_manager, config, output_filename=output_filename)
+                else:
+                    # Links buffered for a batched share survive a session rebuild
+                    share_service.attach(driver_manager)
+            
+                # --- Start Process ---
+                logger.info("=== 步骤1: 进入TikTok商城 ===")
+                if not tiktok_page.open_tiktok_shop():
+                    raise Exception("进入TikTok商城失败")
+
+                logger.info("=== (可选) 步骤2: 从PC传输图片到设备 ===")
+                pc_image_path = config['task'].get('pc_image_path')
+                # 检查路径是否有效且不是默认占位符
+                if pc_image_path and pc_image_path.strip():
+                    logger.info(f"检测到PC端图片路径 '{pc_image_path}'，开始传输...")
+                    if not tiktok_page.fetch_image_from_pc(pc_image_path):
+                        # 如果提供了路径但传输失败，则应视为严重错误
+                        raise Exception(f"从PC传输图片失败: {pc_image_path}")
+                else:
+                    logger.info("未提供有效的PC端图片路径，跳过传输步骤。")
+            
+                logger.info("=== 步骤3: 开始图像搜索 ===")
+                if not tiktok_page.start_image_search():
+                    raise Exception("图像搜索失败")
+            
+                logger.info("=== 步骤4: 收集并分享商品链接 ===")
+                shared_links = tiktok_page.collect_and_share_links(share_service, config, product_index=product_index,
+                                                                   checkpoint=checkpoint)
+                # Deliver whatever a batched share target is still holding
+                share_service.close()
+                tiktok_page.waiter.log_summary()
+            
+                logger.info("=== 步骤5: 验证结果 ===")
+                if not shared_links:
+                    logger.warning("未能成功分享任何链接。")
+                else:
+                    logger.success(f"成功分享了 {len(shared_links)} 个链接。")
+            
+                checkpoint.discard()
+                return shared_links
+
+            except Exception as e:
+                # A failure with a dead session is a crash, not a problem with the flow itself: resume it
+                session_lost = driver_manager is not None and not driver_manager.is_alive()
+                if session_lost and checkpoint.resumes < max_resumes:
+                    checkpoint.resumes += 1
+                    checkpoint.save()
+                    logger.warning(f"Appium会话已失效 ({e})，重建会话并从检查点继续 "
+                                   f"(第 {checkpoint.resumes}/{max_resumes} 次): 已分享 {len(checkpoint.links)} 个链接, "
+                                   f"已滑动 {checkpoint.scroll_depth} 次")
+                    session_manager.release(driver_manager, discard=True)
+                    driver_manager = None
+                    continue
+
+                logger.error(f"自动化任务执行期间发生意外错误: {e}")
+                # Only take a screenshot if the driver was successfully initialized
+                if driver_manager and driver_manager.driver and not session_lost:
+                    driver_manager.take_screenshot("task_error.png")
+                if share_service:
+                    # Keep what was already collected: flush buffered links and close the result file
+                    share_service.close()
+                checkpoint.finish('failed')
+                logger.info(f"任务进度已保存在检查点: {checkpoint.path}")
+                return None # Return None on failure
+            finally:
+                locator_registry.save()
+                if driver_manager:
+                    # Keep the session warm for the next run unless reuse is disabled
+                    session_manager.release(driver_manager, discard=not config['appium'].get('reuse_session', True))
+    finally:
+        if product_index is not None:
+            product_index.close()
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif')
+
+def resolve_image_paths(source):
+    """
+    Expands the batch source into a list of image paths.
+    Accepts a directory (all images in it, sorted by name) or a list of paths.
+    """
+    if isinstance(source, str):
+        if os.path.isdir(source):
+            return [os.path.join(source, name) for name in sorted(os.listdir(source))
+                    if name.lower().endswith(IMAGE_EXTENSIONS)]
+        return [source]
+    return list(source or [])
+
+def execute_batch_automation(config, image_source, device=None):
+    """
+    Batch mode: searches many images within one device session.
+    The session, app reset and shop navigation are paid once; every image then goes through
+    push -> camera -> pick image -> collect -> back to shop.
+    Returns {image_path: shared links (None if that image failed)}, or None if the session could not be set up.
+    """
+    image_paths = resolve_image_paths(image_source)
+    if not image_paths:
+        logger.warning("批量搜索未提供任何图片。")
+        return {}
+
+    results = {}
     driver_manager = None
+    share_service = None
+    product_index = ProductIndex.from_config(config)
     try:
-        # Initialize driver
-        driver_manager = DriverManager(config_path='config.yaml') # It will use the config copied by run_test or app.py
-        driver = driver_manager.create_driver()
-        if not driver:
+        driver_manager = session_manager.acquire(config, device)
+        if not driver_manager:
             raise Exception("Failed to initialize driver")
 
-        # Setup environment
-        logger.info("强制关闭并重启TikTok以确保干净的测试环境...")
+        tiktok_page = TikTokPage(driver_manager)
         tiktok_package = config['tiktok']['app_package']
-        driver_manager.terminate_app(tiktok_package)
-        driver_manager.press_home()
-        driver_manager.switch_to_app(tiktok_package)
-        time.sleep(4)
+        if not tiktok_page.reset_to_home(tiktok_package, warm=driver_manager.reused):
+            logger.warning("未能确认TikTok首页已加载，继续尝试执行任务")
 
-        # Initialize page objects and services
-        tiktok_page = TikTokPage(driver_manager)
-        
-        # Generate a unique filename with a timestamp for the current task
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
         output_filename = f"collected_links_{timestamp}.txt"
-        logger.info(f"本次采集任务将保存到文件: {output_filename}")
-        
         share_service = ShareService(driver_manager, config, output_filename=output_filename)
-        
-        # --- Start Process ---
-        logger.info("=== 步骤1: 进入TikTok商城 ===")
+
         if not tiktok_page.open_tiktok_shop():
             raise Exception("进入TikTok商城失败")
 
-        logger.info("=== (可选) 步骤2: 从PC传输图片到设备 ===")
-        pc_image_path = config['task'].get('pc_image_path')
-        # 检查路径是否有效且不是默认占位符
-        if pc_image_path and pc_image_path.strip():
-            logger.info(f"检测到PC端图片路径 '{pc_image_path}'，开始传输...")
-            if not tiktok_page.fetch_image_from_pc(pc_image_path):
-                # 如果提供了路径但传输失败，则应视为严重错误
-                raise Exception(f"从PC传输图片失败: {pc_image_path}")
-        else:
-            logger.info("未提供有效的PC端图片路径，跳过传输步骤。")
-        
-        logger.info("=== 步骤3: 开始图像搜索 ===")
-        if not tiktok_page.start_image_search():
-            raise Exception("图像搜索失败")
-        
-        logger.info("=== 步骤4: 收集并分享商品链接 ===")
-        shared_links = tiktok_page.collect_and_share_links(share_service, config)
-        
-        logger.info("=== 步骤5: 验证结果 ===")
-        if not shared_links:
-            logger.warning("未能成功分享任何链接。")
-        else:
-            logger.success(f"成功分享了 {len(shared_links)} 个链接。")
-        
-        return shared_links
+        for index, image_path in enumerate(image_paths, 1):
+            logger.info(f"=== 批量搜索 [{index}/{len(image_paths)}]: {image_path} ===")
+            results[image_path] = None
+            share_service.source_image = image_path
+            try:
+                # The search picks the newest gallery entry, so always push the image right before its search:
+                # a cached copy is only moved to the front when the device allows shell commands
+                if not tiktok_page.fetch_image_from_pc(image_path, force=True):
+                    continue
+                if not tiktok_page.start_image_search():
+                    continue
+                results[image_path] = tiktok_page.collect_and_share_links(share_service, config,
+                                                                          product_index=product_index)
+                logger.success(f"图片 {image_path} 采集到 {len(results[image_path])} 个链接。")
+            except Exception as e:
+                logger.error(f"批量搜索图片 {image_path} 时出错: {e}")
+            finally:
+                if index < len(image_paths) and not tiktok_page.return_to_shop(tiktok_package):
+                    raise Exception("无法返回商城，终止批量搜索")
+
+        share_service.close()
+        tiktok_page.waiter.log_summary()
+        logger.info(f"批量搜索图片推送共节省 {tiktok_page.image_cache.total_saved / 1024 / 1024:.1f} MB")
+        return results
 
     except Exception as e:
-        logger.error(f"自动化任务执行期间发生意外错误: {e}")
-        # Only take a screenshot if the driver was successfully initialized
+        logger.error(f"批量自动化任务执行期间发生意外错误: {e}")
         if driver_manager and driver_manager.driver:
-            driver_manager.take_screenshot("task_error.png")
-        return None # Return None on failure
+            driver_manager.take_screenshot("batch_task_error.png")
+        if share_service:
+            share_service.close()
+        return results or None
     finally:
+        if product_index is not None:
+            product_index.close()
+        locator_registry.save()
         if driver_manager:
-            driver_manager.quit_driver()
+            session_manager.release(driver_manager, discard=not config['appium'].get('reuse_session', True))
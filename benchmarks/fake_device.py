@@ -0,0 +1,206 @@
+import os
+import time
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+from utils.driver_manager import DriverManager
+
+
+CARD = 'com.lynx.tasm.behavior.ui.view.UIComponent'
+CARD_HEIGHT = 800
+
+
+def _hierarchy(body):
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n<hierarchy index="0" width="1080" height="2400">'
+            f'<android.widget.FrameLayout bounds="[0,0][1080,2400]">{body}</android.widget.FrameLayout></hierarchy>')
+
+
+def results_page(products):
+    cards = ''.join(
+        f'<{CARD} index="{i}" bounds="[0,{300 + i * CARD_HEIGHT}][1080,{300 + (i + 1) * CARD_HEIGHT}]">'
+        f'<android.widget.TextView text="{name}" bounds="[10,{900 + i * CARD_HEIGHT}][1070,{960 + i * CARD_HEIGHT}]"/>'
+        f'</{CARD}>'
+        for i, name in enumerate(products)
+    )
+    return _hierarchy(
+        '<android.widget.FrameLayout resource-id="com.zhiliaoapp.musically:id/g8d" bounds="[0,300][1080,2200]">'
+        '<android.widget.FrameLayout bounds="[0,300][1080,2200]">'
+        f'<android.widget.FrameLayout bounds="[0,300][1080,2200]">{cards}</android.widget.FrameLayout>'
+        '</android.widget.FrameLayout></android.widget.FrameLayout>'
+    )
+
+
+# 各界面的页面源码和可被定位到的元素: {状态: (标记文本, 定位器中必须包含的片段, 点击后的状态)}
+SCREENS = {
+    'home': ('商城', '商城', 'shop'),
+    'shop': ('EcomFlattenUIImage', 'EcomFlattenUIImage', 'gallery'),
+    'gallery': ('GridView', 'GridView', 'results'),
+    'detail': ('分享', '分享', 'share'),
+    'share': ('复制链接', '复制链接', 'detail'),
+    'video': ('返回', '返回', 'video'),
+}
+BACK = {'detail': 'video', 'video': 'results', 'share': 'detail', 'results': 'shop', 'gallery': 'shop', 'shop': 'home'}
+
+
+class FakeElement:
+    def __init__(self, device, state):
+        self.device = device
+        self.state = state
+
+    def click(self):
+        self.device.round_trip()
+        self.device.click(self.state)
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+
+class FakeTimeouts:
+    def __init__(self, implicit_wait):
+        self.implicit_wait = implicit_wait
+
+
+class FakeTikTokDevice:
+    """
+    脚本化的 TikTok 设备，实现采集流程用到的 Appium 驱动 API。
+    每次调用按 latency 模拟一次设备往返，图片推送按 push_bandwidth (字节/秒) 模拟传输耗时，
+    启动应用按 launch_time 模拟冷启动。搜索结果共 pages 页，每页 per_page 个商品。
+    """
+
+    def __init__(self, latency=0.02, push_bandwidth=4 * 1024 * 1024, launch_time=0.5, pages=5, per_page=2,
+                 implicit_wait=3):
+        self.latency = latency
+        self.push_bandwidth = push_bandwidth
+        self.launch_time = launch_time
+        self.products = [[f"Product {p}-{i}" for i in range(per_page)] for p in range(pages)]
+        self.state = 'closed'
+        self.page = 0
+        self.product = None
+        self.clipboard = ''
+        self.files = {}
+        self.session_id = 'fake-session'
+        self.timeouts = FakeTimeouts(implicit_wait)
+        self.calls = 0
+
+    def round_trip(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def implicitly_wait(self, seconds):
+        self.timeouts.implicit_wait = seconds
+
+    @property
+    def page_source(self):
+        self.round_trip()
+        if self.state == 'results':
+            return results_page(self.products[self.page])
+        if self.state in SCREENS:
+            marker = SCREENS[self.state][0]
+            return _hierarchy(f'<android.widget.ImageView content-desc="{marker}" bounds="[900,100][1000,200]"/>')
+        return _hierarchy('')
+
+    @property
+    def current_package(self):
+        self.round_trip()
+        return 'com.android.launcher3' if self.state == 'closed' else 'com.zhiliaoapp.musically'
+
+    def find_elements(self, by, value):
+        self.round_trip()
+        screen = SCREENS.get(self.state)
+        if not screen or screen[1] not in value:
+            return []
+        if self.state == 'detail' and '复制' in value:
+            return []
+        return [FakeElement(self, self.state)]
+
+    def find_element(self, by, value):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(value)
+        return elements[0]
+
+    def click(self, state):
+        if state == 'gallery':
+            self.page = 0
+        if state == 'share':
+            self.clipboard = f"https://vt.tiktok.com/{self.product.replace(' ', '').lower()}/"
+        if state != 'video':
+            self.state = SCREENS[state][2]
+
+    def tap(self, positions):
+        self.round_trip()
+        x, y = positions[0]
+        if self.state == 'results':
+            self.product = self.products[self.page][(y - 300) // CARD_HEIGHT]
+            self.state = 'detail'
+
+    def back(self):
+        self.round_trip()
+        self.state = BACK.get(self.state, self.state)
+
+    def swipe(self, start_x, start_y, end_x, end_y, duration=None):
+        self.round_trip()
+        if self.state == 'results':
+            self.page = min(self.page + 1, len(self.products) - 1)
+
+    def get_window_size(self):
+        self.round_trip()
+        return {'width': 1080, 'height': 2400}
+
+    def get_clipboard_text(self):
+        self.round_trip()
+        return self.clipboard
+
+    def push_file(self, destination_path, base64data=None, source_path=None):
+        self.round_trip()
+        if source_path:
+            self.files[destination_path] = os.path.getsize(source_path)
+            if self.push_bandwidth:
+                time.sleep(self.files[destination_path] / self.push_bandwidth)
+
+    def execute_script(self, script, *args):
+        self.round_trip()
+        # mobile: shell 中只模拟 stat (推送过的文件的大小) 和媒体库查询 (推送过的文件立即被收录)，其余命令直接成功
+        if script == 'mobile: shell' and args and args[0]['command'] == 'stat':
+            path = args[0]['args'][-1]
+            if path not in self.files:
+                raise WebDriverException(f"stat: '{path}': No such file or directory")
+            return f"{self.files[path]}\n"
+        if script == 'mobile: shell' and args and args[0]['command'] == 'content':
+            where = args[0]['args'][-1]
+            return 'Row: 0 _id=1\n' if any(f"'{path}'" in where for path in self.files) else 'No result found.\n'
+        return ''
+
+    def activate_app(self, package):
+        self.round_trip()
+        if self.state == 'closed':
+            time.sleep(self.launch_time)
+            self.state = 'home'
+
+    def terminate_app(self, package):
+        self.round_trip()
+        self.state = 'closed'
+
+    def press_keycode(self, keycode):
+        self.round_trip()
+
+    def save_screenshot(self, filename):
+        return True
+
+    def quit(self):
+        pass
+
+
+class FakeDriverManager(DriverManager):
+    """使用 FakeTikTokDevice 代替 Appium 会话的驱动管理器"""
+
+    def __init__(self, config, device=None, device_options=None):
+        super().__init__(config=config, device=device)
+        self.device_options = device_options or {}
+
+    def create_driver(self):
+        self.driver = FakeTikTokDevice(**self.device_options)
+        self.driver.activate_app(self.config['tiktok']['app_package'])
+        return self.driver
@@ -0,0 +1,81 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+LOGIN_PAGE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>妙手登录</title></head>
+<body>
+  <input type="text" aria-label="手机号/子账号/邮箱">
+  <input type="password" aria-label="密码">
+  <span class="remember-check-box">记住我</span>
+  <button onclick="location.href='/welcome'">立即登录</button>
+</body></html>'''
+
+WELCOME_PAGE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>欢迎</title></head><body>welcome</body></html>'''
+
+# 商品页中的采集按钮与妙手插件一样放在 data-wxt-shadow-root 宿主的 Shadow DOM 中
+PRODUCT_PAGE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title></head>
+<body>
+  <h1>{title}</h1>
+  <div data-wxt-shadow-root></div>
+  <script>
+    const root = document.querySelector('[data-wxt-shadow-root]').attachShadow({{mode: 'open'}});
+    root.innerHTML = '<button onclick="this.textContent=\\'已采集\\'">采集此商品</button>';
+  </script>
+</body></html>'''
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/login':
+            body = LOGIN_PAGE
+        elif path.startswith('/welcome'):
+            body = WELCOME_PAGE
+        elif path.startswith('/product/'):
+            body = PRODUCT_PAGE.format(title=f"Mock product {path.rsplit('/', 1)[-1]}")
+        else:
+            self.send_error(404)
+            return
+        delay = self.server.response_delay
+        if delay:
+            threading.Event().wait(delay)
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockSiteServer:
+    """
+    本地模拟站点: /login 为妙手登录页，/welcome 为登录后的首页，/product/<id> 为带采集按钮的商品页。
+    response_delay 模拟每个页面的服务器响应时间 (秒)。
+    """
+
+    def __init__(self, response_delay=0.0):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.httpd.response_delay = response_delay
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def product_links(self, count):
+        return [f"{self.base_url}/product/{i}" for i in range(count)]
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,346 @@
+"""
+各阶段耗时基准测试。
+
+在本地替身上运行采集流程并统计每个阶段的耗时分布 (p50/p95) 和吞吐量:
+  automation   execute_automation 的五个步骤，使用脚本化的假设备 (FakeTikTokDevice) 代替 Appium
+  link_opener  link_opener.open_links_from_file，使用本地模拟站点代替妙手和商品页
+  miaoshou     miaoshou_collector.collect_links_with_miaoshou，同上
+
+结果保存为 JSON，指定 --baseline 时与之前的结果比较，某个阶段的 p95 变慢超过 --threshold 时以非零状态退出。
+
+用法:
+  python benchmarks/run_benchmarks.py --suite automation --iterations 5
+  python benchmarks/run_benchmarks.py --suite all --baseline benchmarks/results/baseline.json
+"""
+import argparse
+import asyncio
+import contextlib
+import functools
+import inspect
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from loguru import logger
+from PIL import Image
+
+from benchmarks.fake_device import FakeDriverManager
+from benchmarks.mock_site import MockSiteServer
+
+
+DEFAULT_RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def percentile(values, q):
+    """线性插值的百分位数，q 取 0-100"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(durations):
+    return {
+        'count': len(durations),
+        'p50': percentile(durations, 50),
+        'p95': percentile(durations, 95),
+        'mean': sum(durations) / len(durations) if durations else None,
+        'max': max(durations) if durations else None,
+    }
+
+
+class PhaseTimer:
+    """
+    在测量期间替换目标函数，记录每次调用的耗时和返回值是否为真 (即该阶段是否成功)。
+    targets 为 {阶段名: (对象或模块, 属性名)}，同步函数和协程函数都支持。
+    """
+
+    def __init__(self, targets):
+        self.targets = targets
+        self.durations = {name: [] for name in targets}
+        self.successes = {name: 0 for name in targets}
+
+    def _record(self, name, start, result):
+        self.durations[name].append(time.perf_counter() - start)
+        if result:
+            self.successes[name] += 1
+
+    def _wrap(self, name, fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def timed_async(*args, **kwargs):
+                start = time.perf_counter()
+                result = None
+                try:
+                    result = await fn(*args, **kwargs)
+                    return result
+                finally:
+                    self._record(name, start, result)
+            return timed_async
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            result = None
+            try:
+                result = fn(*args, **kwargs)
+                return result
+            finally:
+                self._record(name, start, result)
+        return timed
+
+    @contextlib.contextmanager
+    def patched(self):
+        originals = []
+        for name, (owner, attr) in self.targets.items():
+            original = owner.__dict__[attr] if isinstance(owner, type) else getattr(owner, attr)
+            originals.append((owner, attr, original))
+            setattr(owner, attr, self._wrap(name, getattr(owner, attr)))
+        try:
+            yield self
+        finally:
+            for owner, attr, original in reversed(originals):
+                setattr(owner, attr, original)
+
+    def phases(self):
+        return {name: summarize(values) for name, values in self.durations.items() if values}
+
+
+@contextlib.contextmanager
+def scratch_dir():
+    """在临时目录中运行，流程写出的 shared_links/、data/ 等文件不会污染工作目录"""
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='bench_') as path:
+        os.chdir(path)
+        try:
+            yield path
+        finally:
+            os.chdir(previous)
+
+
+def make_search_image(path, size=(3000, 2000)):
+    image = Image.linear_gradient('L').resize(size).convert('RGB')
+    image.save(path, 'JPEG', quality=95)
+    return path
+
+
+def automation_config(image_path, max_products):
+    return {
+        'appium': {'server_url': 'http://fake-appium', 'reuse_session': False},
+        'device': {
+            'platform_name': 'Android', 'platform_version': '13', 'device_name': 'bench-device',
+            'automation_name': 'UiAutomator2', 'no_reset': True, 'full_reset': False,
+        },
+        'task': {
+            'max_products_to_process': max_products, 'pc_image_path': image_path, 'share_target': 'file',
+            'implicit_wait': 3, 'screenshot_path': './screenshots', 'skip_known_products': False,
+        },
+        'tiktok': {'app_package': 'com.zhiliaoapp.musically', 'app_activity': '.Splash'},
+        'wechat': {'app_package': 'com.tencent.mm', 'app_activity': '.ui.SplashUI'},
+    }
+
+
+def bench_automation(iterations=5, max_products=4, latency=0.02):
+    """在假设备上运行 execute_automation，统计五个步骤及每个商品各环节的耗时"""
+    import automation_task
+    from pages.tiktok_page import TikTokPage
+    from utils.share_service import ShareService
+    from utils.session_manager import session_manager
+
+    timer = PhaseTimer({
+        'session': (session_manager, 'acquire'),
+        'reset_to_home': (TikTokPage, 'reset_to_home'),
+        'open_shop': (TikTokPage, 'open_tiktok_shop'),
+        'push_image': (TikTokPage, 'fetch_image_from_pc'),
+        'image_search': (TikTokPage, 'start_image_search'),
+        'collect_links': (TikTokPage, 'collect_and_share_links'),
+        'product_detail': (TikTokPage, 'enter_product_detail'),
+        'share_product': (TikTokPage, 'share_product_link'),
+        'go_back': (TikTokPage, 'go_back'),
+        'share_link': (ShareService, 'share_link'),
+    })
+    total_links = 0
+    runs = []
+    original_factory = session_manager.factory
+    session_manager.factory = lambda config, device: FakeDriverManager(config, device, {'latency': latency})
+    try:
+        with scratch_dir() as path, timer.patched():
+            image_path = make_search_image(os.path.join(path, 'search.jpg'))
+            for _ in range(iterations):
+                start = time.perf_counter()
+                links = automation_task.execute_automation(automation_config(image_path, max_products))
+                runs.append(time.perf_counter() - start)
+                total_links += len(links or [])
+    finally:
+        session_manager.factory = original_factory
+
+    wall = sum(runs)
+    return {
+        'iterations': iterations,
+        'wall': wall,
+        'phases': dict(timer.phases(), total=summarize(runs)),
+        'products_per_min': len(timer.durations['product_detail']) / wall * 60 if wall else 0,
+        'links_per_min': total_links / wall * 60 if wall else 0,
+    }
+
+
+def _browser_config(site):
+    return {
+        'proxy_server': '',
+        'miaoshou_url': f"{site.base_url}/login",
+        'miaoshou_username': 'bench',
+        'miaoshou_password': 'bench',
+        'extension_path': '',
+        'headless': True,
+        'keep_open': False,
+    }
+
+
+def bench_link_opener(iterations=3, link_count=5, response_delay=0.05):
+    """在本地模拟站点上运行 link_opener.open_links_from_file"""
+    import link_opener
+
+    timer = PhaseTimer({'login': (link_opener, 'login'), 'open_link': (link_opener, '_open_link')})
+    runs = []
+    with MockSiteServer(response_delay) as site, scratch_dir(), timer.patched():
+        os.makedirs('shared_links', exist_ok=True)
+        with open(os.path.join('shared_links', 'bench_links.txt'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(site.product_links(link_count)) + '\n')
+        for _ in range(iterations):
+            start = time.perf_counter()
+            asyncio.run(link_opener.open_links_from_file('bench_links.txt', _browser_config(site)))
+            runs.append(time.perf_counter() - start)
+
+    wall = sum(runs)
+    return {
+        'iterations': iterations,
+        'wall': wall,
+        'phases': dict(timer.phases(), total=summarize(runs)),
+        'links_per_min': timer.successes['open_link'] / wall * 60 if wall else 0,
+    }
+
+
+def bench_miaoshou(iterations=1, link_count=3, response_delay=0.05):
+    """在本地模拟站点上运行 miaoshou_collector.collect_links_with_miaoshou"""
+    import miaoshou_collector
+
+    timer = PhaseTimer({
+        'login': (miaoshou_collector, 'login'),
+        'collect_link': (miaoshou_collector, '_collect_link'),
+    })
+    runs = []
+    with MockSiteServer(response_delay) as site, scratch_dir(), timer.patched():
+        for _ in range(iterations):
+            start = time.perf_counter()
+            asyncio.run(miaoshou_collector.collect_links_with_miaoshou(site.product_links(link_count),
+                                                                     _browser_config(site)))
+            runs.append(time.perf_counter() - start)
+
+    wall = sum(runs)
+    return {
+        'iterations': iterations,
+        'wall': wall,
+        'phases': dict(timer.phases(), total=summarize(runs)),
+        'products_per_min': len(timer.durations['collect_link']) / wall * 60 if wall else 0,
+        'links_per_min': timer.successes['collect_link'] / wall * 60 if wall else 0,
+    }
+
+
+def compare_results(current, baseline, threshold=0.2, min_delta=0.05):
+    """
+    比较两次结果，返回退化的阶段列表 [(套件, 阶段, 基线p95, 当前p95)]。
+    p95 比基线慢超过 threshold (比例) 且绝对差值超过 min_delta 秒才算退化，避免毫秒级的抖动误报。
+    """
+    regressions = []
+    for suite, result in current.get('suites', {}).items():
+        base_phases = baseline.get('suites', {}).get(suite, {}).get('phases', {})
+        for phase, stats in result.get('phases', {}).items():
+            base = base_phases.get(phase)
+            if not base or base.get('p95') is None or stats.get('p95') is None:
+                continue
+            if stats['p95'] > base['p95'] * (1 + threshold) and stats['p95'] - base['p95'] > min_delta:
+                regressions.append((suite, phase, base['p95'], stats['p95']))
+    return regressions
+
+
+def save_results(results, output_dir=DEFAULT_RESULTS_DIR):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"bench_{datetime.now().strftime('%Y%m%d%H%M%S')}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def print_report(results):
+    for suite, result in results['suites'].items():
+        if 'error' in result:
+            print(f"\n[{suite}] 跳过: {result['error']}")
+            continue
+        print(f"\n[{suite}] {result['iterations']} 次, 共 {result['wall']:.2f}s")
+        print(f"  {'阶段':<16}{'次数':>6}{'p50(s)':>10}{'p95(s)':>10}{'最长(s)':>10}")
+        for phase, stats in result['phases'].items():
+            print(f"  {phase:<16}{stats['count']:>6}{stats['p50']:>10.3f}{stats['p95']:>10.3f}{stats['max']:>10.3f}")
+        for key in ('products_per_min', 'links_per_min'):
+            if key in result:
+                print(f"  {key}: {result[key]:.1f}")
+
+
+SUITES = {
+    'automation': bench_automation,
+    'link_opener': bench_link_opener,
+    'miaoshou': bench_miaoshou,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="采集流程各阶段耗时基准测试")
+    parser.add_argument('--suite', choices=list(SUITES) + ['all'], default='automation')
+    parser.add_argument('--iterations', type=int, default=None, help="每个套件的运行次数")
+    parser.add_argument('--latency', type=float, default=0.02, help="假设备每次调用的往返耗时 (秒)")
+    parser.add_argument('--baseline', help="用于比较的基线结果 JSON")
+    parser.add_argument('--threshold', type=float, default=0.2, help="p95 允许变慢的比例")
+    parser.add_argument('--output-dir', default=DEFAULT_RESULTS_DIR)
+    parser.add_argument('--verbose', action='store_true', help="输出流程本身的日志")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logger.remove()
+        logger.add(sys.stderr, level='ERROR')
+
+    suites = list(SUITES) if args.suite == 'all' else [args.suite]
+    results = {'created': datetime.now().isoformat(timespec='seconds'), 'suites': {}}
+    for suite in suites:
+        kwargs = {'iterations': args.iterations} if args.iterations else {}
+        if suite == 'automation':
+            kwargs['latency'] = args.latency
+        try:
+            results['suites'][suite] = SUITES[suite](**kwargs)
+        except Exception as e:
+            # 浏览器套件需要 playwright install chromium，没有浏览器时跳过
+            results['suites'][suite] = {'error': str(e).splitlines()[0]}
+
+    print_report(results)
+    print(f"\n结果已保存: {save_results(results, args.output_dir)}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.threshold)
+        for suite, phase, before, after in regressions:
+            print(f"性能退化: [{suite}] {phase} p95 {before:.3f}s -> {after:.3f}s")
+        if regressions:
+            return 1
+        print(f"与基线相比没有超过 {args.threshold:.0%} 的退化")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import threading
+from loguru import logger
+from utils.backends import backends
+from utils.checkpoint import DEFAULT_CHECKPOINT_DIR
+from utils.config_store import ConfigStore
+from utils.device_pool import DevicePool, device_configs, plan_jobs, collect_links
+from utils.event_bus import event_bus
+
+# Job functions run by the job manager, in a worker process (jobs.isolation: process) or a thread of the web server.
+# This module must stay importable without side effects: worker processes import it to find the job functions.
+CONFIG_FILE = 'config.yaml'
+
+config_store = ConfigStore.for_path(CONFIG_FILE)
+
+def load_config():
+    """Returns a read-only snapshot of the configuration (use config_store.copy() for a mutable one)."""
+    return config_store.get()
+
+def init_worker():
+    """Applies the `backends` section of config.yaml; run once in the web server and in every worker process."""
+    backends.configure(load_config())
+
+# --- Link Opener Task ---
+def run_link_opener_job(job, filename):
+    """Link opener job: opens every link of a result file in a browser."""
+    logger.info(f"Starting link opener task for file: {filename}...")
+    config = load_config()
+    job.set_progress(phase='opening')
+    # We run the async function in a new event loop on the job's worker
+    asyncio.run(backends.get('link_opener')(filename, config.get('web_automation', {})))
+    logger.success(f"Link opener task for {filename} finished.")
+    return {'filename': filename}
+
+# --- Automation Task ---
+def run_device_pool(config, image_paths):
+    """Shards the search images (or the product quota) across all configured devices."""
+    pool = DevicePool(config)
+    jobs = plan_jobs(image_paths, config['task']['max_products_to_process'], len(pool.devices),
+                     batch_size=config['task'].get('batch_size', 10))
+    return collect_links(pool.run(jobs))
+
+def run_batch(config, image_paths):
+    """Runs all images as one batch on the single configured device."""
+    results = backends.get('batch_automation')(config, image_paths)
+    if results is None:
+        return None
+    for image_path, links in results.items():
+        logger.info(f"Batch result for {image_path}: {'failed' if links is None else f'{len(links)} links'}")
+    return [link for links in results.values() for link in links or []]
+
+def run_automation_job(job, pc_image_path=None, pc_image_paths=None):
+    """Automation job: single image, batch, or sharded across the device pool."""
+    logger.info("Starting automation task...")
+    # A private copy: the job overrides some settings for this run
+    config = config_store.copy()
+    # Dynamically set the pc_image_path for this run
+    if pc_image_path:
+        config['task']['pc_image_path'] = pc_image_path
+    # Tags this run's product events: with thread isolation other jobs publish on the same event bus
+    config['task']['job_id'] = job.id
+
+    job.set_progress(phase='collecting', products=0, links=0)
+    counts = {'products': 0, 'links': 0}
+    counts_lock = threading.Lock()
+
+    def on_product(event):
+        # Per-product progress from the collection loop; every device of the pool reports here from its own thread
+        if event['data'].get('job') != job.id:
+            return
+        with counts_lock:
+            counts['products'] += 1
+            if event['data']['link']:
+                counts['links'] += 1
+            job.set_progress(**counts)
+
+    subscription = event_bus.subscribe(['product'], callback=on_product)
+    try:
+        if len(device_configs(config)) > 1:
+            image_paths = pc_image_paths or ([config['task']['pc_image_path']] if config['task'].get('pc_image_path') else [])
+            results = run_device_pool(config, image_paths)
+        elif pc_image_paths:
+            results = run_batch(config, pc_image_paths)
+        else:
+            # A fixed per-job checkpoint lets a job re-queued after a server restart continue where it stopped
+            checkpoint_dir = config['task'].get('checkpoint_dir', DEFAULT_CHECKPOINT_DIR)
+            results = backends.get('automation')(config, checkpoint_path=os.path.join(checkpoint_dir, f"job-{job.id}.json"))
+    finally:
+        subscription.close()
+    if results is None: # Check for failure signal
+        logger.error("Automation task failed. Please check logs for details.")
+        return None
+    job.set_progress(phase='done', links=len(results))
+    logger.success("Automation task finished successfully.")
+    return results
@@ -1,6 +1,10 @@
 import asyncio
 from playwright.async_api import async_playwright
 from loguru import logger
+from utils.metrics import timed
+from utils.result_writer import read_links
+from utils.link_resolver import resolve_unique_links
+from utils.miaoshou import login
 import os
 
 async def open_links_from_file(filename, config=None):
@@ -24,14 +28,19 @@ async def open_links_from_file(filename, config=None):
         logger.error(f"文件不存在: {file_path}")
         return
 
-    with open(file_path, 'r', encoding='utf-8') as f:
-        links = [line.strip() for line in f if line.strip()]
+    links = read_links(file_path)
 
     if not links:
         logger.warning(f"文件中没有找到任何链接: {file_path}")
         return
 
     logger.info(f"准备从文件 '{file_path}' 打开 {len(links)} 个链接...")
+    # 短链接解析和浏览器启动、登录同时进行，打开前按商品ID去重
+    resolve_task = asyncio.create_task(resolve_unique_links(links, config))
+
+    headless = config.get("headless", False)
+    # keep_open=False 时打开完所有链接后直接关闭浏览器 (用于无人值守运行和基准测试)
+    keep_open = config.get("keep_open", True)
 
     async with async_playwright() as p:
         proxy_settings = { "server": PROXY_SERVER } if PROXY_SERVER else None
@@ -39,7 +48,7 @@ async def open_links_from_file(filename, config=None):
         launch_args = [
             f"--disable-extensions-except={EXTENSION_PATH}",
             f"--load-extension={EXTENSION_PATH}",
-        ]
+        ] if EXTENSION_PATH else []
 
         if proxy_settings:
             logger.info(f"正在使用代理服务器: {proxy_settings['server']}")
@@ -48,7 +57,7 @@ async def open_links_from_file(filename, config=None):
 
         context = await p.chromium.launch_persistent_context(
             "",
-            headless=False,
+            headless=headless,
             args=launch_args,
             proxy=proxy_settings,
         )
@@ -56,39 +65,14 @@ async def open_links_from_file(filename, config=None):
         page = await context.new_page()
         # --- 步骤1: 处理插件初始化和登录 ---
         try:
-            await page.wait_for_timeout(5000) 
-            all_pages = context.pages
-            logger.info(f"浏览器启动后有 {len(all_pages)} 个页面。")
-            
-            for p_item in all_pages:
-                if p_item != page:
-                    try:
-                        logger.info(f"正在检查页面: {p_item.url}")
-                        await p_item.locator("label span").nth(1).click(timeout=5000)
-                        await p_item.get_by_role("button", name="确认开启").click(timeout=5000)
-                        logger.success("成功处理插件的初始设置页面。")
-                        await p_item.close()
-                        break
-                    except Exception:
-                        logger.warning(f"页面 {p_item.url} 不是插件设置页，或无法执行操作。将忽略。")
-
-            logger.info(f"正在导航到妙手登录页面: {MIAOSHOU_URL}")
-            await page.goto(MIAOSHOU_URL, timeout=60000)
-            
-            await page.get_by_role("textbox", name="手机号/子账号/邮箱").fill(MIAOSHOU_USERNAME)
-            await page.get_by_role("textbox", name="密码").fill(MIAOSHOU_PASSWORD)
-            await page.locator(".remember-check-box").click()
-            await page.get_by_role("button", name="立即登录").click()
-
-            await page.wait_for_url("**/welcome**", timeout=60000)
-            logger.success("妙手网站登录成功！")
-            
+            await login(context, page, MIAOSHOU_URL, MIAOSHOU_USERNAME, MIAOSHOU_PASSWORD)
         except Exception as e:
             logger.error(f"登录或处理插件初始化失败: {e}")
+            resolve_task.cancel()
             await context.close()
             return
 
-
+        links = await resolve_task
 
         # Keep track of pages to ensure they are all created
         pages = []
@@ -96,11 +80,15 @@ async def open_links_from_file(filename, config=None):
         for index, link in enumerate(links):
             try:
                 logger.info(f"[{index + 1}/{len(links)}] 正在打开链接: {link}")
-                page = await context.new_page()
-                await page.goto(link, timeout=60000, wait_until='domcontentloaded')
+                page = await _open_link(context, link)
                 pages.append(page)
             except Exception as e:
                 logger.error(f"打开链接失败 {link}: {e}")
+
+        if not keep_open:
+            logger.info(f"已打开 {len(pages)}/{len(links)} 个链接，关闭浏览器。")
+            await context.close()
+            return
         
         logger.info(f"所有链接都已尝试打开。浏览器将保持开启状态，您可以手动检查。")
         logger.info("您可以随时手动关闭浏览器。")
@@ -116,6 +104,16 @@ async def open_links_from_file(filename, config=None):
         await closed_future
         
         logger.info("浏览器上下文已关闭。")
+
+
+@timed('link_opener.open_link', 'browser')
+async def _open_link(context, link):
+    """在新标签页中打开一个链接，返回该页面"""
+    page = await context.new_page()
+    await page.goto(link, timeout=60000, wait_until='domcontentloaded')
+    return page
+
+
 if __name__ == '__main__':
     # 默认使用 'collected_links.txt' 文件进行测试
     default_filename = 'collected_links.txt'
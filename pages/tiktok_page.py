@@ -1,6 +1,15 @@
 from selenium.webdriver.common.by import By
+from selenium.common.exceptions import WebDriverException
 from appium.webdriver.common.appiumby import AppiumBy
 from utils.element_helper import ElementHelper
+from utils.page_snapshot import PageSnapshot, ProductCard
+from utils.waiter import Waiter
+from utils.image_cache import ImagePushCache
+from utils.product_index import ProductIndex, card_fingerprint
+from utils.locator_registry import locator_registry
+from utils.popup_sentinel import PopupSentinel
+from utils.metrics import timed
+from utils.event_bus import event_bus
 from loguru import logger
 import time
 import pyperclip
@@ -13,76 +22,150 @@ class TikTokPage:
     def __init__(self, driver_manager):
         self.driver_manager = driver_manager
         self.driver = driver_manager.driver
-        self.helper = ElementHelper(self.driver)
+        self.waiter = Waiter(self.driver, max_waits=driver_manager.config['task'].get('wait_max'))
+        self.helper = ElementHelper(self.driver, waiter=self.waiter)
+        # 弹窗哨兵复用等待和采集过程中已获取的页面快照，不额外请求设备 (只在列表和商城页面的等待中检查)
+        self.popup_sentinel = PopupSentinel.from_config(self.driver, driver_manager.config)
+        self.popup_sentinel.attach(self.waiter)
+        self.helper.popup_sentinel = self.popup_sentinel
+        self.image_cache = ImagePushCache.from_config(driver_manager.config)
+        self.last_push = None
 
         # === 页面元素定位器 (已根据最终流程更新) ===
+        # 注册为逻辑元素的定位器有多个候选策略，ElementHelper 会按实测的耗时和命中率优先尝试最快的一个
 
         shop_xpath='//android.widget.TextView[@resource-id="android:id/text1" and @text="商城"] | //android.widget.TextView[@resource-id="com.zhiliaoapp.musically:id/title" and (@text="商城" or @text="Shop")]'
-        self.shop_tab = (AppiumBy.XPATH, shop_xpath)
         # 使用XPath定位搜索框和相机图标的组合，更加健壮
-        self.search_button = (AppiumBy.XPATH, "//*[contains(@text, '搜索') or contains(@content-desc, '搜索')]/../*[contains(@class, 'ImageView')]")
+        search_xpath="//*[contains(@text, '搜索') or contains(@content-desc, '搜索')]/../*[contains(@class, 'ImageView')]"
         camera_xapth='//androidx.recyclerview.widget.RecyclerView[starts-with(@resource-id,"com.zhiliaoapp.musically:id/")]/android.widget.FrameLayout/android.widget.FrameLayout/com.ss.android.ugc.aweme.ecommerce.ui.EcomFlattenUIImage[2]'
-        self.camera_button = (AppiumBy.XPATH, camera_xapth)
-
         upload_photo_btn_xpath='//android.widget.ImageView[@content-desc="图片"]'
-        self.upload_photo_button = (AppiumBy.XPATH, upload_photo_btn_xpath)
+        best_sell_product_xpath='//com.lynx.tasm.behavior.ui.view.UIView[@content-desc="畅销商品"]'
+        # share_btn_xpath='//android.view.ViewGroup[starts-with(@resource-id,"com.zhiliaoapp.musically:id/")]'
+        share_btn_xpath='//android.widget.ImageView[@content-desc="分享"]'
+        copy_link_btn_xpath='//android.widget.TextView[contains(@text,"复制链接")]'
+        video_back_xpath='//android.widget.ImageView[@content-desc="返回"]'
+
+        locator_registry.register_many({
+            'tiktok.shop_tab': [
+                (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().resourceId("android:id/text1").className("android.widget.TextView").text("商城")'),
+                (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().resourceId("com.zhiliaoapp.musically:id/title").className("android.widget.TextView").textMatches("商城|Shop")'),
+                (AppiumBy.XPATH, shop_xpath),
+            ],
+            'tiktok.search_button': [(AppiumBy.XPATH, search_xpath)],
+            'tiktok.camera_button': [(AppiumBy.XPATH, camera_xapth)],
+            'tiktok.upload_photo_button': [
+                (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().className("android.widget.ImageView").description("图片")'),
+                (AppiumBy.XPATH, upload_photo_btn_xpath),
+            ],
+            'tiktok.best_sell_product': [
+                (AppiumBy.ACCESSIBILITY_ID, '畅销商品'),
+                (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().className("com.lynx.tasm.behavior.ui.view.UIView").description("畅销商品")'),
+                (AppiumBy.XPATH, best_sell_product_xpath),
+            ],
+            'tiktok.share_button': [
+                (AppiumBy.ACCESSIBILITY_ID, '分享'),
+                (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().className("android.widget.ImageView").description("分享")'),
+                (AppiumBy.XPATH, share_btn_xpath),
+            ],
+            'tiktok.copy_link_option': [
+                (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().className("android.widget.TextView").textContains("复制链接")'),
+                (AppiumBy.XPATH, copy_link_btn_xpath),
+            ],
+            'tiktok.back_button': [
+                (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().className("android.widget.ImageView").description("返回")'),
+                (AppiumBy.XPATH, video_back_xpath),
+            ],
+        })
+
+        self.shop_tab = 'tiktok.shop_tab'
+        self.search_button = 'tiktok.search_button'
+        self.camera_button = 'tiktok.camera_button'
+        self.upload_photo_button = 'tiktok.upload_photo_button'
 
         # take_photo_xpath='(//android.widget.ImageView[@resource-id="com.zhiliaoapp.musically:id/f9_"])[1]'
-        take_photo_xpath='//android.widget.GridView[starts-with(@resource-id,"com.zhiliaoapp.musically:id/")]/android.view.ViewGroup[1]'
-        self.take_photo_button = (AppiumBy.XPATH, take_photo_xpath)
+        self.gallery_item_xpath='//android.widget.GridView[starts-with(@resource-id,"com.zhiliaoapp.musically:id/")]/android.view.ViewGroup[{}]'
+        self.take_photo_button = (AppiumBy.XPATH, self.gallery_item_xpath.format(1))
         # self.confirm_photo_button = (AppiumBy.XPATH, "//android.widget.TextView[@text='确定' or @text='OK']")
         
-        best_sell_product_xpath='//com.lynx.tasm.behavior.ui.view.UIView[@content-desc="畅销商品"]'
-        self.best_sell_product = (AppiumBy.XPATH, best_sell_product_xpath)
+        self.best_sell_product = 'tiktok.best_sell_product'
 
         # 更通用的XPath，匹配所有产品项
         product_items_xpath='//android.widget.FrameLayout[starts-with(@resource-id,"com.zhiliaoapp.musically:id/")]/android.widget.FrameLayout/android.widget.FrameLayout/com.lynx.tasm.behavior.ui.view.UIComponent'
         self.product_items = (AppiumBy.XPATH, product_items_xpath)
 
-        # share_btn_xpath='//android.view.ViewGroup[starts-with(@resource-id,"com.zhiliaoapp.musically:id/")]'
-        share_btn_xpath='//android.widget.ImageView[@content-desc="分享"]'
-        self.share_button = (AppiumBy.XPATH, share_btn_xpath)
-                              
-        copy_link_btn_xpath='//android.widget.TextView[contains(@text,"复制链接")]'
-        self.copy_link_option = (AppiumBy.XPATH, copy_link_btn_xpath)
-
-        video_back_xpath='//android.widget.ImageView[@content-desc="返回"]'
-        self.back_button = (AppiumBy.XPATH, video_back_xpath)
+        self.share_button = 'tiktok.share_button'
+        self.copy_link_option = 'tiktok.copy_link_option'
+        self.back_button = 'tiktok.back_button'
 
-    def fetch_image_from_pc(self, pc_image_path):
-        """从PC传输图片到手机设备"""
+    @timed('tiktok.push_image')
+    def fetch_image_from_pc(self, pc_image_path, device_path=None, force=False):
+        """
+        从PC传输图片到手机设备 (先压缩，按内容哈希命名，设备上已有相同图片时跳过传输)。
+        force=True 时总是重新推送，确保它成为相册中最新的一张。
+        """
         try:
             if not os.path.exists(pc_image_path):
                 logger.error(f"PC端图片路径不存在: {pc_image_path}")
                 return False
             
-            device_path = "/sdcard/Download/tiktok_search_image.png"
-            logger.info(f"正在将图片 '{pc_image_path}' 传输到设备的 '{device_path}'...")
+            logger.info(f"正在将图片 '{pc_image_path}' 传输到设备...")
+            device_key = str(self.driver_manager.device.get('udid') or self.driver_manager.device.get('device_name'))
+            result = self.image_cache.push(self.driver, device_key, pc_image_path, device_path, force=force)
+            self.last_push = result
             
-            self.driver.push_file(device_path, source_path=pc_image_path)
-            
-            logger.success(f"图片成功传输到 {device_path}")
-            # 短暂等待，确保文件系统刷新，图片在相册中可见
-            time.sleep(3)
+            if result.transferred:
+                logger.success(f"图片成功传输到 {result.device_path}")
+                # 等待媒体库收录新图片，使其在相册中可见 (无法查询媒体库时等满 gallery_refresh 的时间)
+                self.waiter.until('gallery_refresh',
+                                  lambda: self.image_cache.in_media_store(self.driver, result.device_path))
             return True
         except Exception as e:
             logger.error(f"从PC传输图片失败: {e}")
             return False
 
+    @timed('tiktok.reset_to_home')
+    def reset_to_home(self, app_package, warm=True):
+        """
+        把TikTok恢复到带商城标签的首页。
+        热会话优先通过返回键回到首页，只有失败时才关闭并重启应用。
+        """
+        if warm:
+            self.driver_manager.switch_to_app(app_package)
+            for _ in range(4):
+                if self.helper.locate_once(self.shop_tab):
+                    logger.info("已通过返回键回到TikTok首页")
+                    return True
+                self.driver.back()
+                self.waiter.for_page_stable('go_back')
+
+        logger.info("强制关闭并重启TikTok以确保干净的测试环境...")
+        self.driver_manager.terminate_app(app_package)
+        self.driver_manager.press_home()
+        self.driver_manager.switch_to_app(app_package)
+        return self.waiter.for_element('app_launch', self.shop_tab) is not None
+
+    def return_to_shop(self, app_package, max_backs=4):
+        """从搜索结果返回商城主页 (相机图标可见)，失败时重启应用并重新进入商城"""
+        for _ in range(max_backs):
+            if self.helper.locate_once(self.camera_button):
+                return True
+            self.driver.back()
+            self.waiter.for_page_stable('go_back')
+        logger.warning("未能通过返回键回到商城，重新进入商城...")
+        return self.reset_to_home(app_package, warm=False) and self.open_tiktok_shop()
+
+    @timed('tiktok.open_shop')
     def open_tiktok_shop(self):
         """打开TikTok商城"""
         try:
             logger.info("正在打开TikTok商城...")
             
-            # 增加智能等待以确保应用完全加载
-            logger.info("等待应用加载...")
-            time.sleep(2) # 短暂等待基础UI
             # self.helper.handle_popups()
             
-            # 点击商城标签
+            # 点击商城标签 (click_element_safe 会等待商城标签可点击，无需固定等待应用加载)
             if self.helper.click_element_safe(self.shop_tab, timeout=5):
                 logger.info("成功进入TikTok商城")
-                time.sleep(1)
+                self.waiter.for_element('shop_loaded', self.camera_button)
                 return True
             else:
                 logger.error("未找到商城入口")
@@ -92,8 +175,9 @@ class TikTokPage:
             logger.error(f"打开TikTok商城失败: {e}")
             return False
     
-    def start_image_search(self):
-        """开始图像搜索 (根据简化流程重写)"""
+    @timed('tiktok.image_search')
+    def start_image_search(self, image_index=1):
+        """开始图像搜索，image_index 为相册中第几张图片 (最新的为第1张)"""
         try:
             logger.info("开始图像搜索...")
 
@@ -103,7 +187,8 @@ class TikTokPage:
                 return False
             
             logger.info("成功点击相机图标，进入相册")
-            time.sleep(2) # 等待相册加载
+            photo_button = (AppiumBy.XPATH, self.gallery_item_xpath.format(image_index))
+            self.waiter.for_element('gallery_loaded', photo_button)
             
             # # 2. 点击上传按钮
             # if not self.helper.click_element_safe(self.upload_photo_button):
@@ -111,10 +196,10 @@ class TikTokPage:
             #     return False
             
 
-            # 2. 选择相册中的第一张图片
-            if self.helper.click_element_safe(self.take_photo_button):
-                logger.info("成功选择第一张图片进行搜索")
-                time.sleep(5) # 等待搜索结果加载
+            # 2. 选择相册中的第 image_index 张图片
+            if self.helper.click_element_safe(photo_button):
+                logger.info(f"成功选择第 {image_index} 张图片进行搜索")
+                self.wait_for_search_results()
                 return True
             else:
                 logger.error("在相册中未找到任何图片")
@@ -124,16 +209,26 @@ class TikTokPage:
             logger.error(f"图像搜索失败: {e}")
             return False
     
+    def wait_for_search_results(self):
+        """等待搜索结果中出现商品卡片，且页面不再变化"""
+        found = self.waiter.until(
+            'search_results',
+            lambda: PageSnapshot(self.waiter.page_source()).find_product_cards()
+        )
+        if found:
+            self.waiter.for_page_stable('search_results_settled', max_wait=2)
+        return bool(found)
+
     def get_product_list(self):
         """获取商品列表"""
         try:
             logger.info("获取商品列表...")
             
             # 等待搜索结果加载
-            time.sleep(2)
+            self.wait_for_search_results()
             logger.info("点击畅销产品...")
             self.helper.click_element_safe(self.best_sell_product, timeout=5)
-            time.sleep(2)
+            self.waiter.for_page_stable('best_sell')
                 
 
             # # 查找商品元素
@@ -150,20 +245,25 @@ class TikTokPage:
             logger.error(f"获取商品列表失败: {e}")
             return []
     
-    def enter_product_detail(self, product_element):
-        """进入商品详情页"""
+    @timed('tiktok.product_detail')
+    def enter_product_detail(self, product):
+        """进入商品详情页，product 可以是页面快照中的商品卡片或元素"""
         try:
             logger.info("进入商品详情页...")
-            self.helper.click_element_safe(product_element, timeout=5)
-            # product_element.click()
-            time.sleep(2)
+            if isinstance(product, ProductCard):
+                if not self.helper.tap(*product.center):
+                    return False
+            else:
+                product.click()
+            self.waiter.for_element('product_detail', self.share_button)
             return True
         except Exception as e:
             logger.error(f"进入商品详情页失败: {e}")
             return False
     
+    @timed('tiktok.copy_link')
     def share_product_link(self):
-        """分享商品链接"""
+        """分享商品链接，返回复制到设备剪贴板的新链接；剪贴板没有变化 (复制未成功) 时返回 False"""
         try:
             logger.info("开始分享商品链接...")
             
@@ -172,13 +272,19 @@ class TikTokPage:
                 logger.error("未找到分享按钮")
                 return False
             
-            time.sleep(2) # 等待分享菜单弹出
+            # 等待分享菜单弹出
+            self.waiter.for_element('share_panel', self.copy_link_option)
+            previous_clipboard = self.driver.get_clipboard_text()
             
             # 使用更长的等待时间来查找复制链接选项
             if self.helper.click_element_safe(self.copy_link_option, timeout=10):
+                # 剪贴板仍是上一个商品的链接时不能把它当作这个商品的链接
+                link = self.waiter.for_clipboard_change('clipboard', previous_clipboard)
+                if not link:
+                    logger.error("复制链接后剪贴板没有变化")
+                    return False
                 logger.info("商品链接已复制到剪贴板")
-                time.sleep(1) # 等待剪贴板更新
-                return True
+                return link
             else:
                 logger.error("未找到复制链接选项")
                 return False
@@ -187,11 +293,12 @@ class TikTokPage:
             logger.error(f"分享商品链接失败: {e}")
             return False
     
+    @timed('tiktok.go_back')
     def go_back(self):
         """返回上一页"""
         try:
             self.driver.back()
-            time.sleep(2)
+            self.waiter.for_page_stable('go_back')
             return True
         except Exception as e:
             logger.error(f"返回上一页失败: {e}")
@@ -266,8 +373,7 @@ class TikTokPage:
 
             # 滑动页面以加载更多商品
             logger.info("滑动页面以加载更多...")
-            self.helper.swipe_up()
-            time.sleep(3) # 等待新商品加载
+            self.helper.swipe_up() # 会等待新商品加载完成
 
         if not collected_links:
             logger.warning("未能收集到任何商品链接。")
@@ -277,59 +383,81 @@ class TikTokPage:
         return collected_links
 
 
-    def collect_and_share_links(self, share_service,config):
-        max_links = config['task']['max_products_to_process']
-        shared_links = []
-        processed_element_uids = set()
-        
-        base_xpath = '//android.widget.FrameLayout[starts-with(@resource-id,"com.zhiliaoapp.musically:id/")]/android.widget.FrameLayout/android.widget.FrameLayout/com.lynx.tasm.behavior.ui.view.UIComponent'
-        
-        # 临时测试
-        elements = self.driver.find_elements(
-        By.XPATH,
-        '//android.widget.FrameLayout[starts-with(@resource-id,"com.zhiliaoapp.musically:id/")]/android.widget.FrameLayout/android.widget.FrameLayout/com.lynx.tasm.behavior.ui.view.UIComponent')
-        
-        logger.info(f"找到 {len(elements)} 个元素")
-        for el in elements:
-            print(el)  # 打印文本
-            print(el.get_attribute("resourceId"))  # 打印属性
+    @timed('tiktok.collect_links')
+    def collect_and_share_links(self, share_service, config, product_index=None, checkpoint=None):
+        """
+        基于页面快照收集并分享商品链接。
+        每次滑动只拉取一次 page_source，在本地解析出全部商品卡片及其坐标，再按坐标点击。
+        之前任务已采集过的商品 (见 ProductIndex) 不会再进入详情页。
+        传入 checkpoint (RunCheckpoint) 时，每处理完一个商品、每滑动一次都会更新检查点；
+        检查点中已有进度时先滑动回上次的位置，跳过已处理的商品继续采集。
+        未传入 product_index 时按配置为本次调用打开索引并在结束时关闭；连续采集多次的任务应自己打开一个索引传入。
+        """
+        if product_index is not None:
+            return self._collect_and_share_links(share_service, config, product_index, checkpoint)
+        product_index = ProductIndex.from_config(config)
+        try:
+            return self._collect_and_share_links(share_service, config, product_index, checkpoint)
+        finally:
+            if product_index is not None:
+                product_index.close()
 
+    def _collect_and_share_links(self, share_service, config, product_index, checkpoint):
+        max_links = config['task']['max_products_to_process']
+        shared_links = list(checkpoint.links) if checkpoint else []
+        processed_card_keys = set(checkpoint.processed_keys) if checkpoint else set()
 
+        # 恢复后的第一屏可能全部是已处理的商品，此时不能据此判断已到列表底部
+        resumed_screen = bool(checkpoint and checkpoint.resuming)
+        if checkpoint and checkpoint.scroll_depth:
+            logger.info(f"从检查点恢复: 滑动 {checkpoint.scroll_depth} 次回到上次的位置，已有 {len(shared_links)} 个链接")
+            for _ in range(checkpoint.scroll_depth):
+                self.helper.swipe_up()
 
         while len(shared_links) < max_links:
-            new_links_on_this_scroll = 0
-            for i in range(5, 9):
+            new_cards_on_this_scroll = 0
+            snapshot = PageSnapshot.capture(self.driver)
+            if self.popup_sentinel.dismiss(snapshot):
+                self.waiter.for_page_stable('popup')
+                snapshot = PageSnapshot.capture(self.driver)
+            cards = snapshot.find_product_cards()
+            logger.info(f"当前页面快照中找到 {len(cards)} 个商品卡片")
+
+            for card in cards:
                 if len(shared_links) >= max_links:
                     break
-                
-                product_xpath = f"{base_xpath}[{i}]"
-                logger.info(f"商品XPATH: {product_xpath}")   
-                product = self.helper.find_element_safe((AppiumBy.XPATH, product_xpath), timeout=10)
-                
-                if not product:
+
+                if card.key in processed_card_keys:
                     continue
-                logger.info(f"找到商品: {product}")       
+                processed_card_keys.add(card.key)
+                new_cards_on_this_scroll += 1
+
+                fingerprint = card_fingerprint(card)
+                if product_index is not None and product_index.contains(fingerprint):
+                    logger.info(f"商品已在之前的任务中采集过，跳过: {card}")
+                    if checkpoint:
+                        checkpoint.mark_processed(card.key, fingerprint)
+                    continue
+                logger.info(f"处理商品: {card}")
+
+                shared_link = None
                 try:
-                    uid = (product.location['x'], product.location['y'], product.size['width'], product.size['height'])
-                    if uid in processed_element_uids:
-                        continue
-                    
-                    processed_element_uids.add(uid)
-                    
-                    if self.enter_product_detail(product):
-                        if self.share_product_link():
-                            # 从设备获取剪贴板内容，而不是主机
-                            link = self.driver.get_clipboard_text()
-                            if link and link.startswith('http'):
+                    if self.enter_product_detail(card):
+                        # 链接来自设备剪贴板，而不是主机
+                        link = self.share_product_link()
+                        if link:
+                            if link.startswith('http'):
                                 logger.info(f"成功获取到链接: {link}")
                                 if share_service.share_link(link):
                                     shared_links.append(link)
-                                    new_links_on_this_scroll += 1
+                                    shared_link = link
+                                    if product_index is not None:
+                                        product_index.add(fingerprint, link)
                                 else:
                                     logger.warning(f"分享链接失败: {link}")
                             else:
                                 logger.warning(f"从剪贴板获取的链接无效: {link}")
-                        
+
                         self.driver_manager.switch_to_app(config['tiktok']['app_package'])
                         self.go_back()
                         # 判断是否在视频页
@@ -337,18 +465,35 @@ class TikTokPage:
                             self.go_back()
 
                 except Exception as e:
-                    logger.error(f"处理索引 {i} 的产品时出错: {e}")
+                    logger.error(f"处理商品 {card.key} 时出错: {e}")
                     self.driver_manager.switch_to_app(config['tiktok']['app_package'])
                     self.go_back()
 
+                # 点击、进入详情和分享在会话崩溃时只返回 False，所以没拿到链接时确认会话仍然可用；
+                # 会话已失效则抛出异常，该商品不记入检查点，恢复后重新处理
+                if shared_link is None and not self.driver_manager.is_alive():
+                    raise WebDriverException(f"Appium会话已失效，商品 {card.key} 未处理完成")
+                if checkpoint:
+                    checkpoint.mark_processed(card.key, fingerprint, shared_link)
+                event_bus.publish('product', {'card': card.key, 'link': shared_link, 'links': len(shared_links),
+                                              'max_products': max_links,
+                                              'image': config['task'].get('pc_image_path'),
+                                              'job': config['task'].get('job_id')})
+
             if len(shared_links) >= max_links:
                 break
 
-            if new_links_on_this_scroll == 0:
+            # 已采集过而被跳过的商品也算作新出现的卡片，列表继续向下滑动
+            if new_cards_on_this_scroll == 0 and not resumed_screen:
                 logger.info("在当前页面未发现任何新产品，认为已到达列表底部。")
                 break
-            
+            resumed_screen = False
+
+            # 没有新链接时 share_link 不会被调用，由这里按时发送攒批中的链接
+            share_service.flush_if_due()
+            # swipe_up 会等待列表停止滚动
             self.helper.swipe_up()
-            time.sleep(3)
-            
+            if checkpoint:
+                checkpoint.mark_scrolled()
+
         return shared_links
@@ -1,32 +1,47 @@
 from selenium.webdriver.common.by import By
 from appium.webdriver.common.appiumby import AppiumBy
 from utils.element_helper import ElementHelper
+from utils.waiter import Waiter
+from utils.locator_registry import locator_registry
 from loguru import logger
-import time
 import pyperclip
 
 
 class WeChatPage:
     """微信页面操作类"""
     
-    def __init__(self, driver):
+    def __init__(self, driver, waiter=None):
         self.driver = driver
-        self.helper = ElementHelper(driver)
+        self.waiter = waiter or Waiter(driver)
+        self.helper = ElementHelper(driver, waiter=self.waiter)
         
         # 页面元素定位器
         self.search_button = (AppiumBy.ID, "com.tencent.mm:id/action_option_search")
         self.search_input = (AppiumBy.ID, "com.tencent.mm:id/search_input")
         self.contact_item = (AppiumBy.XPATH, "//android.widget.TextView[contains(@text, '{}')]")
-        self.message_input = (AppiumBy.XPATH, "//android.widget.EditText[@text='请输入消息内容']")
-        self.send_button = (AppiumBy.XPATH, "//android.widget.Button[@text='发送']")
-        self.paste_option = (AppiumBy.XPATH, "//android.widget.TextView[@text='粘贴']")
+        locator_registry.register_many({
+            'wechat.message_input': [
+                (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().className("android.widget.EditText").text("请输入消息内容")'),
+                (AppiumBy.XPATH, "//android.widget.EditText[@text='请输入消息内容']"),
+            ],
+            'wechat.send_button': [
+                (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().className("android.widget.Button").text("发送")'),
+                (AppiumBy.XPATH, "//android.widget.Button[@text='发送']"),
+            ],
+            'wechat.paste_option': [
+                (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().className("android.widget.TextView").text("粘贴")'),
+                (AppiumBy.XPATH, "//android.widget.TextView[@text='粘贴']"),
+            ],
+        })
+        self.message_input = 'wechat.message_input'
+        self.send_button = 'wechat.send_button'
+        self.paste_option = 'wechat.paste_option'
     
     def open_wechat(self):
         """打开微信"""
         try:
             logger.info("正在打开微信...")
-            time.sleep(3)
-            return True
+            return self.waiter.for_element('wechat_home', self.search_button) is not None
         except Exception as e:
             logger.error(f"打开微信失败: {e}")
             return False
@@ -44,20 +59,19 @@ class WeChatPage:
                 logger.error("未找到顶部的搜索图标")
                 return False
             
-            time.sleep(1)
+            self.waiter.for_element('wechat_search', self.search_input)
             
             # 输入联系人名称
             if not self.helper.input_text_safe(self.search_input, contact_name):
                 logger.error("输入联系人名称失败")
                 return False
             
-            time.sleep(2)
-            
             # 点击搜索结果中的联系人
             contact_locator = (AppiumBy.XPATH, f"//android.widget.TextView[contains(@text, '{contact_name}')]")
+            self.waiter.for_element('wechat_search', contact_locator)
             if self.helper.click_element_safe(contact_locator):
                 logger.info(f"成功找到并点击联系人: {contact_name}")
-                time.sleep(2)
+                self.waiter.for_element('wechat_chat', self.message_input)
                 return True
             else:
                 logger.error(f"未找到联系人: {contact_name}")
@@ -67,8 +81,8 @@ class WeChatPage:
             logger.error(f"搜索联系人失败: {e}")
             return False
     
-    def send_message(self, message):
-        """发送消息，优先使用剪贴板内容"""
+    def send_message(self, message, prefer_clipboard=True):
+        """发送消息，默认优先使用剪贴板内容；prefer_clipboard=False 时发送 message"""
         try:
             logger.info("发送消息...")
             
@@ -78,7 +92,7 @@ class WeChatPage:
                 return False
             
             # 直接将剪贴板内容设置为元素的值
-            clipboard_content = pyperclip.paste()
+            clipboard_content = pyperclip.paste() if prefer_clipboard else None
             if clipboard_content:
                 message_input.set_value(clipboard_content)
                 logger.info("已将剪贴板内容粘贴到输入框。")
@@ -89,8 +103,6 @@ class WeChatPage:
                 logger.warning("剪贴板和消息参数均为空，无可发送内容。")
                 return False
 
-            time.sleep(1)
-
             if self.helper.click_element_safe(self.send_button):
                 logger.info("消息发送成功")
                 return True
@@ -106,9 +118,9 @@ class WeChatPage:
         """返回聊天列表"""
         try:
             self.driver.back()
-            time.sleep(1)
+            self.waiter.for_page_stable('go_back')
             self.driver.back()
-            time.sleep(1)
+            self.waiter.for_page_stable('go_back')
             return True
         except Exception as e:
             logger.error(f"返回聊天列表失败: {e}")
@@ -0,0 +1,22 @@
+import shutil
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+
+
+@pytest.fixture(scope='session')
+def web_app(tmp_path_factory):
+    """
+    导入 Web 服务 (app 模块)。
+    app 在当前目录下创建上传目录、结果目录和任务队列，所以整个测试会话都在同一个临时目录中运行它 (不是项目目录)。
+    """
+    workdir = tmp_path_factory.mktemp('web')
+    shutil.copy(ROOT / 'config.yaml', workdir / 'config.yaml')
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(workdir)
+        import app
+        yield app
@@ -0,0 +1,48 @@
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+from utils.backends import BackendRegistry
+
+ROOT = Path(__file__).parent.parent
+# 导入 app (不含解释器启动) 的时间上限，秒；之前会连带导入整个自动化依赖
+IMPORT_BUDGET = 1.0
+HEAVY_MODULES = ('automation_task', 'link_opener', 'appium', 'selenium', 'playwright', 'pyperclip')
+
+
+def test_backends_are_imported_on_first_use(tmp_path, monkeypatch):
+    (tmp_path / 'fake_backend.py').write_text("def run(x):\n    return x * 2\n", encoding='utf-8')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    registry = BackendRegistry()
+    registry.register('fake', 'fake_backend:run')
+
+    assert 'fake_backend' not in sys.modules and not registry.is_loaded('fake')
+    assert registry.get('fake')(21) == 42 and registry.is_loaded('fake')
+
+    registry.configure({'backends': {'missing': 'no_such_module:run'}})
+    with pytest.raises(ImportError):
+        registry.get('missing')
+    with pytest.raises(ValueError):
+        registry.register('bad', 'fake_backend')
+
+
+def test_web_app_imports_without_the_automation_stack(tmp_path):
+    shutil.copy(ROOT / 'config.yaml', tmp_path / 'config.yaml')
+    script = (
+        "import os, sys, time\n"
+        f"sys.path.insert(0, {str(ROOT)!r})\n"
+        "start = time.perf_counter()\n"
+        "import app\n"
+        "print(time.perf_counter() - start)\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+        "sys.stdout.flush()\n"
+        "os._exit(0)\n"
+    )
+    output = subprocess.run([sys.executable, '-c', script], cwd=tmp_path, capture_output=True, text=True,
+                            timeout=60, check=True).stdout.splitlines()
+
+    assert output[1] == ''
+    assert float(output[0]) < IMPORT_BUDGET
@@ -0,0 +1,63 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import automation_task
+from benchmarks.fake_device import FakeDriverManager, FakeTikTokDevice
+from benchmarks.run_benchmarks import automation_config, make_search_image
+from utils.session_manager import session_manager
+
+
+class PushRecordingDevice(FakeTikTokDevice):
+    """记录推送到设备的文件"""
+
+    def __init__(self, pushes, **kwargs):
+        super().__init__(**kwargs)
+        self.pushes = pushes
+
+    def push_file(self, destination_path, base64data=None, source_path=None):
+        self.pushes.append(destination_path)
+        super().push_file(destination_path, base64data, source_path)
+
+
+def test_resolve_image_paths(tmp_path):
+    for name in ('b.jpg', 'a.PNG', 'notes.txt', 'c.jpeg'):
+        (tmp_path / name).write_bytes(b'')
+
+    assert automation_task.resolve_image_paths(str(tmp_path)) == \
+        [str(tmp_path / 'a.PNG'), str(tmp_path / 'b.jpg'), str(tmp_path / 'c.jpeg')]
+    assert automation_task.resolve_image_paths('single.jpg') == ['single.jpg']
+    assert automation_task.resolve_image_paths(('x.jpg', 'y.jpg')) == ['x.jpg', 'y.jpg']
+    assert automation_task.resolve_image_paths(None) == []
+    assert automation_task.execute_batch_automation({}, []) == {}
+
+
+def test_batch_pushes_every_image_before_its_search(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pushes = []
+
+    def factory(config, device):
+        manager = FakeDriverManager(config, device)
+
+        def create():
+            manager.driver = PushRecordingDevice(pushes, latency=0, launch_time=0, push_bandwidth=0)
+            manager.driver.activate_app(config['tiktok']['app_package'])
+            return manager.driver
+        manager.create_driver = create
+        return manager
+
+    monkeypatch.setattr(session_manager, 'factory', factory)
+    images = [make_search_image(str(tmp_path / f"{name}.jpg"), size=(200 + i * 10, 200))
+              for i, name in enumerate(('first', 'second'))]
+    config = automation_config(None, 2)
+    config['image_push'] = {'cache_dir': str(tmp_path / 'image_cache')}
+
+    # 同一批图片连续搜索两轮: 第二轮时图片都已在设备上，仍要在各自的搜索前重新推送，
+    # 不能依赖 touch 把缓存的图片刷新为相册第一张
+    for _ in range(2):
+        results = automation_task.execute_batch_automation(config, images)
+        assert list(results) == images
+        assert all(len(links) == 2 for links in results.values())
+
+    assert len(pushes) == 4
+    assert pushes[0] == pushes[2] != pushes[1] == pushes[3]
@@ -0,0 +1,55 @@
+import asyncio
+import sys
+import types
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.run_benchmarks import PhaseTimer, bench_automation, compare_results, percentile
+
+
+def test_percentile_interpolates():
+    assert percentile([], 50) is None
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert abs(percentile(list(range(1, 101)), 95) - 95.05) < 1e-9
+
+
+def test_phase_timer_wraps_sync_and_async_functions():
+    module = types.SimpleNamespace()
+    module.work = lambda ok: ok
+
+    async def async_work(ok):
+        return ok
+    module.async_work = async_work
+
+    timer = PhaseTimer({'work': (module, 'work'), 'async_work': (module, 'async_work')})
+    with timer.patched():
+        module.work(True)
+        module.work(False)
+        asyncio.run(module.async_work(True))
+
+    assert module.work(True) is True  # 恢复原函数
+    assert timer.phases()['work']['count'] == 2
+    assert timer.successes == {'work': 1, 'async_work': 1}
+
+
+def test_compare_results_flags_p95_regressions_only():
+    baseline = {'suites': {'automation': {'phases': {
+        'go_back': {'p95': 0.30}, 'open_shop': {'p95': 0.010}, 'push_image': {'p95': 1.0},
+    }}}}
+    current = {'suites': {'automation': {'phases': {
+        'go_back': {'p95': 0.50}, 'open_shop': {'p95': 0.030}, 'push_image': {'p95': 1.1}, 'new_phase': {'p95': 9},
+    }}}}
+
+    # open_shop 慢了 3 倍但只差 20ms，不算退化
+    assert compare_results(current, baseline, threshold=0.2) == [('automation', 'go_back', 0.30, 0.50)]
+
+
+def test_automation_benchmark_on_fake_device():
+    result = bench_automation(iterations=1, max_products=2, latency=0)
+
+    phases = result['phases']
+    for phase in ('session', 'reset_to_home', 'open_shop', 'push_image', 'image_search', 'collect_links', 'total'):
+        assert phases[phase]['count'] == 1
+    assert phases['product_detail']['count'] == 2
+    assert result['links_per_min'] > 0
@@ -0,0 +1,98 @@
+import os
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from selenium.common.exceptions import WebDriverException
+
+import automation_task
+from benchmarks.fake_device import FakeDriverManager, FakeTikTokDevice
+from benchmarks.run_benchmarks import automation_config, make_search_image
+from utils.checkpoint import RunCheckpoint
+from utils.session_manager import session_manager
+
+
+class CrashingDevice(FakeTikTokDevice):
+    """第 crash_on_tap 次点击商品时 UiAutomator2 崩溃，之后所有请求都失败"""
+
+    def __init__(self, crash_on_tap, **kwargs):
+        super().__init__(**kwargs)
+        self.crash_on_tap = crash_on_tap
+        self.taps = 0
+        self.crashed = False
+
+    def round_trip(self):
+        if self.crashed:
+            raise WebDriverException("instrumentation process is not running (probably crashed)")
+        super().round_trip()
+
+    def tap(self, positions):
+        self.taps += 1
+        if self.taps == self.crash_on_tap:
+            self.crashed = True
+        super().tap(positions)
+
+
+def crashing_session_factory(monkeypatch, devices, crash_on_tap):
+    def factory(config, device):
+        manager = FakeDriverManager(config, device)
+
+        def create():
+            # 只有第一个会话会崩溃
+            manager.driver = CrashingDevice(crash_on_tap=crash_on_tap if not devices else 0,
+                                            latency=0, launch_time=0, push_bandwidth=0)
+            manager.driver.activate_app(config['tiktok']['app_package'])
+            devices.append(manager.driver)
+            return manager.driver
+        manager.create_driver = create
+        return manager
+
+    monkeypatch.setattr(session_manager, 'factory', factory)
+
+
+def test_run_resumes_from_checkpoint_after_session_crash(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    devices = []
+    crashing_session_factory(monkeypatch, devices, crash_on_tap=4)
+    config = automation_config(make_search_image(str(tmp_path / 'search.jpg'), size=(200, 200)), 6)
+    config['task']['checkpoint_dir'] = str(tmp_path / 'checkpoints')
+
+    links = automation_task.execute_automation(config)
+
+    assert len(devices) == 2
+    assert len(links) == 6
+    assert len(set(links)) == 6
+    # 第一个会话在第 4 个商品崩溃，前 3 个商品没有在新会话中重新处理
+    assert devices[1].taps == 3
+    # 成功完成的任务不保留检查点
+    assert os.listdir(tmp_path / 'checkpoints') == []
+
+
+def test_product_being_processed_when_the_session_crashed_is_collected_after_resume(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    devices = []
+    crashing_session_factory(monkeypatch, devices, crash_on_tap=4)
+    # 配额等于商品总数: 崩溃时的商品如果被记为已处理，就再也采集不到
+    config = automation_config(make_search_image(str(tmp_path / 'search.jpg'), size=(200, 200)), 10)
+    config['task']['checkpoint_dir'] = str(tmp_path / 'checkpoints')
+
+    links = automation_task.execute_automation(config)
+
+    assert len(links) == 10
+    assert 'https://vt.tiktok.com/product1-1/' in links
+
+
+def test_checkpoint_round_trip(tmp_path):
+    config = {'task': {'checkpoint_dir': str(tmp_path), 'pc_image_path': 'a.jpg'}}
+    checkpoint = RunCheckpoint.create(config, 'out.txt')
+    checkpoint.mark_processed('card-1', 'card:abc', 'https://vt.tiktok.com/1/')
+    checkpoint.mark_processed('card-2')
+    checkpoint.mark_scrolled()
+
+    loaded = RunCheckpoint.load(checkpoint.path)
+
+    assert loaded.resuming
+    assert loaded.image_path == 'a.jpg'
+    assert loaded.processed_keys == ['card-1', 'card-2']
+    assert loaded.links == ['https://vt.tiktok.com/1/']
+    assert loaded.scroll_depth == 1
@@ -0,0 +1,54 @@
+import sys
+import threading
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+import yaml
+from utils.config_store import ConfigStore
+
+
+def write_config(path, max_products=2):
+    path.write_text(yaml.safe_dump({'task': {'max_products_to_process': max_products, 'contact_name': '文件传输助手'},
+                                    'devices': [{'udid': 'a'}]}, allow_unicode=True), encoding='utf-8')
+
+
+def test_snapshots_are_cached_until_the_file_changes(tmp_path):
+    path = tmp_path / 'config.yaml'
+    write_config(path)
+    store = ConfigStore(str(path))
+
+    first = store.get()
+    assert store.get() is first and store.loads == 1
+    with pytest.raises(TypeError):
+        first['task']['max_products_to_process'] = 5
+    mutable = store.copy()
+    mutable['task']['max_products_to_process'] = 5
+    mutable['devices'].append({'udid': 'b'})
+    assert first['task']['max_products_to_process'] == 2
+
+    # 外部修改文件 (大小不同) 后重新解析
+    write_config(path, max_products=100)
+    assert store.get()['task']['max_products_to_process'] == 100 and store.loads == 2
+
+
+def test_concurrent_updates_are_serialized_and_atomic(tmp_path):
+    path = tmp_path / 'config.yaml'
+    write_config(path, max_products=0)
+    store = ConfigStore(str(path))
+
+    def increment():
+        for _ in range(20):
+            store.update(lambda config: config['task'].update(
+                max_products_to_process=config['task']['max_products_to_process'] + 1))
+
+    threads = [threading.Thread(target=increment) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    saved = yaml.safe_load(path.read_text(encoding='utf-8'))
+    assert saved['task'] == {'max_products_to_process': 100, 'contact_name': '文件传输助手'}
+    assert ConfigStore(str(path)).get() == store.get()
+    assert [p.name for p in tmp_path.iterdir()] == ['config.yaml']
@@ -0,0 +1,153 @@
+import sys
+import threading
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.device_pool import DevicePool, device_configs, plan_jobs, collect_links
+from utils.driver_manager import DriverManager
+
+
+CONFIG = {
+    'device': {
+        'platform_name': 'Android',
+        'platform_version': '13',
+        'device_name': 'default',
+        'automation_name': 'UiAutomator2',
+        'no_reset': True,
+        'full_reset': False,
+    },
+    'devices': [
+        {'device_name': 'phone-a', 'udid': 'phone-a', 'system_port': 8200},
+        {'device_name': 'phone-b', 'udid': 'phone-b', 'system_port': 8201},
+        {'device_name': 'phone-c', 'udid': 'phone-c', 'system_port': 8202},
+    ],
+    'task': {'max_products_to_process': 2},
+}
+
+
+class FakeDriver:
+    """只记录所属设备的假驱动"""
+
+    def __init__(self, udid):
+        self.udid = udid
+
+
+def fake_worker(delay=0.05):
+    used_drivers = []
+    lock = threading.Lock()
+
+    def worker(config, device, job):
+        driver_manager = DriverManager(config=config, device=device)
+        driver_manager.driver = FakeDriver(driver_manager.device['udid'])
+        with lock:
+            used_drivers.append(driver_manager.driver)
+        time.sleep(delay)
+        return [f"https://vt.tiktok.com/{driver_manager.driver.udid}/{job.image_path}"]
+
+    return worker, used_drivers
+
+
+def test_device_configs_merge_defaults():
+    devices = device_configs(CONFIG)
+
+    assert [d['udid'] for d in devices] == ['phone-a', 'phone-b', 'phone-c']
+    assert all(d['platform_version'] == '13' for d in devices)
+    assert device_configs({'device': CONFIG['device']}) == [CONFIG['device']]
+
+
+def test_plan_jobs_does_not_shard_quota_without_images():
+    # 没有搜索图片时各设备看到的商品相同，拆分配额只会重复采集
+    jobs = plan_jobs([], 7, 3)
+
+    assert [job.max_products for job in jobs] == [7]
+    assert jobs[0].image_path is None
+    assert plan_jobs([], 0, 3) == []
+
+
+def test_pool_runs_images_in_parallel_on_all_devices():
+    worker, used_drivers = fake_worker()
+    images = [f"img{i}.jpg" for i in range(6)]
+
+    start = time.perf_counter()
+    jobs = DevicePool(CONFIG, worker=worker).run(plan_jobs(images, 2, 3))
+    elapsed = time.perf_counter() - start
+
+    assert all(job.succeeded for job in jobs)
+    assert len(collect_links(jobs)) == 6
+    assert {driver.udid for driver in used_drivers} == {'phone-a', 'phone-b', 'phone-c'}
+    # 6 个任务 3 台设备，约 2 轮即可完成，串行需要 6 轮
+    assert elapsed < 6 * 0.05
+
+
+def test_failed_job_is_retried_on_another_device():
+    worker, _ = fake_worker(delay=0.01)
+
+    def flaky_worker(config, device, job):
+        if device['udid'] == 'phone-a':
+            raise RuntimeError("UiAutomator2 crashed")
+        return worker(config, device, job)
+
+    pool = DevicePool(CONFIG, worker=flaky_worker, retry_delay=0.5)
+    jobs = pool.run(plan_jobs(["a.jpg", "b.jpg", "c.jpg"], 1, 3))
+
+    assert all(job.succeeded for job in jobs)
+    assert all(job.device != 'phone-a' for job in jobs)
+
+
+def test_requeued_job_runs_after_other_devices_finished():
+    config = dict(CONFIG, devices=CONFIG['devices'][:2])
+    calls = []
+    lock = threading.Lock()
+
+    def worker(config, device, job):
+        with lock:
+            calls.append(device['udid'])
+            first = len(calls) == 1
+        if first:
+            # 另一台设备早已处理完自己的任务，重试任务放回队列时它仍要领取
+            time.sleep(0.2)
+            raise RuntimeError("UiAutomator2 crashed")
+        return [f"https://vt.tiktok.com/{device['udid']}/{job.image_path}"]
+
+    start = time.perf_counter()
+    jobs = DevicePool(config, worker=worker, retry_delay=5).run(plan_jobs(["a.jpg", "b.jpg"], 1, 2))
+    elapsed = time.perf_counter() - start
+
+    assert all(job.succeeded for job in jobs)
+    retried = [job for job in jobs if job.attempts == 2]
+    assert len(retried) == 1 and retried[0].device != calls[0]
+    # 暂停中的设备不会拖住整个设备池
+    assert elapsed < 2
+
+
+def test_failing_device_stays_in_service():
+    config = dict(CONFIG, devices=CONFIG['devices'][:1])
+    failures = ['UiAutomator2 crashed']
+
+    def worker(config, device, job):
+        if failures:
+            raise RuntimeError(failures.pop())
+        return [f"https://vt.tiktok.com/{device['udid']}/{job.image_path}"]
+
+    jobs = DevicePool(config, worker=worker, retry_delay=0.05).run(plan_jobs(["a.jpg", "b.jpg", "c.jpg"], 1, 1))
+
+    # 唯一的设备出错一次后暂停片刻，继续处理重试任务和剩余任务
+    assert all(job.succeeded and job.device == 'phone-a' for job in jobs)
+    assert sum(job.attempts for job in jobs) == 4
+
+
+def test_device_is_retired_after_repeated_failures():
+    config = dict(CONFIG, devices=CONFIG['devices'][:1])
+    calls = []
+
+    def worker(config, device, job):
+        calls.append(job.image_path)
+        raise RuntimeError("device offline")
+
+    pool = DevicePool(config, worker=worker, max_attempts=5, retry_delay=0.01, max_device_failures=3)
+    jobs = pool.run(plan_jobs(["a.jpg"], 1, 1))
+
+    assert not jobs[0].succeeded
+    assert len(calls) == 3
+    assert collect_links(jobs) is None
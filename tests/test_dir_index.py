@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.dir_index import DirectoryIndex, parse_time
+
+
+def make_file(folder, name, mtime):
+    path = folder / name
+    path.write_text(name, encoding='utf-8')
+    os.utime(path, (mtime, mtime))
+
+
+def test_index_rescans_only_when_the_folder_changes(tmp_path):
+    for n in range(3):
+        make_file(tmp_path, f"collected_links_2024010{n + 1}.jsonl", 1704067200 + n * 86400)
+    index = DirectoryIndex(str(tmp_path), accept=lambda name: name.endswith('.jsonl'), min_interval=0)
+
+    assert index.names() == ['collected_links_20240103.jsonl', 'collected_links_20240102.jsonl',
+                             'collected_links_20240101.jsonl']
+    etag = index.etag
+    for _ in range(5):
+        index.query()
+    assert index.scans == 1
+
+    make_file(tmp_path, 'notes.txt', 1704067200)
+    assert len(index) == 3 and index.etag == etag and index.scans == 2
+    make_file(tmp_path, 'collected_links_20240104.jsonl', 1704067200 + 3 * 86400)
+    assert index.names()[0] == 'collected_links_20240104.jsonl' and index.etag != etag
+    # 内容相同的目录 (如服务重启后) 得到相同的 etag
+    restarted = DirectoryIndex(str(tmp_path), accept=lambda name: name.endswith('.jsonl'))
+    restarted.refresh()
+    assert restarted.etag == index.etag
+
+
+def test_prefix_date_filters_and_paging(tmp_path):
+    for n in range(10):
+        make_file(tmp_path, f"{'a' if n % 2 else 'b'}-{n}.jpg", 1704067200 + n * 3600)
+    index = DirectoryIndex(str(tmp_path))
+
+    assert index.query(prefix='a', order='name') == (5, ['a-1.jpg', 'a-3.jpg', 'a-5.jpg', 'a-7.jpg', 'a-9.jpg'])
+    assert index.query(offset=2, limit=3) == (10, ['a-7.jpg', 'b-6.jpg', 'a-5.jpg'])
+    total, names = index.query(since=1704067200 + 3 * 3600, until=1704067200 + 6 * 3600)
+    assert total == 3 and names == ['a-5.jpg', 'b-4.jpg', 'a-3.jpg']
+    assert parse_time('2024-01-01T00:00:00+00:00') == 1704067200
+    assert parse_time('1704067200') == 1704067200
+
+
+def test_restat_picks_up_files_appended_in_place(tmp_path, monkeypatch):
+    now = time.time()
+    make_file(tmp_path, 'collected_links_20240101.jsonl', 1704067200)
+    make_file(tmp_path, 'collected_links_running.jsonl', now - 60)
+    static = DirectoryIndex(str(tmp_path), min_interval=0)
+    appended = DirectoryIndex(str(tmp_path), min_interval=0, restat=3600)
+    static.refresh()
+    appended.refresh()
+    etags = static.etag, appended.etag
+
+    # 目录没有变化时只重新 stat 最近修改过的文件，旧的结果文件不再 stat
+    stats = []
+    real_stat = os.stat
+    monkeypatch.setattr(os, 'stat', lambda path, *args, **kwargs: stats.append(str(path)) or
+                        real_stat(path, *args, **kwargs))
+    assert not appended.refresh()
+    assert stats == [str(tmp_path), os.path.join(str(tmp_path), 'collected_links_running.jsonl')]
+
+    # 正在写入的结果文件被追加一行: 目录的修改时间不变
+    path = tmp_path / 'collected_links_running.jsonl'
+    dir_mtime = real_stat(tmp_path).st_mtime_ns
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"link": "https://vt.tiktok.com/new/"}\n')
+    assert real_stat(tmp_path).st_mtime_ns == dir_mtime
+
+    assert not static.refresh() and static.etag == etags[0]
+    assert appended.refresh() and appended.etag != etags[1]
+    assert appended.names()[0] == 'collected_links_running.jsonl'
+    assert appended.stat('collected_links_running.jsonl')[1] == path.stat().st_size
+    assert appended.scans == 1
+
+
+def test_link_files_route(web_app):
+    folder = Path(web_app.LINKS_FOLDER)
+    folder.mkdir(exist_ok=True)
+    for n in range(3):
+        make_file(folder, f"collected_links_2023010{n + 1}.jsonl", 1672531200 + n * 86400)
+    web_app.result_index.refresh(force=True)
+    client = web_app.app.test_client()
+
+    query = '/api/link_files?prefix=collected_links_2023&since=2023-01-02T00:00:00%2B00:00&limit=1'
+    response = client.get(query)
+    assert response.status_code == 200
+    assert response.get_json() == ['collected_links_20230103.jsonl']
+    assert response.headers['X-Total-Count'] == '2'
+    assert response.headers['Last-Modified'] and response.headers['Cache-Control'] == 'no-cache'
+    etag = response.headers['ETag']
+
+    # 目录没有变化: 带 If-None-Match 的请求得到 304
+    response = client.get(query, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    # 不同的查询参数是不同的 ETag
+    assert client.get('/api/link_files?prefix=collected_links_2023').headers['ETag'] != etag
+
+    # 有新的结果文件后 ETag 变化
+    make_file(folder, 'collected_links_20230104.jsonl', 1672531200 + 3 * 86400)
+    web_app.result_index.refresh(force=True)
+    response = client.get(query, headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.get_json() == ['collected_links_20230104.jsonl']
+    assert response.headers['X-Total-Count'] == '3'
+
+    for bad in ('since=yesterday', 'until=2023-13-01', 'limit=ten', 'offset=x'):
+        response = client.get(f'/api/link_files?{bad}')
+        assert response.status_code == 400 and 'error' in response.get_json()
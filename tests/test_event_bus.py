@@ -0,0 +1,64 @@
+import json
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.event_bus import DirectoryWatcher, EventBus, sse_stream
+from utils.job_manager import JobManager
+
+
+def read_events(stream, count):
+    """从 SSE 响应体中读取最多 count 个事件 (遇到心跳即停止)，返回 (类型, 数据) 列表"""
+    events = []
+    for chunk in stream:
+        if chunk.startswith(': keep-alive'):
+            return events
+        if 'event: ' in chunk:
+            lines = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+            events.append((lines['event'], json.loads(lines['data'])))
+            if len(events) == count:
+                return events
+    return events
+
+
+def test_job_state_changes_and_progress_are_pushed_to_subscribers():
+    bus = EventBus()
+    stream = sse_stream(bus, ['job'], heartbeat=1,
+                        initial_events=[{'id': None, 'type': 'job', 'data': {'status': 'idle'}}])
+    assert next(stream) == "retry: 3000\n\n"
+    assert read_events(stream, 1) == [('job', {'status': 'idle'})]
+
+    def collect(job):
+        for n in range(1, 3):
+            job.set_progress(products=n)
+        return ['link']
+
+    manager = JobManager(events=bus)
+    manager.register('automation', collect)
+    job = manager.submit('automation')
+    bus.publish('images', ['ignored.jpg'])
+    manager.shutdown(wait=True)
+
+    events = read_events(stream, 5)
+    assert all(event_type == 'job' and data['id'] == job.id for event_type, data in events)
+    assert [data['status'] for _, data in events] == ['queued', 'running', 'running', 'running', 'completed']
+    assert [data['progress'].get('products') for _, data in events][2:] == [1, 2, 2]
+    assert events[-1][1]['results'] == ['link']
+
+    stream.close()
+    assert bus.subscriber_count == 0
+
+
+def test_directory_watcher_publishes_listing_only_when_folder_changes(tmp_path):
+    bus = EventBus()
+    subscription = bus.subscribe(['images'])
+    watcher = DirectoryWatcher(bus)
+    watcher.watch(str(tmp_path), 'images', lambda: sorted(p.name for p in tmp_path.iterdir()))
+
+    assert watcher.check() == []
+    (tmp_path / 'a.jpg').write_bytes(b'jpg')
+    assert watcher.check() == ['images']
+    assert watcher.check() == []
+
+    assert subscription.get(timeout=1)['data'] == ['a.jpg']
+    assert subscription.get(timeout=0.01) is None
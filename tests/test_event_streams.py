@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+
+def test_event_streams_are_capped(web_app):
+    app = web_app
+    client = app.app.test_client()
+
+    streams = [client.get('/api/events?types=job', buffered=False) for _ in range(app.MAX_EVENT_STREAMS)]
+    assert all(response.status_code == 200 for response in streams)
+    assert app.SERVER_THREADS > app.MAX_EVENT_STREAMS
+
+    # 所有流都占满时拒绝新的流，而不是再占用一个服务线程
+    refused = client.get('/api/events?types=job')
+    assert refused.status_code == 503 and refused.headers['Retry-After']
+
+    # 客户端断开后空出名额
+    streams.pop().close()
+    reopened = client.get('/api/events?types=job', buffered=False)
+    assert reopened.status_code == 200
+    assert next(reopened.response).startswith(b'retry:')
+
+    for response in streams + [reopened]:
+        response.close()
+    # 全部断开后名额全部归还
+    for _ in range(app.MAX_EVENT_STREAMS):
+        assert app.event_stream_slots.acquire(blocking=False)
+    for _ in range(app.MAX_EVENT_STREAMS):
+        app.event_stream_slots.release()
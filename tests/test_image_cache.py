@@ -0,0 +1,127 @@
+import os
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from PIL import Image
+from utils.image_cache import ImagePushCache
+
+
+class RecordingDriver:
+    """记录 push_file 和 execute_script 调用的假驱动；shell=False 模拟 Appium 未开启 --relaxed-security"""
+
+    def __init__(self, shell=True):
+        self.shell = shell
+        self.pushed = []
+        self.scripts = []
+        self.files = {}
+
+    def push_file(self, destination_path, base64data=None, source_path=None):
+        self.pushed.append((destination_path, source_path))
+        self.files[destination_path] = os.path.getsize(source_path)
+
+    def execute_script(self, script, *args):
+        if not self.shell:
+            raise RuntimeError('Potentially insecure feature has not been enabled')
+        self.scripts.append((script, args[0]['command']))
+        if args[0]['command'] == 'stat':
+            path = args[0]['args'][-1]
+            if path not in self.files:
+                raise RuntimeError(f"stat: '{path}': No such file or directory")
+            return f"{self.files[path]}\n"
+        return ''
+
+
+def make_image(path, size=(3000, 2000)):
+    Image.linear_gradient('L').resize(size).convert('RGB').save(path, 'JPEG', quality=95)
+    return str(path)
+
+
+def test_large_image_is_downscaled_before_push(tmp_path):
+    cache = ImagePushCache(str(tmp_path / 'cache'), max_side=640)
+    image = make_image(tmp_path / 'photo.jpg')
+    driver = RecordingDriver()
+
+    result = cache.push(driver, 'phone-a', image)
+
+    assert result.transferred
+    device_path, source_path = driver.pushed[0]
+    assert device_path == result.device_path and source_path != image
+    with Image.open(source_path) as pushed:
+        assert max(pushed.size) == 640
+    assert result.pushed_bytes == os.path.getsize(source_path) < result.original_bytes
+    assert result.bytes_saved == result.original_bytes - result.pushed_bytes
+    assert cache.total_saved == result.bytes_saved
+
+
+def test_already_small_image_is_pushed_as_is(tmp_path):
+    # 重新压缩只会变大的图片直接推送原图
+    cache = ImagePushCache(str(tmp_path / 'cache'), max_side=1280)
+    image = str(tmp_path / 'icon.png')
+    Image.new('RGB', (16, 16), 'white').save(image, 'PNG')
+    driver = RecordingDriver()
+
+    result = cache.push(driver, 'phone-a', image)
+
+    assert driver.pushed[0][1] == image and result.pushed_bytes == result.original_bytes
+    assert result.bytes_saved == 0
+
+
+def test_image_still_on_device_is_not_pushed_again(tmp_path):
+    cache = ImagePushCache(str(tmp_path / 'cache'))
+    image = make_image(tmp_path / 'photo.jpg')
+    driver = RecordingDriver()
+
+    first = cache.push(driver, 'phone-a', image)
+    second = cache.push(driver, 'phone-a', image)
+
+    # 先在设备上核对文件，再刷新为相册中最新的一张 (期间可能有新的截图或照片)
+    assert len(driver.pushed) == 1
+    assert [command for _, command in driver.scripts] == ['stat', 'touch', 'am']
+    assert not second.transferred and second.device_path == first.device_path
+    assert second.pushed_bytes == 0 and second.bytes_saved == second.original_bytes
+    # 另一台设备上没有该图片
+    assert cache.push(driver, 'phone-b', image).transferred
+    # 强制推送时即使命中也重新传输
+    assert cache.push(driver, 'phone-a', image, force=True).transferred
+
+
+def test_older_image_is_touched_instead_of_pushed(tmp_path):
+    cache = ImagePushCache(str(tmp_path / 'cache'))
+    first_image = make_image(tmp_path / 'first.jpg')
+    second_image = make_image(tmp_path / 'second.jpg', size=(2000, 2000))
+    driver = RecordingDriver()
+    cache.push(driver, 'phone-a', first_image)
+    cache.push(driver, 'phone-a', second_image)
+
+    # 不是最新的一张: 刷新修改时间并通知媒体库，而不是重新传输
+    result = cache.push(driver, 'phone-a', first_image)
+
+    assert not result.transferred and len(driver.pushed) == 2
+    assert [command for _, command in driver.scripts] == ['stat', 'touch', 'am']
+
+
+def test_image_deleted_on_device_is_pushed_again(tmp_path):
+    cache = ImagePushCache(str(tmp_path / 'cache'))
+    image = make_image(tmp_path / 'photo.jpg')
+    driver = RecordingDriver()
+    first = cache.push(driver, 'phone-a', image)
+
+    # 用户在手机上删除了这张图片，清单中仍有记录
+    del driver.files[first.device_path]
+    result = cache.push(driver, 'phone-a', image)
+
+    assert result.transferred and len(driver.pushed) == 2
+    assert [command for _, command in driver.scripts] == ['stat']
+
+
+def test_image_is_pushed_when_shell_is_unavailable(tmp_path):
+    # 无法在设备上核对文件时总是重新推送
+    cache = ImagePushCache(str(tmp_path / 'cache'))
+    image = make_image(tmp_path / 'photo.jpg')
+    driver = RecordingDriver(shell=False)
+    cache.push(driver, 'phone-a', image)
+
+    result = cache.push(driver, 'phone-a', image)
+
+    assert result.transferred and len(driver.pushed) == 2
@@ -0,0 +1,150 @@
+import sys
+import threading
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+from utils.job_manager import JobManager, JobRejected
+from utils.job_store import JobStore
+
+
+def test_admission_is_bounded_under_concurrent_submits():
+    release = threading.Event()
+    manager = JobManager()
+    manager.register('automation', lambda job: release.wait(5) and ['link'], workers=1, max_queued=1)
+
+    accepted, rejected = [], []
+
+    def submit():
+        try:
+            accepted.append(manager.submit('automation'))
+        except JobRejected:
+            rejected.append(True)
+
+    threads = [threading.Thread(target=submit) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(accepted) == 2 and len(rejected) == 8
+    release.set()
+    manager.shutdown(wait=True)
+    assert [job.status for job in manager.list('automation')] == ['completed', 'completed']
+    assert accepted[0].results == ['link']
+
+
+def test_progress_results_and_failures_are_tracked_per_job():
+    manager = JobManager()
+
+    def collect(job, count):
+        job.set_progress(phase='collecting', links=count)
+        return [f"link-{i}" for i in range(count)]
+
+    def broken(job):
+        raise RuntimeError('device offline')
+
+    manager.register('collect', collect, workers=2, max_queued=4)
+    manager.register('broken', broken)
+    ok = manager.submit('collect', count=3)
+    bad = manager.submit('broken')
+    with pytest.raises(JobRejected):
+        manager.submit('unknown')
+    manager.shutdown(wait=True)
+
+    assert manager.get(ok.id).to_dict()['progress'] == {'phase': 'collecting', 'links': 3}
+    assert ok.results == ['link-0', 'link-1', 'link-2'] and ok.finished_at >= ok.started_at
+    assert bad.status == 'failed' and bad.error == 'device offline'
+    assert [job.id for job in manager.list()] == [bad.id, ok.id]
+    assert manager.list(status='failed') == [bad]
+
+
+def test_queued_and_interrupted_jobs_survive_a_restart(tmp_path):
+    db_path = str(tmp_path / 'jobs.db')
+    # 上一次运行: 提交三个任务，第一个运行到一半时服务退出，第四个已经多次中断
+    store = JobStore(db_path)
+    for job_id in ('a', 'b', 'c', 'd'):
+        store.add(job_id, 'automation', {'image': f"{job_id}.jpg"})
+    store.claim('automation', 'old-worker')
+    store.close()
+    store = JobStore(db_path)
+    store._conn.execute("UPDATE jobs SET status = 'running', attempts = 3 WHERE id = 'd'")
+    store.close()
+
+    ran = []
+    manager = JobManager(JobStore(db_path), max_attempts=3)
+    manager.register('automation', lambda job, image: ran.append(image) or [image])
+    manager.shutdown(wait=True)
+
+    assert ran == ['a.jpg', 'b.jpg', 'c.jpg']
+    assert manager.get('a').attempts == 2 and manager.get('a').results == ['a.jpg']
+    assert manager.get('d').status == 'failed'
+    assert [job.status for job in JobManager(JobStore(db_path)).list()] == ['failed', 'completed', 'completed', 'completed']
+
+
+def test_concurrent_workers_never_claim_the_same_job(tmp_path):
+    db_path = str(tmp_path / 'jobs.db')
+    store = JobStore(db_path)
+    for n in range(100):
+        store.add(f"job-{n}", 'automation', {})
+
+    claimed = []
+
+    def worker(name):
+        # 每个工作线程使用自己的数据库连接，模拟多个进程
+        own_store = JobStore(db_path)
+        while True:
+            record = own_store.claim('automation', name)
+            if record is None:
+                return
+            claimed.append(record['id'])
+
+    threads = [threading.Thread(target=worker, args=(f"w{n}",)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == sorted(f"job-{n}" for n in range(100))
+
+
+def test_job_routes(web_app, monkeypatch):
+    # 没有工作线程的任务管理器: 提交的任务只排队不运行，每种类型最多排队 1 个
+    manager = JobManager()
+    manager.register('automation', lambda job, **params: [], workers=0, max_queued=1)
+    manager.register('link_opener', lambda job, **params: [], workers=0, max_queued=1)
+    monkeypatch.setattr(web_app, 'job_manager', manager)
+    client = web_app.app.test_client()
+
+    response = client.post('/api/jobs', json={'type': 'automation', 'pc_image_path': 'shoe.jpg'})
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job['type'] == 'automation' and job['status'] == 'queued'
+    assert job['params']['pc_image_path'].endswith('shoe.jpg')
+    assert client.post('/api/jobs', json={'type': 'unknown'}).status_code == 400
+    assert client.post('/api/jobs', json={'type': 'link_opener'}).status_code == 400
+
+    # 名额已满: /api/jobs 和 /start 都返回 429
+    assert client.post('/api/jobs', json={'type': 'automation'}).status_code == 429
+    response = client.post('/start', json={'pc_image_path': 'shoe.jpg'})
+    assert response.status_code == 429 and response.get_json()['status'] == 'error'
+
+    response = client.post('/open_links', json={'filename': 'collected_links_20240101.jsonl'})
+    assert response.status_code == 200
+    opener_id = response.get_json()['job_id']
+    assert client.post('/open_links', json={'filename': 'collected_links_20240101.jsonl'}).status_code == 429
+    assert client.post('/open_links', json={}).status_code == 400
+
+    jobs = client.get('/api/jobs').get_json()
+    assert [j['id'] for j in jobs] == [opener_id, job['id']]
+    assert [j['id'] for j in client.get('/api/jobs?type=automation&status=queued').get_json()] == [job['id']]
+    assert client.get('/api/jobs?status=completed').get_json() == []
+
+    response = client.get(f"/api/jobs/{job['id']}")
+    assert response.status_code == 200 and response.get_json()['id'] == job['id']
+    assert client.get('/api/jobs/missing').status_code == 404
+
+    # 取消排队中的任务后空出名额
+    assert client.post(f"/api/jobs/{job['id']}/cancel").status_code == 202
+    assert client.get(f"/api/jobs/{job['id']}").get_json()['status'] == 'cancelled'
+    assert client.post('/start', json={'pc_image_path': 'shoe.jpg'}).status_code == 200
@@ -0,0 +1,50 @@
+import sys
+import threading
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import jobs
+from utils.backends import backends
+from utils.event_bus import event_bus
+from utils.job_manager import Job
+
+
+def fake_automation(config, checkpoint_path=None):
+    """模拟设备池: 4 个设备线程同时上报商品，每个商品发布一次 product 事件"""
+    job_id = config['task']['job_id']
+    links = []
+    lock = threading.Lock()
+
+    def device(n):
+        for i in range(50):
+            link = f"https://vt.tiktok.com/{job_id}-{n}-{i}/" if i % 2 == 0 else None
+            if link:
+                with lock:
+                    links.append(link)
+            event_bus.publish('product', {'card': (n, i), 'link': link, 'job': job_id})
+
+    threads = [threading.Thread(target=device, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return links
+
+
+def test_concurrent_jobs_count_only_their_own_products(monkeypatch):
+    monkeypatch.setattr(jobs.config_store, 'copy', lambda: {'device': {'device_name': 'fake'},
+                                                            'task': {'max_products_to_process': 200}})
+    monkeypatch.setattr(backends, 'get', lambda name: fake_automation)
+    first, second = Job('automation'), Job('automation')
+    results = {}
+
+    threads = [threading.Thread(target=lambda job=job: results.update({job.id: jobs.run_automation_job(job)}))
+               for job in (first, second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for job in (first, second):
+        assert len(results[job.id]) == 100
+        assert job.progress == {'phase': 'done', 'products': 200, 'links': 100}
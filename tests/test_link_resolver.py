@@ -0,0 +1,85 @@
+import asyncio
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.link_resolver import LinkCache, LinkResolver, dedupe_resolved, resolve_unique_links
+
+# 短码 -> 商品ID，模拟 vt.tiktok.com 的跳转
+SHORT_CODES = {'aaa': '1729000000000001', 'bbb': '1729000000000001', 'ccc': '1729000000000002'}
+
+
+class RedirectHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_HEAD(self):
+        RedirectHandler.requests.append(self.path)
+        code = self.path.strip('/')
+        if self.path.startswith('/view/product/'):
+            self.send_response(200)
+        elif code in SHORT_CODES:
+            self.send_response(301)
+            self.send_header('Location', f"/view/product/{SHORT_CODES[code]}?region=US")
+        else:
+            self.send_response(404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_GET = do_HEAD
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server():
+    RedirectHandler.requests = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RedirectHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_short_links_resolve_to_unique_products_and_are_cached(tmp_path):
+    server, base = start_server()
+    try:
+        links = [f"{base}/aaa", f"{base}/bbb", f"{base}/aaa", f"{base}/ccc", f"{base}/missing"]
+        resolver = LinkResolver(LinkCache(str(tmp_path / 'cache.json')), concurrency=4, timeout=5)
+        resolved = asyncio.run(resolver.resolve(links))
+
+        assert [item.product_id for item in resolved] == \
+            ['1729000000000001', '1729000000000001', '1729000000000001', '1729000000000002', None]
+        assert resolved[4].error and resolved[4].url == f"{base}/missing"
+        unique = dedupe_resolved(resolved)
+        assert [item.url for item in unique] == [
+            f"{base}/view/product/1729000000000001?region=US",
+            f"{base}/view/product/1729000000000002?region=US",
+            f"{base}/missing",
+        ]
+        # 重复的短链接只请求一次
+        assert RedirectHandler.requests.count('/aaa') == 1
+
+        # 新进程读取磁盘缓存，不再发起请求
+        RedirectHandler.requests = []
+        config = {'resolver': {'cache_path': str(tmp_path / 'cache.json')}}
+        opened = asyncio.run(resolve_unique_links([f"{base}/bbb", f"{base}/ccc"], config))
+        assert opened == [f"{base}/view/product/1729000000000001?region=US",
+                          f"{base}/view/product/1729000000000002?region=US"]
+        assert RedirectHandler.requests == []
+    finally:
+        server.shutdown()
+
+
+def test_expired_entries_are_resolved_again(tmp_path):
+    server, base = start_server()
+    try:
+        cache = LinkCache(str(tmp_path / 'cache.json'), ttl=3600)
+        cache.put(f"{base}/ccc", f"{base}/view/product/1", '1')
+        cache._entries[f"{base}/ccc"]['resolved_at'] -= 7200
+
+        resolved = asyncio.run(LinkResolver(cache).resolve([f"{base}/ccc"]))
+
+        assert resolved[0].product_id == '1729000000000002' and not resolved[0].cached
+        assert RedirectHandler.requests[0] == '/ccc'
+    finally:
+        server.shutdown()
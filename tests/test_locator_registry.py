@@ -0,0 +1,105 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from appium.webdriver.common.appiumby import AppiumBy
+from utils.element_helper import ElementHelper
+from utils.locator_registry import LocatorRegistry
+
+BY_ID = (AppiumBy.ID, 'com.zhiliaoapp.musically:id/share')
+BY_DESC = (AppiumBy.ACCESSIBILITY_ID, '分享')
+BY_XPATH = (AppiumBy.XPATH, '//*[@content-desc="分享"]')
+
+
+class FakeTimeouts:
+    implicit_wait = 3
+
+
+class LocatorDriver:
+    """按定位值返回元素的假驱动: results 中没有的定位器找不到元素，值为异常时抛出"""
+
+    def __init__(self, results):
+        self.results = results
+        self.timeouts = FakeTimeouts()
+        self.lookups = []
+
+    def implicitly_wait(self, seconds):
+        self.timeouts.implicit_wait = seconds
+
+    def find_elements(self, by, value):
+        self.lookups.append((by, value))
+        result = self.results.get((by, value))
+        if isinstance(result, Exception):
+            raise result
+        return [result] if result else []
+
+
+def make_registry(tmp_path, save_every=50):
+    registry = LocatorRegistry(str(tmp_path / 'locator_stats.json'), save_every=save_every)
+    registry.register('share_button', [BY_XPATH, BY_DESC, BY_ID])
+    return registry
+
+
+def test_unmeasured_strategies_use_prior_latency(tmp_path):
+    registry = make_registry(tmp_path)
+
+    assert registry.ordered('share_button') == [BY_ID, BY_DESC, BY_XPATH]
+    assert registry.ordered('unknown') == []
+
+
+def test_measured_latency_and_hit_rate_reorder_strategies(tmp_path):
+    registry = make_registry(tmp_path)
+
+    # resource-id 在新版本中失效，accessibility id 命中
+    for _ in range(3):
+        registry.record('share_button', [(BY_ID, 0.04), (BY_DESC, 0.2)], BY_DESC)
+    assert registry.ordered('share_button') == [BY_DESC, BY_XPATH, BY_ID]
+
+    # XPath 实测比 accessibility id 更快
+    for _ in range(3):
+        registry.record('share_button', [(BY_XPATH, 0.1)], BY_XPATH)
+    assert registry.ordered('share_button')[0] == BY_XPATH
+
+    report = registry.report()['share_button']
+    assert report[0][1] == 1.0 and abs(report[0][2] - 0.1) < 1e-9
+    assert report[-1][1] == 0.0 and report[-1][2] is None
+
+
+def test_lookups_without_any_hit_are_not_recorded(tmp_path):
+    registry = make_registry(tmp_path)
+
+    registry.record('share_button', [(BY_ID, 0.05), (BY_DESC, 0.05), (BY_XPATH, 0.5)], None)
+
+    assert all(hit_rate == 0.0 for _, hit_rate, _ in registry.report()['share_button'])
+    assert registry.ordered('share_button') == [BY_ID, BY_DESC, BY_XPATH]
+
+
+def test_stats_are_saved_and_reloaded(tmp_path):
+    registry = make_registry(tmp_path, save_every=2)
+    registry.record('share_button', [(BY_ID, 0.04), (BY_DESC, 0.06)], BY_DESC)
+    assert not (tmp_path / 'locator_stats.json').exists()
+    # 每 save_every 次记录自动保存一次
+    registry.record('share_button', [(BY_ID, 0.04), (BY_DESC, 0.06)], BY_DESC)
+    assert (tmp_path / 'locator_stats.json').exists()
+
+    reloaded = make_registry(tmp_path)
+    assert reloaded.ordered('share_button') == [BY_DESC, BY_XPATH, BY_ID]
+    assert reloaded.report() == registry.report()
+
+
+def test_locate_falls_back_when_best_strategy_fails(tmp_path):
+    registry = make_registry(tmp_path)
+    element = object()
+    # 首选的 resource-id 查找出错，accessibility id 找不到，最终由 XPath 命中
+    driver = LocatorDriver({BY_ID: RuntimeError('socket hang up'), BY_XPATH: element})
+    helper = ElementHelper(driver, registry=registry)
+
+    assert helper.locate_once('share_button') is element
+    assert driver.lookups == [BY_ID, BY_DESC, BY_XPATH]
+    # 逐个尝试时关闭隐式等待，结束后恢复
+    assert driver.timeouts.implicit_wait == 3
+
+    # 下一次直接从命中的策略开始
+    driver.lookups = []
+    assert helper.locate_once('share_button') is element
+    assert driver.lookups == [BY_XPATH]
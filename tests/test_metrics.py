@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.metrics import MetricsRegistry, instrument_driver
+
+
+def test_render_prometheus_histogram():
+    registry = MetricsRegistry(buckets=(0.1, 1))
+    registry.observe('wait.go_back', 'wait', 0.05)
+    registry.observe('wait.go_back', 'wait', 0.5, error=True)
+
+    text = registry.render()
+
+    assert '# TYPE autocollect_span_seconds histogram' in text
+    assert 'autocollect_span_seconds_bucket{kind="wait",span="wait.go_back",le="0.1"} 1' in text
+    assert 'autocollect_span_seconds_bucket{kind="wait",span="wait.go_back",le="1"} 2' in text
+    assert 'autocollect_span_seconds_bucket{kind="wait",span="wait.go_back",le="+Inf"} 2' in text
+    assert 'autocollect_span_seconds_count{kind="wait",span="wait.go_back"} 2' in text
+    assert 'autocollect_span_errors_total{kind="wait",span="wait.go_back"} 1' in text
+
+
+def test_span_counts_exceptions_and_decorates_functions():
+    registry = MetricsRegistry()
+
+    @registry.timed('tiktok.open_shop')
+    def open_shop():
+        raise RuntimeError("no shop tab")
+
+    try:
+        open_shop()
+    except RuntimeError:
+        pass
+
+    assert registry.snapshot()[('tiktok.open_shop', 'navigation')][0] == 1
+    assert 'autocollect_span_errors_total{kind="navigation",span="tiktok.open_shop"} 1' in registry.render()
+
+
+def test_instrument_driver_times_every_command():
+    class Driver:
+        def execute(self, driver_command, params=None):
+            return {'value': driver_command}
+
+    registry = MetricsRegistry()
+    driver = instrument_driver(Driver(), registry)
+    instrument_driver(driver, registry)  # 重复调用不会重复计时
+
+    driver.execute('getPageSource')
+    driver.execute('findElements', {'using': 'id', 'value': 'x'})
+    driver.execute('getPageSource')
+
+    snapshot = registry.snapshot()
+    assert snapshot[('appium.getPageSource', 'device')][0] == 2
+    assert snapshot[('appium.findElements', 'device')][0] == 1
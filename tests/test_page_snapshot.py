@@ -0,0 +1,61 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.page_snapshot import PageSnapshot, parse_bounds
+
+
+CARD = 'com.lynx.tasm.behavior.ui.view.UIComponent'
+
+PAGE_SOURCE = f'''<?xml version="1.0" encoding="UTF-8"?>
+<hierarchy index="0" class="hierarchy" rotation="0" width="1080" height="2400">
+  <android.widget.FrameLayout index="0" resource-id="" bounds="[0,0][1080,2400]">
+    <android.widget.FrameLayout index="0" resource-id="com.zhiliaoapp.musically:id/g8d" bounds="[0,300][1080,2200]">
+      <android.widget.FrameLayout index="0" resource-id="" bounds="[0,300][1080,2200]">
+        <android.widget.FrameLayout index="0" resource-id="" bounds="[0,300][1080,2200]">
+          <{CARD} index="0" bounds="[0,300][540,1100]">
+            <android.widget.TextView text="Summer dress" bounds="[10,900][530,960]"/>
+            <android.widget.TextView text="$19.99" bounds="[10,970][530,1020]"/>
+          </{CARD}>
+          <{CARD} index="1" bounds="[540,300][1080,1100]" content-desc="Linen shirt $25.00"/>
+          <{CARD} index="2" bounds="[0,1100][540,1900]">
+            <android.widget.TextView text="Summer dress" bounds="[10,1700][530,1760]"/>
+            <android.widget.TextView text="$24.99" bounds="[10,1770][530,1820]"/>
+          </{CARD}>
+          <{CARD} index="3" bounds="[540,1900][1080,2700]">
+            <android.widget.TextView text="Cut off at the bottom" bounds="[550,2500][1070,2560]"/>
+          </{CARD}>
+          <{CARD} index="4" bounds="[0,1900][540,2100]"/>
+        </android.widget.FrameLayout>
+      </android.widget.FrameLayout>
+    </android.widget.FrameLayout>
+    <{CARD} index="1" bounds="[0,0][1080,200]">
+      <android.widget.TextView text="Not a product" bounds="[0,0][1080,200]"/>
+    </{CARD}>
+  </android.widget.FrameLayout>
+</hierarchy>'''
+
+
+def test_parse_bounds():
+    assert parse_bounds("[0,300][540,1100]") == (0, 300, 540, 1100)
+    assert parse_bounds("") is None
+    assert parse_bounds(None) is None
+
+
+def test_find_product_cards_returns_visible_cards_with_text():
+    cards = PageSnapshot(PAGE_SOURCE).find_product_cards()
+
+    assert [card.bounds for card in cards] == [
+        (0, 300, 540, 1100),
+        (540, 300, 1080, 1100),
+        (0, 1100, 540, 1900),
+    ]
+    assert cards[0].texts == ["Summer dress", "$19.99"]
+    assert cards[0].center == (270, 700)
+    assert cards[1].key == "Linen shirt $25.00"
+
+
+def test_card_keys_distinguish_products_in_same_slot():
+    cards = PageSnapshot(PAGE_SOURCE).find_product_cards()
+
+    assert len({card.key for card in cards}) == len(cards)
@@ -0,0 +1,113 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.page_snapshot import PageSnapshot
+from utils.popup_sentinel import PopupSentinel
+from utils.replay_driver import RecordingDriver, ReplayDriver
+from utils.waiter import Waiter
+
+
+def page(*nodes):
+    body = ''.join(
+        f'<android.widget.Button {attr}="{value}" enabled="{enabled}" bounds="{bounds}"/>'
+        for attr, value, bounds, enabled in nodes
+    )
+    return (f'<hierarchy><android.widget.FrameLayout bounds="[0,0][1080,2400]">{body}'
+            f'</android.widget.FrameLayout></hierarchy>')
+
+
+def button(value, bounds='[100,200][300,400]', attr='text', enabled='true'):
+    return attr, value, bounds, enabled
+
+
+class PopupDevice:
+    """弹窗设备: 点中关闭按钮后弹窗消失；sticky=True 时点击无效，弹窗一直存在"""
+
+    def __init__(self, label='我知道了', sticky=False):
+        self.label = label
+        self.sticky = sticky
+        self.popup = True
+        self.taps = []
+
+    @property
+    def page_source(self):
+        if self.popup:
+            return page(button('商城', '[0,0][200,100]'), button(self.label))
+        return page(button('商城', '[0,0][200,100]'))
+
+    def tap(self, positions):
+        self.taps.append(positions[0])
+        if positions[0] == (200, 300) and not self.sticky:
+            self.popup = False
+
+
+def test_exact_keywords_match_whole_label_case_insensitively():
+    sentinel = PopupSentinel(None)
+
+    assert sentinel.find(PageSnapshot(page(button('CLOSE')))) == (200, 300, 'CLOSE')
+    assert sentinel.find(PageSnapshot(page(button('  跳过 ', attr='content-desc')))) == (200, 300, '  跳过 ')
+    # 普通页面上包含关键字的文本不是弹窗按钮
+    assert sentinel.find(PageSnapshot(page(button('关闭通知设置')))) is None
+    # 不可点击或没有面积的按钮不处理
+    assert sentinel.find(PageSnapshot(page(button('关闭', enabled='false')))) is None
+    assert sentinel.find(PageSnapshot(page(button('关闭', bounds='[100,200][100,400]')))) is None
+
+
+def test_contains_match_and_config_keywords():
+    config = {'popups': {'keywords': ['Not now'], 'extra_keywords': ['稍后'], 'match': 'contains'}}
+    sentinel = PopupSentinel.from_config(None, config)
+
+    assert sentinel.keywords == ['Not now', '稍后']
+    assert sentinel.find(PageSnapshot(page(button('稍后提醒我'))))
+    assert sentinel.find(PageSnapshot(page(button('NOT NOW, THANKS'))))
+    assert sentinel.find(PageSnapshot(page(button('关闭')))) is None
+
+
+def test_observe_dismisses_popup_and_skips_pages_without_keywords():
+    device = PopupDevice()
+    sentinel = PopupSentinel(device)
+
+    assert sentinel.observe(page(button('商城'))) is False
+    assert sentinel.observe(device.page_source) is True
+    assert device.taps == [(200, 300)] and sentinel.dismissed == 1
+    assert sentinel.check_now() is False
+
+
+def test_repeat_guard_stops_tapping_a_button_that_never_goes_away():
+    device = PopupDevice(label='同意', sticky=True)
+    sentinel = PopupSentinel(device, max_repeats=2)
+
+    results = [sentinel.check_now() for _ in range(4)]
+
+    assert results == [True, True, False, False]
+    assert len(device.taps) == 2
+
+
+def test_sentinel_replays_recorded_popup(tmp_path):
+    recording = RecordingDriver(PopupDevice(), str(tmp_path))
+    assert PopupSentinel(recording).check_now() is True
+    assert PopupSentinel(recording).check_now() is False
+    recording.recorder.save()
+
+    replay = ReplayDriver(str(tmp_path))
+    sentinel = PopupSentinel(replay)
+    assert sentinel.check_now() is True and sentinel.dismissed == 1
+    assert sentinel.check_now() is False
+    assert not replay.unmatched
+
+
+def test_attached_sentinel_only_watches_list_and_shop_waits():
+    device = PopupDevice(label='关闭')
+    waiter = Waiter(device, poll_interval=0)
+    sentinel = PopupSentinel(device)
+    sentinel.attach(waiter)
+
+    # 商品详情页和分享面板的 "关闭" 按钮不是弹窗
+    waiter.until('share_panel', lambda: waiter.page_source() and False, max_wait=0)
+    waiter.page_source()
+    assert device.taps == [] and device.popup
+
+    waiter.for_page_stable('search_results_settled')
+    assert device.taps == [(200, 300)] and not device.popup
+    assert waiter.step is None
@@ -0,0 +1,114 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.driver_manager import DriverManager
+from utils.page_snapshot import ProductCard
+from utils.product_index import ProductIndex, card_fingerprint
+from pages.tiktok_page import TikTokPage
+from benchmarks.fake_device import FakeTikTokDevice
+
+
+class ListShareService:
+    def __init__(self):
+        self.links = []
+
+    def share_link(self, link):
+        self.links.append(link)
+        return True
+
+    def flush_if_due(self):
+        return True
+
+
+def test_contains_and_add_persist_across_runs(tmp_path):
+    db_path = str(tmp_path / 'index.db')
+    card = ProductCard(0, (0, 300, 1080, 1100), ['Summer  Dress', '$19.99'])
+    fingerprint = card_fingerprint(card)
+
+    index = ProductIndex(db_path)
+    assert not index.contains(fingerprint)
+    index.add(fingerprint, 'https://vt.tiktok.com/summerdress/')
+    # 重复添加只更新记录
+    index.add(fingerprint)
+    assert index.contains(fingerprint) and len(index) == 1
+    index.close()
+    index.close()
+
+    reopened = ProductIndex(db_path)
+    # 空白和大小写不同的同一张卡片指纹相同
+    same_card = ProductCard(1, (0, 1100, 1080, 1900), ['summer dress', '$19.99'])
+    assert reopened.contains(card_fingerprint(same_card))
+    reopened.close()
+
+
+def test_from_config_respects_skip_known_products(tmp_path):
+    config = {'task': {'skip_known_products': False, 'product_index_path': str(tmp_path / 'index.db')}}
+    assert ProductIndex.from_config(config) is None
+
+    config['task']['skip_known_products'] = True
+    index = ProductIndex.from_config(config)
+    assert index.db_path == str(tmp_path / 'index.db')
+    index.close()
+
+
+def test_known_products_are_skipped_by_fingerprint(tmp_path):
+    config = {
+        'device': {'device_name': 'fake'},
+        'tiktok': {'app_package': 'com.zhiliaoapp.musically'},
+        'task': {'max_products_to_process': 4, 'product_index_path': str(tmp_path / 'index.db')},
+        'image_push': {'cache_dir': str(tmp_path / 'image_cache')},
+    }
+
+    def collect(index=None):
+        device = FakeTikTokDevice(latency=0, launch_time=0, pages=2)
+        device.state = 'results'
+        driver_manager = DriverManager(config=config)
+        driver_manager.driver = device
+        share_service = ListShareService()
+        TikTokPage(driver_manager).collect_and_share_links(share_service, config, product_index=index)
+        return share_service.links
+
+    index = ProductIndex.from_config(config)
+    first = collect(index)
+    assert len(first) == 4 and len(index) == 4
+
+    # 同一个索引: 所有商品都已采集过，不再进入详情页
+    assert collect(index) == []
+    index.close()
+
+    # 未传入索引时按配置打开磁盘上的同一个索引
+    assert collect() == []
+
+
+def test_failed_copy_does_not_record_previous_link(tmp_path):
+    class StuckClipboardDevice(FakeTikTokDevice):
+        """第二个商品的复制链接没有生效，剪贴板仍是上一个商品的链接"""
+
+        def click(self, state):
+            if state == 'share' and self.product == 'Product 0-1':
+                self.state = 'detail'
+                return
+            super().click(state)
+
+    config = {
+        'device': {'device_name': 'fake'},
+        'tiktok': {'app_package': 'com.zhiliaoapp.musically'},
+        'task': {'max_products_to_process': 4, 'product_index_path': str(tmp_path / 'index.db'),
+                 'wait_max': {'clipboard': 0.2}},
+        'image_push': {'cache_dir': str(tmp_path / 'image_cache')},
+    }
+    device = StuckClipboardDevice(latency=0, launch_time=0, pages=2)
+    device.state = 'results'
+    driver_manager = DriverManager(config=config)
+    driver_manager.driver = device
+    share_service = ListShareService()
+    index = ProductIndex.from_config(config)
+    TikTokPage(driver_manager).collect_and_share_links(share_service, config, product_index=index)
+
+    assert share_service.links == ['https://vt.tiktok.com/product0-0/', 'https://vt.tiktok.com/product1-0/',
+                                   'https://vt.tiktok.com/product1-1/']
+    assert len(index) == 3
+    assert index.contains(card_fingerprint(ProductCard(0, (0, 0, 0, 0), ['Product 0-0'])))
+    assert not index.contains(card_fingerprint(ProductCard(1, (0, 0, 0, 0), ['Product 0-1'])))
+    index.close()
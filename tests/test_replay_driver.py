@@ -0,0 +1,83 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.driver_manager import DriverManager
+from utils.replay_driver import RecordingDriver, ReplayDriver
+from pages.tiktok_page import TikTokPage
+from benchmarks.fake_device import FakeTikTokDevice
+
+
+def results_device(cls=FakeTikTokDevice):
+    """停在搜索结果页的假设备: 两页搜索结果，每页两个商品"""
+    device = cls(latency=0, launch_time=0, pages=2)
+    device.state = 'results'
+    return device
+
+
+class ListShareService:
+    def __init__(self):
+        self.links = []
+
+    def share_link(self, link):
+        self.links.append(link)
+        return True
+
+    def flush_if_due(self):
+        return True
+
+
+def make_config(tmp_path):
+    return {
+        'device': {'device_name': 'fake'},
+        'tiktok': {'app_package': 'com.zhiliaoapp.musically'},
+        'task': {'max_products_to_process': 4, 'skip_known_products': False},
+        'image_push': {'cache_dir': str(tmp_path / 'image_cache')},
+    }
+
+
+def collect(driver, config):
+    driver_manager = DriverManager(config=config)
+    driver_manager.driver = driver
+    page = TikTokPage(driver_manager)
+    share_service = ListShareService()
+    links = page.collect_and_share_links(share_service, config)
+    return links, page.waiter
+
+
+def test_recorded_session_replays_same_links(tmp_path):
+    config = make_config(tmp_path)
+    capture_dir = tmp_path / 'capture'
+
+    recording = RecordingDriver(results_device(), str(capture_dir))
+    recorded_links, recorded_waiter = collect(recording, config)
+    recording.recorder.save()
+
+    replay = ReplayDriver(str(capture_dir))
+    replayed_links, replayed_waiter = collect(replay, config)
+
+    assert len(recorded_links) == 4
+    assert replayed_links == recorded_links
+    assert [r.name for r in replayed_waiter.records] == [r.name for r in recorded_waiter.records]
+    assert not replay.unmatched
+
+
+def test_replay_raises_recorded_errors(tmp_path):
+    class BrokenDevice(FakeTikTokDevice):
+        def get_clipboard_text(self):
+            raise RuntimeError("socket hang up")
+
+    recording = RecordingDriver(results_device(BrokenDevice), str(tmp_path))
+    try:
+        recording.get_clipboard_text()
+    except RuntimeError:
+        pass
+    recording.recorder.save()
+
+    replay = ReplayDriver(str(tmp_path))
+    try:
+        replay.get_clipboard_text()
+        raised = False
+    except Exception as e:
+        raised = 'socket hang up' in str(e)
+    assert raised
@@ -0,0 +1,43 @@
+import json
+import sys
+import threading
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.result_writer import ResultWriter, is_result_file, read_links, result_path
+
+
+def test_concurrent_jobs_share_one_file_without_interleaving(tmp_path):
+    path = str(tmp_path / 'collected_links_20240101120000.jsonl')
+
+    def job(device):
+        writer = ResultWriter.open(path, fsync='batch', fsync_every=5)
+        for i in range(50):
+            writer.write(f"https://vt.tiktok.com/{device}-{i}/", image='a.jpg', device=device)
+        writer.close()
+
+    threads = [threading.Thread(target=job, args=(f"phone-{n}",)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    records = [json.loads(line) for line in Path(path).read_text(encoding='utf-8').splitlines()]
+    assert len(records) == 200
+    assert {record['device'] for record in records} == {'phone-0', 'phone-1', 'phone-2', 'phone-3'}
+    assert all(record['image'] == 'a.jpg' and record['timestamp'] for record in records)
+    assert ResultWriter._registry == {}
+
+
+def test_txt_format_and_legacy_files_are_readable(tmp_path):
+    writer = ResultWriter.open(result_path('collected_links_1.txt', 'txt', str(tmp_path)), fmt='txt', fsync='always')
+    writer.write("https://vt.tiktok.com/a/", image='a.jpg', device='phone-a')
+    writer.write("https://vt.tiktok.com/b/")
+    writer.close()
+    legacy = tmp_path / 'links-0101120000.txt'
+    legacy.write_text("https://vt.tiktok.com/c/\n\n", encoding='utf-8')
+
+    assert read_links(writer.path) == ["https://vt.tiktok.com/a/", "https://vt.tiktok.com/b/"]
+    assert read_links(str(legacy)) == ["https://vt.tiktok.com/c/"]
+    assert is_result_file('collected_links_1.jsonl') and is_result_file(legacy.name)
+    assert not is_result_file('notes.txt')
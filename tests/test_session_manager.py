@@ -0,0 +1,89 @@
+import sys
+import threading
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+from utils.session_manager import SessionManager
+
+
+CONFIG = {
+    'appium': {'server_url': 'http://fake-appium'},
+    'device': {'device_name': 'pixel', 'udid': 'emulator-5554'},
+    'tiktok': {'app_package': 'com.zhiliaoapp.musically', 'app_activity': '.Splash'},
+}
+
+
+class StubDriver:
+    session_id = 'stub'
+
+
+class StubDriverManager:
+    """记录会话创建和退出的驱动管理器，alive 控制健康检查结果"""
+
+    created = 0
+
+    def __init__(self, config, device=None, fail=None):
+        self.config = config
+        self.fail = fail
+        self.alive = True
+        self.quit = False
+        self.driver = None
+
+    def create_driver(self):
+        if self.fail == 'raise':
+            raise ConnectionError('Appium服务不可达')
+        if self.fail == 'none':
+            return None
+        StubDriverManager.created += 1
+        self.driver = StubDriver()
+        return self.driver
+
+    def is_alive(self):
+        return self.alive
+
+    def quit_driver(self):
+        self.quit = True
+
+
+def test_healthy_session_is_reused_and_dead_session_recreated():
+    sessions = SessionManager(factory=lambda config, device: StubDriverManager(config, device))
+
+    first = sessions.acquire(CONFIG)
+    assert first.reused is False
+    sessions.release(first)
+    second = sessions.acquire(CONFIG)
+    assert second is first and second.reused is True
+    sessions.release(second)
+
+    first.alive = False
+    third = sessions.acquire(CONFIG)
+    assert third is not first and third.reused is False and first.quit
+    sessions.release(third)
+
+
+@pytest.mark.parametrize('failure', ['raise', 'none'])
+def test_failed_session_creation_releases_the_device(failure):
+    attempts = []
+
+    def factory(config, device):
+        attempts.append(device)
+        # 第一次创建失败，之后恢复正常
+        return StubDriverManager(config, device, fail=failure if len(attempts) == 1 else None)
+
+    sessions = SessionManager(factory=factory)
+    if failure == 'raise':
+        with pytest.raises(ConnectionError):
+            sessions.acquire(CONFIG)
+    else:
+        assert sessions.acquire(CONFIG) is None
+
+    # 设备没有被一直占用: 下一次获取不会阻塞，并重新创建会话
+    acquired = []
+    thread = threading.Thread(target=lambda: acquired.append(sessions.acquire(CONFIG)), daemon=True)
+    thread.start()
+    thread.join(5)
+    assert acquired, '设备锁没有被释放'
+    manager = acquired[0]
+    assert manager is not None and manager.reused is False and len(attempts) == 2
+    sessions.release(manager)
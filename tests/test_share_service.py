@@ -0,0 +1,103 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils import share_service as share_service_module
+from utils.share_service import ShareService
+
+
+class FakeDriverManager:
+    def __init__(self):
+        self.driver = object()
+        self.foreground = []
+
+    def switch_to_app(self, package):
+        self.foreground.append(package)
+
+    def terminate_app(self, package):
+        pass
+
+    def press_home(self):
+        pass
+
+
+class FakeWeChatPage:
+    sent = []
+    fail = False
+
+    def __init__(self, driver):
+        self.helper = self
+
+    def find_element_safe(self, locator, timeout=10):
+        return True  # 已在聊天窗口
+
+    def send_message(self, message, prefer_clipboard=True):
+        if FakeWeChatPage.fail:
+            return False
+        FakeWeChatPage.sent.append(message)
+        return True
+
+
+def make_service(monkeypatch, size=3, interval=300):
+    FakeWeChatPage.sent = []
+    FakeWeChatPage.fail = False
+    monkeypatch.setattr(share_service_module, 'WeChatPage', FakeWeChatPage)
+    config = {
+        'task': {'share_target': 'wechat_batch', 'contact_name': '文件传输助手',
+                 'wechat_batch': {'size': size, 'interval': interval}},
+        'wechat': {'app_package': 'com.tencent.mm'},
+        'tiktok': {'app_package': 'com.zhiliaoapp.musically'},
+    }
+    manager = FakeDriverManager()
+    return ShareService(manager, config), manager
+
+
+def test_links_are_sent_in_one_message_per_batch(monkeypatch):
+    service, manager = make_service(monkeypatch, size=3)
+
+    links = [f"https://vt.tiktok.com/{i}/" for i in range(7)]
+    assert all(service.share_link(link) for link in links)
+    assert service.close()
+
+    assert FakeWeChatPage.sent == ["\n".join(links[0:3]), "\n".join(links[3:6]), links[6]]
+    # 每批只进入微信一次，发送后切回TikTok
+    assert manager.foreground == ['com.tencent.mm', 'com.zhiliaoapp.musically'] * 3
+    assert service.pending == []
+
+
+def test_interval_triggers_flush_before_batch_is_full(monkeypatch):
+    service, _ = make_service(monkeypatch, size=10, interval=0)
+
+    service.share_link("https://vt.tiktok.com/a/")
+
+    assert FakeWeChatPage.sent == ["https://vt.tiktok.com/a/"]
+
+
+def test_pending_links_are_flushed_without_new_links(monkeypatch):
+    service, _ = make_service(monkeypatch, size=10, interval=60)
+    clock = {'now': 1000.0}
+    monkeypatch.setattr(share_service_module.time, 'monotonic', lambda: clock['now'])
+
+    service.share_link("https://vt.tiktok.com/a/")
+    clock['now'] += 30
+    assert service.flush_if_due() and FakeWeChatPage.sent == []
+
+    # 之后没有新链接，采集循环的定期检查仍会在到期后发送
+    clock['now'] += 31
+    assert service.flush_if_due()
+    assert FakeWeChatPage.sent == ["https://vt.tiktok.com/a/"] and service.pending == []
+    assert service.flush_if_due() and len(FakeWeChatPage.sent) == 1
+
+
+def test_failed_batch_is_kept_and_saved_to_file_on_close(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    service, _ = make_service(monkeypatch, size=2)
+    FakeWeChatPage.fail = True
+
+    service.share_link("https://vt.tiktok.com/a/")
+    service.share_link("https://vt.tiktok.com/b/")
+    assert service.pending == ["https://vt.tiktok.com/a/", "https://vt.tiktok.com/b/"]
+
+    assert service.close()
+    saved = "".join(path.read_text(encoding='utf-8') for path in (tmp_path / 'shared_links').iterdir())
+    assert "https://vt.tiktok.com/a/" in saved and "https://vt.tiktok.com/b/" in saved
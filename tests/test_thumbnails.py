@@ -0,0 +1,90 @@
+import os
+import sys
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from PIL import Image
+from utils.thumbnails import ThumbnailCache, thumbnail_width
+
+
+def make_photo(path, size=(3000, 2000), color=(200, 30, 30)):
+    Image.new('RGB', size, color).save(path, 'JPEG', quality=95)
+
+
+def test_thumbnail_is_generated_once_and_regenerated_when_source_changes(tmp_path):
+    uploads = tmp_path / 'uploads'
+    uploads.mkdir()
+    make_photo(uploads / 'shoe.jpg')
+    cache = ThumbnailCache(str(uploads), str(tmp_path / 'thumbs'), workers=2)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('shoe.jpg', 300))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({path for path, _ in results}) == 1
+    path, version = results[0]
+    with Image.open(path) as thumb:
+        assert thumb.format == 'WEBP' and thumb.size == (300, 200)
+    assert os.path.getsize(path) < os.path.getsize(uploads / 'shoe.jpg') / 10
+
+    make_photo(uploads / 'shoe.jpg', size=(1000, 1000), color=(10, 10, 200))
+    os.utime(uploads / 'shoe.jpg', (1, 1))
+    new_path, new_version = cache.get('shoe.jpg', 300)
+    assert new_version != version and not os.path.exists(path)
+    with Image.open(new_path) as thumb:
+        assert thumb.size == (300, 300)
+
+    assert cache.get('missing.jpg', 300) == (None, None)
+    cache.close()
+
+
+def test_requested_widths_are_rounded_to_preset_sizes():
+    assert [thumbnail_width(w) for w in (1, 150, 151, 300, 5000)] == [150, 150, 300, 300, 600]
+
+
+def test_thumbnail_route_serves_versioned_urls(web_app):
+    # Web 服务不在项目目录中运行: 缩略图路径不能按 Flask 的应用目录解析
+    assert os.getcwd() != web_app.app.root_path
+    make_photo(Path(web_app.IMAGE_FOLDER) / 'route.jpg')
+    web_app.image_index.refresh(force=True)
+    client = web_app.app.test_client()
+
+    version = client.get('/api/thumbnails').get_json()['route.jpg']
+    response = client.get(f'/thumbnails/route.jpg?w=300&v={version}')
+    assert response.status_code == 200 and response.headers['X-Thumbnail-Version'] == version
+    assert 'immutable' in response.headers['Cache-Control']
+    response.close()
+
+    # 不带版本号 (或版本已过期) 的地址每次都要重新验证
+    unversioned = client.get('/thumbnails/route.jpg?w=300')
+    assert unversioned.status_code == 200 and unversioned.headers['Cache-Control'] == 'public, no-cache'
+    unversioned.close()
+    assert client.get('/thumbnails/missing.jpg').status_code == 404
+
+
+def test_thumbnail_finished_before_callback_is_registered(tmp_path):
+    class ImmediateExecutor:
+        """提交时直接在当前线程中生成: 注册完成回调时 future 已经完成"""
+
+        def submit(self, fn, *args):
+            future = Future()
+            future.set_result(fn(*args))
+            return future
+
+    uploads = tmp_path / 'uploads'
+    uploads.mkdir()
+    make_photo(uploads / 'fast.jpg', size=(400, 300))
+    cache = ThumbnailCache(str(uploads), str(tmp_path / 'thumbs'))
+    cache._executor = ImmediateExecutor()
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(cache.get('fast.jpg', 150)), daemon=True)
+    thread.start()
+    thread.join(5)
+    assert results and os.path.exists(results[0][0])
+    assert cache._pending == {}
@@ -0,0 +1,115 @@
+import io
+import json
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from PIL import Image
+from utils.job_manager import JobManager
+from utils.upload_store import UploadStore, safe_name
+
+
+BOUNDARY = 'test-boundary'
+
+
+def jpeg_bytes(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def multipart(files):
+    body = b''
+    for filename, content in files:
+        body += (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="images"; filename="{filename}"\r\n'
+                 f'Content-Type: application/octet-stream\r\n\r\n').encode('utf-8') + content + b'\r\n'
+    return io.BytesIO(body + f'--{BOUNDARY}--\r\n'.encode())
+
+
+def test_upload_is_streamed_and_duplicates_are_skipped(tmp_path):
+    uploads = tmp_path / 'uploads'
+    uploads.mkdir()
+    red, blue = jpeg_bytes((255, 0, 0)), jpeg_bytes((0, 0, 255))
+    (uploads / '手动复制.jpg').write_bytes(red)
+    store = UploadStore(str(uploads), str(tmp_path / 'hashes.json'))
+
+    results = store.receive_multipart(multipart([
+        ('red-again.jpg', red), ('C:\\photos\\蓝色.jpg', blue), ('blue-copy.jpg', blue),
+        ('notes.txt', b'hello'), ('broken.jpg', b'not an image'),
+    ]), BOUNDARY, chunk_size=100)
+
+    assert [(r['status'], r['stored']) for r in results] == [
+        ('duplicate', '手动复制.jpg'), ('stored', '蓝色.jpg'), ('duplicate', '蓝色.jpg'),
+        ('rejected', None), ('rejected', None),
+    ]
+    assert (uploads / '蓝色.jpg').read_bytes() == blue
+    assert sorted(p.name for p in uploads.iterdir()) == ['手动复制.jpg', '蓝色.jpg']
+    assert len(json.loads((tmp_path / 'hashes.json').read_text(encoding='utf-8'))) == 2
+
+    # 同名但内容不同的图片不会覆盖已有文件
+    results = UploadStore(str(uploads), str(tmp_path / 'hashes.json')).receive_multipart(
+        multipart([('蓝色.jpg', jpeg_bytes((0, 255, 0)))]), BOUNDARY)
+    assert results[0]['status'] == 'stored' and results[0]['stored'].startswith('蓝色-')
+
+
+def test_oversized_files_are_rejected_and_names_are_sanitized(tmp_path):
+    store = UploadStore(str(tmp_path), str(tmp_path / 'hashes.json'), max_file_size=1000)
+    big = io.BytesIO()
+    Image.effect_noise((200, 200), 64).convert('RGB').save(big, 'JPEG')
+
+    results = store.receive_multipart(multipart([('big.jpg', big.getvalue())]), BOUNDARY, chunk_size=256)
+    assert results[0]['status'] == 'rejected' and list(tmp_path.glob('*.jpg')) == []
+    assert list(tmp_path.glob('.upload-*')) == []
+    assert safe_name('../../etc/pass<wd>.png') == 'passwd.png'
+    assert safe_name('.hidden.jpg') is None
+
+
+def queued_only(max_queued):
+    """没有工作线程的任务管理器: 提交的任务只排队不运行"""
+    manager = JobManager()
+    manager.register('automation', lambda job, **params: [], workers=0, max_queued=max_queued)
+    return manager
+
+
+def test_upload_route(web_app, monkeypatch):
+    monkeypatch.setattr(web_app, 'job_manager', queued_only(max_queued=1))
+    client = web_app.app.test_client()
+    uploads = Path(web_app.IMAGE_FOLDER).resolve()
+
+    # 不是 multipart 的请求
+    response = client.post('/api/uploads', json={'images': []})
+    assert response.status_code == 400
+    response = client.post('/api/uploads', data=b'x', content_type='multipart/form-data')
+    assert response.status_code == 400
+
+    # 新图片: 201，请求体从 request.stream 流式解析，stored 按上传顺序
+    yellow, cyan = jpeg_bytes((250, 250, 0)), jpeg_bytes((0, 250, 250))
+    response = client.post('/api/uploads', content_type='multipart/form-data',
+                           data={'images': [(io.BytesIO(yellow), 'route-yellow.jpg'),
+                                            (io.BytesIO(cyan), 'route-cyan.jpg')]})
+    body = response.get_json()
+    assert response.status_code == 201 and 'job_id' not in body
+    assert body['stored'] == ['route-yellow.jpg', 'route-cyan.jpg']
+    assert (uploads / 'route-cyan.jpg').read_bytes() == cyan
+
+    # 全部是已有图片的重复: 200，stored 中是已有图片的文件名
+    response = client.post('/api/uploads', content_type='multipart/form-data',
+                           data={'images': [(io.BytesIO(cyan), 'cyan-again.jpg')]})
+    assert response.status_code == 200
+    assert [f['status'] for f in response.get_json()['files']] == ['duplicate']
+    assert response.get_json()['stored'] == ['route-cyan.jpg']
+
+    # ?start=1 为上传的图片提交批量采集任务
+    response = client.post('/api/uploads?start=1', content_type='multipart/form-data',
+                           data={'images': [(io.BytesIO(yellow), 'a.jpg'), (io.BytesIO(cyan), 'b.jpg')]})
+    body = response.get_json()
+    assert response.status_code == 200 and body['job_id']
+    job = web_app.job_manager.get(body['job_id'])
+    assert job.status == 'queued'
+    assert job.params['pc_image_paths'] == [str(uploads / 'route-yellow.jpg'), str(uploads / 'route-cyan.jpg')]
+
+    # 采集任务已满: 429，图片仍已保存
+    response = client.post('/api/uploads?start=1', content_type='multipart/form-data',
+                           data={'images': [(io.BytesIO(jpeg_bytes((90, 0, 90))), 'route-purple.jpg')]})
+    assert response.status_code == 429 and 'job_id' not in response.get_json()
+    assert response.get_json()['stored'] == ['route-purple.jpg'] and (uploads / 'route-purple.jpg').exists()
@@ -0,0 +1,112 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.waiter import Waiter, DEFAULT_MAX_WAIT
+
+
+class VirtualClockDriver:
+    """提供虚拟时钟的假驱动 (与 ReplayDriver 相同的 clock/sleep 接口)，页面源码按时间变化"""
+
+    def __init__(self, pages=None, clipboard=None):
+        self.now = 0.0
+        self.sleeps = []
+        self.pages = pages or {}
+        self.clipboard = clipboard or {}
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def _at(self, timeline):
+        """timeline 为 {开始时间: 值}，返回当前时间对应的值"""
+        current = None
+        for start in sorted(timeline):
+            if self.now >= start:
+                current = timeline[start]
+        return current
+
+    @property
+    def page_source(self):
+        return self._at(self.pages)
+
+    def get_clipboard_text(self):
+        return self._at(self.clipboard)
+
+
+def test_until_returns_immediately_when_condition_holds():
+    driver = VirtualClockDriver()
+    waiter = Waiter(driver)
+
+    assert waiter.until('share_panel', lambda: 'ready') == 'ready'
+    assert driver.sleeps == []
+    assert waiter.records[0].elapsed == 0 and waiter.records[0].satisfied
+
+
+def test_until_polls_until_condition_holds():
+    driver = VirtualClockDriver()
+    waiter = Waiter(driver, poll_interval=0.25)
+
+    def ready():
+        if driver.now < 0.5:
+            # 条件检查出错视为未满足，继续轮询
+            raise RuntimeError('元素已失效')
+        return driver.now >= 1.0
+
+    assert waiter.until('product_detail', ready) is True
+    assert driver.sleeps == [0.25] * 4
+    assert waiter.records[0].elapsed == 1.0
+
+
+def test_until_times_out_at_step_max_wait():
+    driver = VirtualClockDriver()
+    waiter = Waiter(driver, max_waits={'search_results': 2}, poll_interval=0.5)
+
+    assert waiter.until('search_results', lambda: False) is None
+    record = waiter.records[0]
+    assert record.elapsed == 2.0 and not record.satisfied and record.max_wait == 2
+    # 截止时间到达后再检查一次条件才返回
+    assert len(driver.sleeps) == 4
+
+    assert waiter.max_wait_for('go_back') == 3
+    assert waiter.max_wait_for('unknown_step') == DEFAULT_MAX_WAIT
+    assert waiter.until('go_back', lambda: None, max_wait=1) is None
+    assert waiter.records[1].elapsed == 1.0
+
+
+def test_page_stable_waits_for_animation_to_finish():
+    # 页面在 0.6s 之前一直在变化，之后不再变化
+    driver = VirtualClockDriver(pages={0: '<a/>', 0.25: '<b/>', 0.5: '<c/>', 0.6: '<done/>'})
+    waiter = Waiter(driver, poll_interval=0.25)
+    observed = []
+    waiter.observers.append(observed.append)
+
+    assert waiter.for_page_stable('swipe') is True
+    # 0.75s 第一次取到最终页面，1.0s 第二次相同即认为稳定
+    assert waiter.records[0].elapsed == 1.0
+    assert observed == ['<a/>', '<b/>', '<c/>', '<done/>', '<done/>']
+    assert waiter.last_page_source == '<done/>'
+
+
+def test_page_stable_times_out_when_page_keeps_changing():
+    driver = VirtualClockDriver(pages={i * 0.25: f'<frame n="{i}"/>' for i in range(40)})
+    waiter = Waiter(driver, poll_interval=0.25)
+
+    assert waiter.for_page_stable('swipe') is None
+    assert waiter.records[0].elapsed == 3.0 and not waiter.records[0].satisfied
+
+
+def test_clipboard_change_and_summary():
+    driver = VirtualClockDriver(clipboard={0: 'https://vt.tiktok.com/old/', 0.4: 'https://vt.tiktok.com/new/'})
+    waiter = Waiter(driver, poll_interval=0.25)
+
+    assert waiter.for_clipboard_change('clipboard', 'https://vt.tiktok.com/old/') == 'https://vt.tiktok.com/new/'
+    assert waiter.records[0].elapsed == 0.5
+    assert waiter.for_clipboard_change('clipboard', 'https://vt.tiktok.com/new/') is None
+
+    summary = waiter.summary()['clipboard']
+    assert summary['count'] == 2 and summary['timeouts'] == 1
+    assert summary['total'] == 2.5 and summary['max'] == 2.0
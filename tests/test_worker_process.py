@@ -0,0 +1,137 @@
+import os
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+from utils.job_manager import JobManager
+from utils.worker_process import WorkerProcess
+from utils.metrics import metrics
+
+# 工作进程按模块名导入任务函数，所以放在单独的模块里
+SAMPLE_JOBS = '''
+import os
+import subprocess
+import time
+from utils.metrics import span
+
+
+def collect(job, products=2):
+    for n in range(products):
+        with span('sample.product', 'navigation'):
+            job.set_progress(products=n + 1)
+    return {'pid': os.getpid(), 'products': job.progress['products']}
+
+
+def broken(job):
+    raise ValueError('页面结构变化')
+
+
+def crash(job):
+    os._exit(3)
+
+
+def hang(job, pid_file):
+    # 模拟卡死的浏览器: 子进程也要随工作进程一起被终止
+    child = subprocess.Popen(['sleep', '60'])
+    with open(pid_file, 'w') as f:
+        f.write(str(child.pid))
+    time.sleep(60)
+
+
+def leak(job):
+    hoard = bytearray(300 * 1024 * 1024)
+    time.sleep(60)
+    return len(hoard)
+'''
+
+
+@pytest.fixture
+def sample_jobs(tmp_path, monkeypatch):
+    (tmp_path / 'sample_jobs.py').write_text(SAMPLE_JOBS, encoding='utf-8')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setenv('PYTHONPATH', str(tmp_path))
+    import sample_jobs
+    return sample_jobs
+
+
+def wait_for(manager, job, statuses=('completed', 'failed', 'cancelled'), timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        current = manager.get(job.id)
+        if current.status in statuses:
+            return current
+        time.sleep(0.05)
+    raise AssertionError(f"{job} 未在 {timeout}s 内结束")
+
+
+def test_jobs_run_in_recycled_worker_processes(sample_jobs):
+    manager = JobManager(poll_interval=0.05)
+    for name in ('collect', 'broken', 'crash'):
+        manager.register(name, getattr(sample_jobs, name), workers=1, max_queued=10,
+                         process={'max_jobs': 2, 'check_interval': 0.1})
+    metrics.reset()
+
+    first = wait_for(manager, manager.submit('collect', products=3))
+    second = wait_for(manager, manager.submit('collect'))
+    third = wait_for(manager, manager.submit('collect'))
+    assert first.status == 'completed' and first.progress == {'products': 3} and first.results['products'] == 3
+    assert first.results['pid'] != os.getpid()
+    # 运行 2 个任务后回收，第三个任务在新的工作进程中执行
+    assert second.results['pid'] == first.results['pid'] != third.results['pid']
+    assert metrics.snapshot()[('sample.product', 'navigation')][0] == 7
+
+    failed = wait_for(manager, manager.submit('broken'))
+    assert failed.status == 'failed' and '页面结构变化' in failed.error
+    crashed = wait_for(manager, manager.submit('crash'))
+    assert crashed.status == 'failed' and '退出码 3' in crashed.error
+    assert wait_for(manager, manager.submit('crash')).status == 'failed'
+    manager.shutdown()
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='用 sleep 进程模拟浏览器')
+def test_hung_jobs_are_killed_with_their_children(sample_jobs, tmp_path):
+    manager = JobManager(poll_interval=0.05)
+    manager.register('hang', sample_jobs.hang, workers=1, max_queued=10,
+                     process={'timeout': 1, 'check_interval': 0.1})
+    manager.register('leak', sample_jobs.leak, workers=1, process={'max_memory_mb': 100, 'check_interval': 0.1})
+    manager.register('cancellable', sample_jobs.hang, workers=1, max_queued=1, process={'check_interval': 0.1})
+
+    pid_file = tmp_path / 'child.pid'
+    timed_out = wait_for(manager, manager.submit('hang', pid_file=str(pid_file)))
+    assert timed_out.status == 'failed' and '超时' in timed_out.error
+    time.sleep(0.2)
+    assert not os.path.exists(f"/proc/{pid_file.read_text()}") or \
+        Path(f"/proc/{pid_file.read_text()}/stat").read_text().split()[2] == 'Z'
+
+    leaked = wait_for(manager, manager.submit('leak'))
+    assert leaked.status == 'failed' and '内存' in leaked.error
+
+    running = manager.submit('cancellable', pid_file=str(tmp_path / 'cancel.pid'))
+    queued = manager.submit('cancellable', pid_file=str(tmp_path / 'cancel.pid'))
+    wait_for(manager, running, statuses=('running',))
+    assert manager.cancel(queued.id) and manager.get(queued.id).status == 'cancelled'
+    assert manager.cancel(running.id)
+    assert wait_for(manager, running).status == 'cancelled'
+    assert not manager.cancel(running.id)
+    manager.shutdown()
+
+
+def test_job_cancelled_between_claim_and_run(sample_jobs):
+    # 没有工作线程: 手动领取任务，模拟工作线程刚领取、还没把任务交给工作进程时用户点击取消
+    manager = JobManager(poll_interval=0.05)
+    manager.register('cancellable', sample_jobs.hang, workers=0, max_queued=1)
+    job = manager.submit('cancellable', pid_file='unused')
+    process = WorkerProcess('sample_jobs:hang', name='cancellable-test')
+
+    claimed = manager._claim('cancellable', 'test', process)
+    assert claimed is job and job.status == 'running'
+    assert manager.cancel(job.id)
+
+    manager._run(claimed, None, process)
+    assert job.status == 'cancelled'
+    # 任务没有开始运行，工作进程也没有启动
+    assert process.pid is None
+    assert not manager.cancel(job.id)
+    manager.shutdown()
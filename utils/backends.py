@@ -0,0 +1,68 @@
+import importlib
+import threading
+import time
+from loguru import logger
+
+
+def load_target(target):
+    """导入 '模块:函数名' 形式的目标并返回该函数"""
+    module_name, _, attr = target.partition(':')
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class BackendRegistry:
+    """
+    自动化后端 (App采集、打开链接等) 的注册表。
+    后端以 "模块:函数名" 的形式注册，第一次使用时才导入模块，
+    Web服务启动时不必加载 Appium、Selenium、Playwright 等依赖。
+    """
+
+    def __init__(self):
+        self._targets = {}
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, target):
+        """注册 (或替换) 一个后端，target 形如 'automation_task:execute_automation'"""
+        module_name, _, attr = target.partition(':')
+        if not module_name or not attr:
+            raise ValueError(f"后端 {name} 的目标应为 '模块:函数名'，而不是 {target!r}")
+        with self._lock:
+            self._targets[name] = target
+            self._loaded.pop(name, None)
+
+    def configure(self, config):
+        """按 config.yaml 的 backends 部分替换或新增后端"""
+        for name, target in (config.get('backends') or {}).items():
+            self.register(name, target)
+
+    def get(self, name):
+        """返回后端函数，第一次调用时导入所在模块；模块或依赖无法导入时抛出 ImportError"""
+        backend = self._loaded.get(name)
+        if backend is not None:
+            return backend
+        with self._lock:
+            if name not in self._loaded:
+                target = self._targets.get(name)
+                if target is None:
+                    raise KeyError(f"未注册的后端: {name}")
+                start = time.perf_counter()
+                try:
+                    self._loaded[name] = load_target(target)
+                except ImportError as e:
+                    logger.error(f"后端 {name} ({target}) 无法加载: {e}")
+                    raise
+                logger.info(f"已加载后端 {name} ({target})，耗时 {time.perf_counter() - start:.2f}s")
+            return self._loaded[name]
+
+    def is_loaded(self, name):
+        return name in self._loaded
+
+    def names(self):
+        return list(self._targets)
+
+
+backends = BackendRegistry()
+backends.register('automation', 'automation_task:execute_automation')
+backends.register('batch_automation', 'automation_task:execute_batch_automation')
+backends.register('link_opener', 'link_opener:open_links_from_file')
@@ -0,0 +1,102 @@
+import json
+import os
+from datetime import datetime
+from loguru import logger
+
+
+DEFAULT_CHECKPOINT_DIR = 'data/checkpoints'
+
+
+class RunCheckpoint:
+    """
+    一次采集任务的进度检查点: 搜索图片、已滑动的次数、已处理的商品卡片、已分享的链接。
+    每处理完一个商品或滑动一次就写入磁盘，Appium会话崩溃后可以重建会话，
+    回到同一个搜索结果的同一位置继续采集，而不是从头开始。
+    """
+
+    def __init__(self, path, run_id, image_path=None, output_filename=None):
+        self.path = path
+        self.run_id = run_id
+        self.image_path = image_path
+        self.output_filename = output_filename
+        self.scroll_depth = 0
+        self.processed_keys = []
+        self.fingerprints = []
+        self.links = []
+        self.resumes = 0
+        self.status = 'running'
+
+    @classmethod
+    def create(cls, config, output_filename=None, path=None):
+        """新建检查点，默认保存在 task.checkpoint_dir 下；path 用于调用方需要固定位置的情况 (如可重试的后台任务)"""
+        checkpoint_dir = config['task'].get('checkpoint_dir', DEFAULT_CHECKPOINT_DIR)
+        run_id = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        checkpoint = cls(path or os.path.join(checkpoint_dir, f"{run_id}.json"), run_id,
+                         image_path=config['task'].get('pc_image_path'), output_filename=output_filename)
+        checkpoint.save()
+        return checkpoint
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        checkpoint = cls(path, data['run_id'], data.get('image_path'), data.get('output_filename'))
+        for field in ('scroll_depth', 'processed_keys', 'fingerprints', 'links', 'resumes', 'status'):
+            if field in data:
+                setattr(checkpoint, field, data[field])
+        return checkpoint
+
+    @property
+    def resuming(self):
+        """是否有可恢复的进度"""
+        return bool(self.scroll_depth or self.processed_keys)
+
+    def to_dict(self):
+        return {
+            'run_id': self.run_id,
+            'image_path': self.image_path,
+            'output_filename': self.output_filename,
+            'scroll_depth': self.scroll_depth,
+            'processed_keys': self.processed_keys,
+            'fingerprints': self.fingerprints,
+            'links': self.links,
+            'resumes': self.resumes,
+            'status': self.status,
+            'updated': datetime.now().isoformat(timespec='seconds'),
+        }
+
+    def save(self):
+        try:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"保存检查点失败: {e}")
+
+    def mark_processed(self, card_key, fingerprint=None, link=None):
+        """一个商品处理完毕 (无论是否拿到链接)"""
+        if card_key not in self.processed_keys:
+            self.processed_keys.append(card_key)
+        if fingerprint and fingerprint not in self.fingerprints:
+            self.fingerprints.append(fingerprint)
+        if link:
+            self.links.append(link)
+        self.save()
+
+    def mark_scrolled(self):
+        self.scroll_depth += 1
+        self.save()
+
+    def discard(self):
+        """任务完成后删除检查点文件"""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def finish(self, status):
+        self.status = status
+        self.save()
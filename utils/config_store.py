@@ -0,0 +1,115 @@
+import copy
+import os
+import threading
+import yaml
+from loguru import logger
+
+
+DEFAULT_CONFIG_PATH = 'config.yaml'
+
+
+class FrozenDict(dict):
+    """只读字典: 配置快照在多个请求和线程之间共享，不允许原地修改"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("配置快照是只读的，请使用 ConfigStore.copy() 获取可修改的副本或 ConfigStore.update() 修改配置")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """快照的可修改深拷贝 (FrozenDict -> dict, tuple -> list)"""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return copy.deepcopy(value)
+
+
+class ConfigStore:
+    """
+    config.yaml 的缓存。
+    get() 返回只读快照，文件的修改时间和大小不变时直接返回缓存，不重新解析 YAML；
+    update(func) 在锁内读取最新配置、修改后先写入临时文件再 os.replace 替换，并发保存不会损坏文件。
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path=DEFAULT_CONFIG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # (文件的修改时间和大小, 快照)，作为一个元组整体替换，无锁读取时不会看到不一致的组合
+        self._cached = (None, None)
+        self.loads = 0
+
+    @classmethod
+    def for_path(cls, path=DEFAULT_CONFIG_PATH):
+        """同一配置文件在进程内共用一个 ConfigStore"""
+        key = os.path.abspath(path)
+        with cls._instances_lock:
+            store = cls._instances.get(key)
+            if store is None:
+                store = cls._instances[key] = cls(path)
+            return store
+
+    def _stat_key(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self):
+        """当前配置的只读快照"""
+        key = self._stat_key()
+        cached_key, snapshot = self._cached
+        if snapshot is not None and key == cached_key:
+            return snapshot
+        with self._lock:
+            return self._reload(key)
+
+    def _reload(self, key):
+        cached_key, snapshot = self._cached
+        if snapshot is not None and key == cached_key:
+            return snapshot
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f) or {}
+        self.loads += 1
+        snapshot = freeze(data)
+        self._cached = (key, snapshot)
+        return snapshot
+
+    def copy(self):
+        """当前配置的可修改副本 (如任务需要覆盖部分配置项)"""
+        return thaw(self.get())
+
+    def update(self, func):
+        """
+        修改配置: func 接收可修改的配置字典并原地修改，修改后的配置写回文件。
+        返回新的只读快照。
+        """
+        with self._lock:
+            config = thaw(self._reload(self._stat_key()))
+            func(config)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                yaml.safe_dump(config, f, allow_unicode=True)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            snapshot = freeze(config)
+            self._cached = (self._stat_key(), snapshot)
+        logger.debug(f"配置已保存: {self.path}")
+        return snapshot
@@ -0,0 +1,183 @@
+import copy
+import queue
+import threading
+import time
+from loguru import logger
+from utils.backends import backends
+
+
+def device_configs(config):
+    """
+    返回设备池中的设备配置列表。
+    config.yaml 中配置了 devices 列表时使用该列表 (每项覆盖 device 中的同名字段)，否则只有 device 一台设备。
+    """
+    devices = config.get('devices') or []
+    if not devices:
+        return [dict(config['device'])]
+    merged = []
+    for item in devices:
+        device = dict(config['device'])
+        device.update(item)
+        merged.append(device)
+    return merged
+
+
+def device_label(device):
+    return str(device.get('udid') or device.get('device_name'))
+
+
+class DeviceJob:
+    """分配给某台设备的一个采集任务: 一张搜索图片 (或一批图片) 及其采集配额"""
+
+    def __init__(self, image_path, max_products, image_paths=None):
+        self.image_path = image_path
+        self.image_paths = image_paths
+        self.max_products = max_products
+        self.device = None
+        self.links = None
+        self.results = None
+        self.elapsed = None
+        self.attempts = 0
+
+    @property
+    def succeeded(self):
+        return self.links is not None
+
+    def __repr__(self):
+        image = f"{len(self.image_paths)} images" if self.image_paths else self.image_path
+        return f"DeviceJob(image={image}, max_products={self.max_products}, device={self.device})"
+
+
+def plan_jobs(image_paths, max_products, device_count, batch_size=1):
+    """
+    生成任务列表: 有搜索图片时每张图片一个任务 (batch_size > 1 时每 batch_size 张图片一个批量任务，
+    在同一会话内连续搜索)；没有图片时只生成一个任务。
+    没有搜索图片时每台设备看到的都是同一份商品列表，拆分配额只会让各设备重复采集排在最前面的商品，所以不拆分。
+    """
+    if image_paths and batch_size > 1:
+        return [DeviceJob(None, max_products, image_paths=image_paths[i:i + batch_size])
+                for i in range(0, len(image_paths), batch_size)]
+    if image_paths:
+        return [DeviceJob(path, max_products) for path in image_paths]
+    if max_products <= 0:
+        return []
+    if device_count > 1:
+        logger.info(f"没有搜索图片，采集配额 {max_products} 不拆分，只使用一台设备")
+    return [DeviceJob(None, max_products)]
+
+
+def run_device_job(config, device, job):
+    """默认的设备任务: 在指定设备上执行一次完整的 TikTok 采集流程"""
+    job_config = copy.deepcopy(config)
+    job_config['task']['max_products_to_process'] = job.max_products
+    if job.image_paths:
+        job.results = backends.get('batch_automation')(job_config, job.image_paths, device=device)
+        if job.results is None:
+            return None
+        return [link for links in job.results.values() for link in links or []]
+    if job.image_path:
+        job_config['task']['pc_image_path'] = job.image_path
+    return backends.get('automation')(job_config, device=device)
+
+
+class DevicePool:
+    """
+    多设备采集池。
+    每台设备一个工作线程 (各自拥有独立的 DriverManager/TikTokPage)，
+    空闲的设备从共享队列中领取下一个任务，总吞吐量随设备数量近似线性增长。
+    任务失败时放回队列重试 (最多 max_attempts 次)，出错的设备暂停 retry_delay 秒 (连续失败时递增) 后继续领取任务，
+    连续失败 max_device_failures 次才停用。所有任务 (包括放回队列的重试任务) 结束后设备线程才退出。
+    """
+
+    poll_interval = 0.05
+
+    def __init__(self, config, worker=None, max_attempts=2, retry_delay=10, max_device_failures=3):
+        self.config = config
+        self.devices = device_configs(config)
+        self.worker = worker or run_device_job
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_device_failures = max_device_failures
+
+    def run(self, jobs, on_result=None):
+        """在所有设备上并行执行任务，阻塞直到队列处理完毕，返回任务列表"""
+        pending = queue.Queue()
+        for job in jobs:
+            pending.put(job)
+
+        logger.info(f"设备池启动: {len(self.devices)} 台设备, {len(jobs)} 个任务")
+        threads = [
+            threading.Thread(target=self._device_loop, args=(device, pending, on_result),
+                             name=f"device-{device_label(device)}", daemon=True)
+            for device in self.devices
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        failed = [job for job in jobs if not job.succeeded]
+        if failed:
+            logger.warning(f"设备池结束，{len(failed)} 个任务未成功: {failed}")
+        return jobs
+
+    def _device_loop(self, device, pending, on_result):
+        label = device_label(device)
+        failures = 0
+        resume_at = 0
+        while True:
+            # 队列为空但还有任务在其他设备上执行时继续等待: 那些任务失败后会放回队列
+            if pending.unfinished_tasks == 0:
+                return
+            if time.monotonic() < resume_at:
+                time.sleep(self.poll_interval)
+                continue
+            try:
+                job = pending.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+
+            try:
+                job.device = label
+                job.attempts += 1
+                logger.info(f"[{label}] 开始任务: {job}")
+                start = time.perf_counter()
+                try:
+                    job.links = self.worker(self.config, device, job)
+                except Exception as e:
+                    logger.error(f"[{label}] 任务执行出错: {e}")
+                    job.links = None
+                job.elapsed = time.perf_counter() - start
+
+                if job.succeeded:
+                    failures = 0
+                    logger.info(f"[{label}] 任务完成，耗时 {job.elapsed:.1f}s: {job}")
+                    if on_result:
+                        on_result(job)
+                    continue
+
+                failures += 1
+                if job.attempts < self.max_attempts:
+                    logger.warning(f"[{label}] 任务失败，放回队列重试: {job}")
+                    pending.put(job)
+                elif on_result:
+                    on_result(job)
+                if failures >= self.max_device_failures:
+                    logger.error(f"[{label}] 设备连续失败 {failures} 次，停止使用该设备")
+                    return
+                # 暂停一段时间再领取任务，让其他设备优先处理重试任务
+                delay = self.retry_delay * failures
+                logger.warning(f"[{label}] 设备暂停 {delay}s 后继续领取任务")
+                resume_at = time.monotonic() + delay
+            finally:
+                pending.task_done()
+
+
+def collect_links(jobs):
+    """合并各任务采集到的链接；全部任务失败时返回 None"""
+    if jobs and not any(job.succeeded for job in jobs):
+        return None
+    links = []
+    for job in jobs:
+        links.extend(job.links or [])
+    return links
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime
+
+
+def parse_time(value):
+    """解析日期过滤参数: Unix 时间戳或 ISO 格式的日期/时间 (如 2024-01-31, 2024-01-31T12:00)"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+class DirectoryIndex:
+    """
+    目录的文件列表缓存。
+    每次查询前 stat 一次目录 (间隔不超过 min_interval 秒时连这次 stat 也省略)，
+    只有目录的修改时间变化 (有文件新增、删除或重命名) 时才重新扫描，并且只 stat 新出现或被替换的文件。
+    已有文件被追加内容时目录不变；对会被原地追加的文件 (如正在写入的结果文件) 设置 restat 为秒数，
+    每次检查时只重新 stat 最近 restat 秒内修改过的已知文件 (可能还在写入的文件)，修改时间或大小变化时同样更新索引。
+    etag 由文件名、修改时间和大小计算，内容不变时服务重启后也相同，可用于 HTTP 条件请求。
+    """
+
+    def __init__(self, path, accept=None, min_interval=1.0, restat=None):
+        self.path = path
+        self.accept = accept or (lambda name: True)
+        self.min_interval = min_interval
+        self.restat = restat
+        self._lock = threading.Lock()
+        self._dir_mtime = None
+        self._checked_at = 0
+        self._entries = {}
+        self._sorted = []
+        self.etag = None
+        self.last_modified = None
+        self.scans = 0
+
+    def refresh(self, force=False):
+        """目录有变化时更新索引，返回是否有变化"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.min_interval:
+            return False
+        with self._lock:
+            self._checked_at = now
+            try:
+                dir_mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                dir_mtime = None
+            if dir_mtime == self._dir_mtime and self.etag is not None and not force:
+                return bool(self.restat) and self._restat()
+            self._scan(dir_mtime)
+            return True
+
+    def _growing(self, entry):
+        """索引中的文件是否可能还在被追加 (最近 restat 秒内修改过)"""
+        return bool(self.restat) and entry[0] >= time.time() - self.restat
+
+    def _restat(self):
+        """目录没有变化时只重新 stat 可能还在写入的文件，有变化时更新索引"""
+        entries = dict(self._entries)
+        changed = False
+        for name, known in self._entries.items():
+            if not self._growing(known):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.path, name))
+            except OSError:
+                # 文件被删除时目录的修改时间也会变化，下次检查时重新扫描
+                continue
+            if (stat.st_mtime, stat.st_size) != known[:2]:
+                entries[name] = (stat.st_mtime, stat.st_size, stat.st_ino)
+                changed = True
+        if changed:
+            self._entries = entries
+            self._build()
+        return changed
+
+    def _scan(self, dir_mtime):
+        entries = {}
+        if dir_mtime is not None:
+            with os.scandir(self.path) as it:
+                for entry in it:
+                    if not entry.is_file() or not self.accept(entry.name):
+                        continue
+                    # 已知的文件只有被替换 (inode 变化) 或可能还在写入时才重新 stat，inode 由 scandir 直接给出
+                    known = self._entries.get(entry.name)
+                    if known is not None and known[2] == entry.inode() and not self._growing(known):
+                        entries[entry.name] = known
+                    else:
+                        stat = entry.stat()
+                        entries[entry.name] = (stat.st_mtime, stat.st_size, entry.inode())
+        self.scans += 1
+        self._dir_mtime = dir_mtime
+        self._entries = entries
+        self._build()
+
+    def _build(self):
+        """按当前的文件记录重新排序并计算 etag 和最后修改时间"""
+        entries = self._entries
+        # 最新的在前，修改时间相同时按文件名倒序 (文件名中含时间戳)
+        self._sorted = sorted(entries, key=lambda name: (entries[name][0], name), reverse=True)
+        digest = hashlib.sha1()
+        for name in self._sorted:
+            digest.update(f"{name}\0{entries[name][0]}\0{entries[name][1]}\n".encode('utf-8'))
+        self.etag = digest.hexdigest()[:20]
+        mtimes = [entry[0] for entry in entries.values()]
+        if self._dir_mtime is not None:
+            mtimes.append(self._dir_mtime / 1e9)
+        self.last_modified = max(mtimes) if mtimes else None
+
+    def query(self, prefix=None, since=None, until=None, offset=0, limit=None, order='mtime'):
+        """
+        返回 (总数, 文件名列表)。
+        order 为 mtime 时最新的在前，为 name 时按文件名排序；since/until 按修改时间过滤 (Unix 时间戳)。
+        """
+        self.refresh()
+        with self._lock:
+            names = self._sorted if order == 'mtime' else sorted(self._entries)
+            entries = self._entries
+        if prefix:
+            names = [name for name in names if name.startswith(prefix)]
+        if since is not None:
+            names = [name for name in names if entries[name][0] >= since]
+        if until is not None:
+            names = [name for name in names if entries[name][0] < until]
+        total = len(names)
+        end = offset + limit if limit is not None else None
+        return total, names[offset:end]
+
+    def names(self, order='mtime'):
+        return self.query(order=order)[1]
+
+    def stat(self, name):
+        """索引中记录的 (修改时间, 大小)，不存在时返回 None"""
+        self.refresh()
+        with self._lock:
+            entry = self._entries.get(name)
+        return entry[:2] if entry else None
+
+    def __len__(self):
+        self.refresh()
+        return len(self._entries)
@@ -1,7 +1,10 @@
-import yaml
 from appium import webdriver
 from appium.options.android import UiAutomator2Options
 from loguru import logger
+from utils.replay_driver import RecordingDriver, ReplayDriver
+from utils.metrics import instrument_driver, timed
+from utils.config_store import ConfigStore
+from utils.waiter import Waiter
 import os
 import time
 
@@ -9,27 +12,49 @@ import time
 class DriverManager:
     """Appium驱动管理器"""
     
-    def __init__(self, config_path="config.yaml"):
-        self.config = self._load_config(config_path)
+    def __init__(self, config_path="config.yaml", device=None, config=None):
+        self.config = config if config is not None else self._load_config(config_path)
+        # device 为设备池中的单个设备配置，覆盖 config['device'] 中的同名项
+        self.device = dict(self.config['device'])
+        self.device.update(device or {})
         self.driver = None
+        # 由 SessionManager 设置: 本次交出的会话是否为复用的热会话
+        self.reused = False
         
     def _load_config(self, config_path):
-        """加载配置文件"""
-        with open(config_path, 'r', encoding='utf-8') as file:
-            return yaml.safe_load(file)
+        """加载配置文件 (文件未修改时使用缓存，不重新解析)"""
+        return ConfigStore.for_path(config_path).copy()
     
+    @timed('appium.create_session', 'device')
     def create_driver(self):
         """创建Appium驱动"""
+        # replay.mode 为 replay 时不连接Appium，直接回放录制好的会话
+        replay = self.config.get('replay') or {}
+        if replay.get('mode') == 'replay':
+            try:
+                self.driver = ReplayDriver(replay['dir'], speed=replay.get('speed', 0))
+                logger.info(f"使用录制的会话回放: {replay['dir']}")
+                return self.driver
+            except Exception as e:
+                logger.error(f"加载录制的会话失败: {e}")
+                self.driver = None
+                return None
+
         try:
-            logger.info(f"使用配置创建驱动: {self.config['device']}")
+            logger.info(f"使用配置创建驱动: {self.device}")
             options = UiAutomator2Options()
-            options.platform_name = self.config['device']['platform_name']
+            options.platform_name = self.device['platform_name']
             # Force platformVersion to be a string, which is a common Appium requirement
-            options.platform_version = str(self.config['device']['platform_version'])
-            options.device_name = self.config['device']['device_name']
-            options.automation_name = self.config['device']['automation_name']
-            options.no_reset = self.config['device']['no_reset']
-            options.full_reset = self.config['device']['full_reset']
+            options.platform_version = str(self.device['platform_version'])
+            options.device_name = self.device['device_name']
+            options.automation_name = self.device['automation_name']
+            options.no_reset = self.device['no_reset']
+            options.full_reset = self.device['full_reset']
+            # 多设备并行时，每台设备需要独立的 UDID 和 UiAutomator2 systemPort
+            if self.device.get('udid'):
+                options.udid = self.device['udid']
+            if self.device.get('system_port'):
+                options.system_port = int(self.device['system_port'])
             
             # 同时提供app_package和app_activity，确保启动正确的应用界面
             options.app_package = self.config['tiktok']['app_package']
@@ -37,11 +62,16 @@ class DriverManager:
             
             # 设置隐式等待
             options.implicit_wait = self.config['task']['implicit_wait']
+            # 会话在任务之间会被保留复用，放宽空闲超时，避免被Appium回收
+            options.new_command_timeout = self.config['appium'].get('new_command_timeout', 600)
             
             self.driver = webdriver.Remote(
                 self.config['appium']['server_url'],
                 options=options
             )
+            instrument_driver(self.driver)
+            if replay.get('mode') == 'record':
+                self.driver = RecordingDriver(self.driver, replay['dir'])
             
             logger.info("Appium驱动创建成功")
             return self.driver
@@ -60,15 +90,35 @@ class DriverManager:
     def quit_driver(self):
         """退出驱动"""
         if self.driver:
-            self.driver.quit()
-            logger.info("Appium驱动已退出")
+            try:
+                self.driver.quit()
+                logger.info("Appium驱动已退出")
+            except Exception as e:
+                logger.warning(f"退出Appium驱动时出错 (会话可能已失效): {e}")
+            self.driver = None
+
+    def is_alive(self):
+        """通过一次轻量请求检查会话是否仍然可用"""
+        if not self.driver:
+            return False
+        try:
+            self.driver.current_package
+            return True
+        except Exception as e:
+            logger.warning(f"Appium会话健康检查失败: {e}")
+            return False
+
+    def _waiter(self):
+        """当前会话的等待器 (会话可能被重建，每次按当前驱动创建)"""
+        return Waiter(self.driver, max_waits=self.config['task'].get('wait_max'))
 
     def press_home(self):
         """返回手机主屏幕"""
         try:
             self.driver.press_keycode(3) # 3 is the keycode for HOME
             logger.info("已返回主屏幕")
-            time.sleep(1)
+            # 等待主屏幕的切换动画结束
+            self._waiter().for_ui_idle('home')
         except Exception as e:
             logger.error(f"返回主屏幕失败: {e}")
 
@@ -77,10 +127,12 @@ class DriverManager:
         try:
             self.driver.terminate_app(app_package)
             logger.info(f"已关闭应用: {app_package}")
-            time.sleep(1)
+            # 等待该应用不再处于前台
+            self._waiter().until('app_stopped', lambda: self.driver.current_package != app_package)
         except Exception as e:
             logger.error(f"关闭应用失败: {e}")
     
+    @timed('driver.switch_to_app', 'device')
     def switch_to_app(self, app_package, app_activity=None):
         """切换到指定应用"""
         try:
@@ -1,21 +1,66 @@
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
-from appium.webdriver.common.appiumby import AppiumBy
 from loguru import logger
-import time
+from utils.waiter import Waiter
+from utils.locator_registry import locator_registry, timed_find
+from utils.popup_sentinel import PopupSentinel
+from utils.metrics import timed
 
 
 class ElementHelper:
     """元素操作辅助类"""
     
-    def __init__(self, driver, timeout=10):
+    def __init__(self, driver, timeout=10, waiter=None, registry=None):
         self.driver = driver
         self.wait = WebDriverWait(driver, timeout)
+        self.waiter = waiter or Waiter(driver)
+        self.waiter.locate = self.locate_once
+        self.registry = registry or locator_registry
+        self._implicit_wait = None
+        # 设置后，点击失败时会检查是否被弹窗遮挡，关闭弹窗后重试一次
+        self.popup_sentinel = None
+
+    def _set_implicit_wait(self, seconds):
+        self.driver.implicitly_wait(seconds)
+
+    @timed('element.locate', 'device')
+    def locate_once(self, locator):
+        """
+        不等待地查找一次元素，找不到返回 None。
+        locator 可以是 (by, value)，也可以是定位注册表中的逻辑元素名:
+        此时按实测最快的顺序依次尝试各候选策略，并记录每次尝试的耗时和命中情况。
+        """
+        if not isinstance(locator, str):
+            elements = self.driver.find_elements(*locator)
+            return elements[0] if elements else None
+
+        # 候选策略逐个尝试时关闭隐式等待，否则每个未命中的策略都要白等 implicit_wait 秒
+        if self._implicit_wait is None:
+            self._implicit_wait = self.driver.timeouts.implicit_wait
+        self._set_implicit_wait(0)
+        attempts = []
+        hit = None
+        element = None
+        try:
+            for candidate in self.registry.ordered(locator):
+                element, latency = timed_find(self.driver, candidate)
+                attempts.append((candidate, latency))
+                if element is not None:
+                    hit = candidate
+                    break
+        finally:
+            self._set_implicit_wait(self._implicit_wait)
+        self.registry.record(locator, attempts, hit)
+        return element
     
     def find_element_safe(self, locator, timeout=10):
         """安全查找元素"""
         try:
+            if isinstance(locator, str):
+                return WebDriverWait(self.driver, timeout, poll_frequency=0.25).until(
+                    lambda driver: self.locate_once(locator)
+                )
             element = WebDriverWait(self.driver, timeout).until(
                 EC.presence_of_element_located(locator)
             )
@@ -35,17 +80,27 @@ class ElementHelper:
             logger.warning(f"未找到元素列表 {locator}: {e}")
             return []
     
-    def click_element_safe(self, locator, timeout=3):
+    @timed('element.click', 'device')
+    def click_element_safe(self, locator, timeout=3, retry_after_popup=True):
         """安全点击元素"""
         try:
-            # 使用传入的timeout，而不是self.wait的默认值
-            element = WebDriverWait(self.driver, timeout).until(
-                EC.element_to_be_clickable(locator)
-            )
+            if isinstance(locator, str):
+                element = WebDriverWait(self.driver, timeout, poll_frequency=0.25).until(
+                    lambda driver: self.locate_once(locator)
+                )
+            else:
+                # 使用传入的timeout，而不是self.wait的默认值
+                element = WebDriverWait(self.driver, timeout).until(
+                    EC.element_to_be_clickable(locator)
+                )
             element.click()
             logger.info(f"成功点击元素: {locator}")
             return True
         except Exception as e:
+            if retry_after_popup and self.popup_sentinel and self.popup_sentinel.check_now():
+                logger.info(f"已关闭遮挡的弹窗，重试点击 {locator}")
+                self.waiter.for_page_stable('popup')
+                return self.click_element_safe(locator, timeout, retry_after_popup=False)
             logger.error(f"点击元素失败 {locator}: {e}")
             return False
     
@@ -76,10 +131,22 @@ class ElementHelper:
         """滚动到指定元素"""
         try:
             self.driver.execute_script("arguments[0].scrollIntoView();", element)
-            time.sleep(1)
+            self.waiter.for_page_stable('scroll')
         except Exception as e:
             logger.warning(f"滚动到元素失败: {e}")
     
+    @timed('element.tap', 'device')
+    def tap(self, x, y):
+        """按坐标点击"""
+        try:
+            self.driver.tap([(int(x), int(y))])
+            logger.info(f"成功点击坐标: ({x}, {y})")
+            return True
+        except Exception as e:
+            logger.error(f"点击坐标失败 ({x}, {y}): {e}")
+            return False
+    
+    @timed('element.swipe', 'navigation')
     def swipe_up(self, duration=1000):
         """向上滑动"""
         size = self.driver.get_window_size()
@@ -88,32 +155,18 @@ class ElementHelper:
         end_y = size['height'] * 0.2
         
         self.driver.swipe(start_x, start_y, start_x, end_y, duration)
-        time.sleep(1)
+        self.waiter.for_page_stable('swipe')
     
     def handle_popups(self):
-        """快速检查并处理一次弹窗"""
-        logger.info("快速检查并处理弹窗...")
-        try:
-            keywords = [
-                '关闭', '跳过', '我知道了', '同意', '允许', '以后再说',
-                'close', 'Close', 'skip', 'Skip', 'Agree', 'Allow'
-            ]
-            conditions = " or ".join([f"contains(@text, '{k}')" for k in keywords] + [f"contains(@content-desc, '{k}')" for k in keywords])
-            popup_xpath = f"//*[{conditions}]"
-            
-            # 使用非常短的超时时间，因为弹窗通常会立即出现
-            popup_button = self.find_element_safe((AppiumBy.XPATH, popup_xpath), timeout=3)
-            
-            if popup_button:
-                logger.info(f"发现弹窗并尝试点击: {popup_button.text}")
-                popup_button.click()
-                time.sleep(2)  # 等待动画
-            else:
-                logger.info("未发现弹窗。")
-        except Exception as e:
-            logger.warning(f"处理弹窗时未发生任何操作: {e}")
+        """快速检查并处理一次弹窗 (一次页面源码请求，由弹窗哨兵在本地匹配)"""
+        sentinel = self.popup_sentinel or PopupSentinel(self.driver)
+        if sentinel.check_now():
+            self.waiter.for_page_stable('popup')  # 等待动画结束
+        else:
+            logger.info("未发现弹窗。")
         return True
     
+    @timed('element.swipe', 'navigation')
     def swipe_down(self, duration=1000):
         """向下滑动"""
         size = self.driver.get_window_size()
@@ -122,4 +175,4 @@ class ElementHelper:
         end_y = size['height'] * 0.8
         
         self.driver.swipe(start_x, start_y, start_x, end_y, duration)
-        time.sleep(1)
+        self.waiter.for_page_stable('swipe')
@@ -0,0 +1,164 @@
+import json
+import os
+import queue
+import threading
+import time
+from loguru import logger
+
+
+class Subscription:
+    """事件订阅: 队列方式 (get) 供 SSE 连接读取；队列满时丢弃最旧的事件，慢客户端不会阻塞发布者"""
+
+    def __init__(self, bus, types=None, callback=None, maxsize=1000):
+        self.bus = bus
+        self.types = set(types) if types else None
+        self.callback = callback
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def wants(self, event_type):
+        return self.types is None or event_type in self.types
+
+    def deliver(self, event):
+        if self.callback is not None:
+            try:
+                self.callback(event)
+            except Exception as e:
+                logger.error(f"处理事件 {event['type']} 失败: {e}")
+            return
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """取下一个事件，超时返回 None"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """
+    进程内事件总线。
+    publish(type, data) 把事件发给所有订阅了该类型的订阅者: 带 callback 的订阅在发布者线程中同步调用，
+    其余订阅放入各自的队列 (如 SSE 连接)。
+    """
+
+    def __init__(self):
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def subscribe(self, types=None, callback=None, maxsize=1000):
+        subscription = Subscription(self, types, callback, maxsize)
+        with self._lock:
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def publish(self, event_type, data=None):
+        with self._lock:
+            event = {'id': self._next_id, 'type': event_type, 'data': data, 'time': time.time()}
+            self._next_id += 1
+            subscribers = [sub for sub in self._subscribers if sub.wants(event_type)]
+        for subscription in subscribers:
+            subscription.deliver(event)
+        return event
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+def format_sse(event):
+    """把事件编码为一条 Server-Sent Events 消息"""
+    data = json.dumps(event['data'], ensure_ascii=False, default=str)
+    event_id = f"id: {event['id']}\n" if event.get('id') is not None else ''
+    return f"{event_id}event: {event['type']}\ndata: {data}\n\n"
+
+
+def sse_stream(bus, types=None, heartbeat=15, initial_events=()):
+    """
+    SSE 响应体生成器: 先发送 initial_events (当前状态)，然后逐条推送订阅到的事件。
+    没有事件时每 heartbeat 秒发送一行注释，客户端断开后写入失败，生成器被关闭并取消订阅。
+    """
+    subscription = bus.subscribe(types)
+    try:
+        yield "retry: 3000\n\n"
+        for event in initial_events:
+            yield format_sse(event)
+        while True:
+            event = subscription.get(timeout=heartbeat)
+            yield format_sse(event) if event is not None else ": keep-alive\n\n"
+    finally:
+        subscription.close()
+
+
+class DirectoryWatcher:
+    """
+    后台线程定期检查目录的修改时间 (一次 stat)，目录内容变化时调用 lister 生成新的文件列表并发布事件。
+    无论有多少浏览器在看，每个目录每 interval 秒只有一次 stat，只有变化时才列目录。
+    """
+
+    def __init__(self, bus, interval=2.0):
+        self.bus = bus
+        self.interval = interval
+        self._watches = []
+        self._thread = None
+        self._stop = threading.Event()
+
+    def watch(self, path, event_type, lister):
+        self._watches.append({'path': path, 'type': event_type, 'lister': lister, 'mtime': self._mtime(path)})
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def check(self):
+        """检查一次所有目录，返回发生变化的事件类型"""
+        changed = []
+        for watch in self._watches:
+            mtime = self._mtime(watch['path'])
+            if mtime == watch['mtime']:
+                continue
+            watch['mtime'] = mtime
+            try:
+                self.bus.publish(watch['type'], watch['lister']())
+                changed.append(watch['type'])
+            except Exception as e:
+                logger.error(f"读取目录 {watch['path']} 失败: {e}")
+        return changed
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='directory-watcher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def stop(self):
+        self._stop.set()
+
+
+event_bus = EventBus()
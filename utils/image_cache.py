@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from loguru import logger
+from PIL import Image, ImageOps
+
+
+DEFAULT_CACHE_DIR = 'data/image_cache'
+DEVICE_IMAGE_DIR = '/sdcard/Download'
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PushResult:
+    """一次图片推送的结果"""
+
+    def __init__(self, device_path, content_hash, original_bytes, pushed_bytes, transferred, elapsed):
+        self.device_path = device_path
+        self.content_hash = content_hash
+        self.original_bytes = original_bytes
+        self.pushed_bytes = pushed_bytes
+        self.transferred = transferred
+        self.elapsed = elapsed
+
+    @property
+    def bytes_saved(self):
+        return self.original_bytes - (self.pushed_bytes if self.transferred else 0)
+
+    def __repr__(self):
+        return (f"PushResult({self.device_path}, transferred={self.transferred}, "
+                f"saved={self.bytes_saved}B, elapsed={self.elapsed:.2f}s)")
+
+
+class ImagePushCache:
+    """
+    按内容寻址的图片推送缓存。
+    推送前先把图片缩小并重新压缩为搜索所需的尺寸，再按内容哈希命名；
+    设备上确实还有相同内容的图片 (清单只记录本工具推送过的文件，所以跳过前先在设备上核对) 时跳过传输。
+    """
+
+    _manifest_lock = threading.Lock()
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_side=1280, quality=85):
+        self.cache_dir = cache_dir
+        self.max_side = max_side
+        self.quality = quality
+        self.manifest_path = os.path.join(cache_dir, 'pushed.json')
+        self.total_saved = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config):
+        options = config.get('image_push') or {}
+        return cls(
+            cache_dir=options.get('cache_dir', DEFAULT_CACHE_DIR),
+            max_side=options.get('max_side', 1280),
+            quality=options.get('quality', 85),
+        )
+
+    def prepare(self, pc_image_path):
+        """
+        生成缩小后的 JPEG，返回 (本地路径, 内容哈希)。
+        缩小后反而更大 (如本来就很小的图片) 时直接使用原图。
+        """
+        content_hash = file_sha256(pc_image_path)
+        prepared_path = os.path.join(self.cache_dir, f"{content_hash}_{self.max_side}_{self.quality}.jpg")
+        if os.path.exists(prepared_path):
+            return prepared_path, content_hash
+
+        try:
+            with Image.open(pc_image_path) as image:
+                image = ImageOps.exif_transpose(image)
+                image.thumbnail((self.max_side, self.max_side))
+                tmp_path = prepared_path + '.tmp'
+                image.convert('RGB').save(tmp_path, 'JPEG', quality=self.quality, optimize=True)
+                os.replace(tmp_path, prepared_path)
+        except Exception as e:
+            logger.warning(f"压缩图片失败，将推送原图 {pc_image_path}: {e}")
+            return pc_image_path, content_hash
+
+        if os.path.getsize(prepared_path) >= os.path.getsize(pc_image_path):
+            os.remove(prepared_path)
+            return pc_image_path, content_hash
+        return prepared_path, content_hash
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _update_manifest(self, device_key, content_hash, device_path):
+        with self._manifest_lock:
+            manifest = self._load_manifest()
+            device = manifest.setdefault(device_key, {'images': {}})
+            device['images'][content_hash] = device_path
+            tmp_path = self.manifest_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+
+    def _reuse_on_device(self, driver, device_path, size):
+        """
+        确认设备上的文件仍然存在且大小相同，再刷新它的修改时间并通知媒体库，使其成为相册中最新的图片
+        (之后设备上可能又有截图或拍照，不能假设上次推送的仍是最新的一张)。
+        需要 Appium 以 --relaxed-security 启动 (mobile: shell)，不可用或文件不对时返回 False。
+        """
+        try:
+            output = driver.execute_script('mobile: shell', {'command': 'stat', 'args': ['-c', '%s', device_path]})
+            if str(output).strip() != str(size):
+                logger.info(f"设备上的文件已不存在或已改变，重新推送: {device_path}")
+                return False
+            driver.execute_script('mobile: shell', {'command': 'touch', 'args': [device_path]})
+            driver.execute_script('mobile: shell', {
+                'command': 'am',
+                'args': ['broadcast', '-a', 'android.intent.action.MEDIA_SCANNER_SCAN_FILE', '-d', f'file://{device_path}'],
+            })
+            return True
+        except Exception as e:
+            logger.debug(f"无法在设备上刷新文件 {device_path}: {e}")
+            return False
+
+    def in_media_store(self, driver, device_path):
+        """
+        设备的媒体库是否已收录该文件 (收录后才会出现在应用的相册网格中)。
+        通过 mobile: shell 查询，不可用时抛出异常。
+        """
+        output = driver.execute_script('mobile: shell', {
+            'command': 'content',
+            'args': ['query', '--uri', 'content://media/external/images/media', '--projection', '_id',
+                     '--where', f"_data='{device_path}'"],
+        })
+        return 'Row:' in str(output)
+
+    def push(self, driver, device_key, pc_image_path, device_path=None, force=False):
+        """
+        推送图片到设备并返回 PushResult。
+        设备上仍有相同内容的文件，且可以被刷新为相册中最新的一张时，跳过传输。
+        force=True 时总是重新推送 (仍使用压缩后的图片)，用于必须确保它是相册第一张的场景。
+        """
+        start = time.perf_counter()
+        original_bytes = os.path.getsize(pc_image_path)
+        local_path, content_hash = self.prepare(pc_image_path)
+        if device_path is None:
+            extension = os.path.splitext(local_path)[1].lower() or '.jpg'
+            device_path = f"{DEVICE_IMAGE_DIR}/tiktok_search_{content_hash[:16]}{extension}"
+
+        device = self._load_manifest().get(device_key, {})
+        known_path = device.get('images', {}).get(content_hash)
+        if not force and known_path == device_path and \
+                self._reuse_on_device(driver, device_path, os.path.getsize(local_path)):
+            self._update_manifest(device_key, content_hash, device_path)
+            result = PushResult(device_path, content_hash, original_bytes, 0, False, time.perf_counter() - start)
+        else:
+            driver.push_file(device_path, source_path=local_path)
+            self._update_manifest(device_key, content_hash, device_path)
+            result = PushResult(device_path, content_hash, original_bytes, os.path.getsize(local_path), True,
+                                time.perf_counter() - start)
+
+        self.total_saved += result.bytes_saved
+        logger.info(f"图片推送{'完成' if result.transferred else '命中缓存，跳过传输'}: {device_path}, "
+                    f"原图 {original_bytes / 1024:.0f} KB, 传输 {result.pushed_bytes / 1024:.0f} KB, "
+                    f"节省 {result.bytes_saved / 1024:.0f} KB, 耗时 {result.elapsed:.2f}s")
+        return result
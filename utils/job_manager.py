@@ -0,0 +1,265 @@
+import os
+import threading
+import time
+import uuid
+from loguru import logger
+from utils.job_store import JobStore
+from utils.event_bus import event_bus
+from utils.worker_process import WorkerProcess, JobCancelled
+
+
+JOB_STATUSES = ('queued', 'running', 'completed', 'failed', 'cancelled')
+
+
+class JobRejected(Exception):
+    """任务未被接收 (未知的任务类型，或该类型的运行和排队名额已满)"""
+
+
+class Job:
+    """一个后台任务: 类型、参数、状态、进度和结果。进度更新会写入任务队列并发布 job 事件"""
+
+    def __init__(self, job_type, params=None, job_id=None, store=None, events=None):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.seq = None
+        self.type = job_type
+        self.params = params or {}
+        self.status = 'queued'
+        self.progress = {}
+        self.results = None
+        self.error = None
+        self.attempts = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._store = store
+        self._events = events
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_record(cls, record, store=None, events=None):
+        job = cls(record['type'], record['params'], job_id=record['id'], store=store, events=events)
+        job.update_from(record)
+        return job
+
+    def update_from(self, record):
+        with self._lock:
+            for field in ('seq', 'status', 'results', 'error', 'attempts', 'created_at', 'started_at', 'finished_at'):
+                setattr(self, field, record[field])
+            self.progress = record['progress'] or {}
+
+    @property
+    def active(self):
+        return self.status in ('queued', 'running')
+
+    def set_progress(self, **progress):
+        """由任务函数调用，更新进度 (如 phase='collecting', links=3)"""
+        with self._lock:
+            self.progress.update(progress)
+            snapshot = dict(self.progress)
+        if self._store is not None:
+            self._store.update_progress(self.id, snapshot)
+        self.publish()
+
+    def publish(self):
+        if self._events is not None:
+            self._events.publish('job', self.to_dict())
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'id': self.id,
+                'type': self.type,
+                'params': self.params,
+                'status': self.status,
+                'progress': dict(self.progress),
+                'results': self.results,
+                'error': self.error,
+                'attempts': self.attempts,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+            }
+
+    def __repr__(self):
+        return f"Job(id={self.id}, type={self.type}, status={self.status})"
+
+
+class JobManager:
+    """
+    后台任务管理。
+    每种任务类型注册一个任务函数 func(job, **params) 和 workers 个工作线程，
+    排队和运行中的任务最多 workers + max_queued 个，超出时 submit 抛出 JobRejected。
+    注册时给出 process 参数 (WorkerProcess 的选项) 时，每个工作线程独占一个工作进程，任务函数在其中执行，
+    任务卡死或内存泄漏不会影响 Web 服务，运行中的任务可以被取消。
+    任务保存在 JobStore 中 (默认只在内存中)，工作线程从中原子地领取任务；使用磁盘上的任务队列时，
+    服务重启后排队中的任务继续执行，中断的任务重新排队。任务提交、开始、进度更新和结束时发布 job 事件。
+    任务函数返回 None 表示失败，否则返回值作为结果；已结束的任务只保留最近 max_history 个。
+    """
+
+    def __init__(self, store=None, max_history=100, max_attempts=3, poll_interval=1.0, events=None):
+        self.store = store or JobStore(':memory:')
+        self.events = events or event_bus
+        self.max_history = max_history
+        self.poll_interval = poll_interval
+        self._types = {}
+        self._jobs = {}
+        self._running = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._closing = False
+        self.store.recover(max_attempts)
+
+    def register(self, job_type, func, workers=1, max_queued=0, process=None):
+        """
+        注册任务类型。process 为 None 时任务在工作线程中执行；
+        否则为 WorkerProcess 的选项 (timeout, max_memory_mb, max_jobs, initializer)，func 须能在工作进程中按模块名导入。
+        """
+        target = f"{func.__module__}:{func.__qualname__}"
+        processes = [WorkerProcess(target, name=f"{job_type}-{n}", **process) if process is not None else None
+                     for n in range(workers)]
+        threads = [threading.Thread(target=self._work, args=(job_type, f"{os.getpid()}-{job_type}-{n}", processes[n]),
+                                    name=f"job-{job_type}-{n}", daemon=True) for n in range(workers)]
+        self._types[job_type] = {'func': func, 'workers': workers, 'max_queued': max_queued, 'threads': threads,
+                                 'processes': processes}
+        for thread in threads:
+            thread.start()
+
+    def submit(self, job_type, **params):
+        job_kind = self._types.get(job_type)
+        if job_kind is None:
+            raise JobRejected(f"未知的任务类型: {job_type}")
+        job = Job(job_type, params, store=self.store, events=self.events)
+        limit = job_kind['workers'] + job_kind['max_queued']
+        with self._lock:
+            if self._closing:
+                raise JobRejected("任务管理器已停止")
+            # 准入判断和入队在同一个数据库事务内完成
+            job.seq = self.store.add(job.id, job_type, params, max_active=limit)
+            if job.seq is None:
+                raise JobRejected(f"{job_type} 任务已满 ({limit} 个运行或排队中)，请稍后再试")
+            self._jobs[job.id] = job
+            # 在锁内发布: 工作线程领取后要先取得这把锁，running 事件不会早于 queued 事件
+            job.publish()
+            self._wakeup.notify_all()
+        logger.info(f"任务已提交: {job}")
+        return job
+
+    def _claim(self, job_type, worker, process=None):
+        # 领取和登记工作进程在同一把锁内完成: cancel 看到任务已在运行时一定能找到它的工作进程
+        with self._lock:
+            record = self.store.claim(job_type, worker)
+            if record is None:
+                return None
+            job = self._jobs.get(record['id'])
+            if job is None:
+                # 服务重启前提交的任务
+                job = self._jobs[record['id']] = Job.from_record(record, store=self.store, events=self.events)
+            if process is not None:
+                self._running[job.id] = process
+                process.assign(job.id)
+        job.update_from(record)
+        job.publish()
+        return job
+
+    def _work(self, job_type, worker, process=None):
+        """工作线程: 领取并执行任务 (在线程中或交给工作进程)；队列为空时等待新任务 (或定期检查其他进程提交的任务)"""
+        func = self._types[job_type]['func']
+        while True:
+            # 停止时先读取标志再领取: 停止后领取不到任务才退出，已排队的任务都会执行
+            closing = self._closing
+            job = self._claim(job_type, worker, process)
+            if job is None:
+                if closing:
+                    return
+                with self._lock:
+                    if not self._closing:
+                        self._wakeup.wait(self.poll_interval)
+                continue
+            self._run(job, func, process)
+
+    def _run(self, job, func, process=None):
+        logger.info(f"任务开始: {job} (第 {job.attempts} 次尝试)")
+        status = None
+        try:
+            results = process.run(job) if process is not None else func(job, **job.params)
+            error = None if results is not None else '任务失败，请查看日志'
+        except JobCancelled as e:
+            logger.warning(f"任务 {job} 已取消")
+            results, error, status = None, str(e), 'cancelled'
+        except Exception as e:
+            logger.error(f"任务 {job} 异常: {e}")
+            results, error = None, str(e)
+        finally:
+            with self._lock:
+                self._running.pop(job.id, None)
+        status = status or ('failed' if error else 'completed')
+        self.store.finish(job.id, status, results, error)
+        with job._lock:
+            job.results = results
+            job.error = error
+            job.status = status
+            job.finished_at = time.time()
+        with self._lock:
+            self._prune()
+        logger.info(f"任务结束: {job}")
+        job.publish()
+
+    def cancel(self, job_id):
+        """
+        取消任务: 排队中的任务直接取消；运行中的任务只有在工作进程中执行时才能取消 (终止该工作进程)。
+        返回是否已取消 (运行中的任务在工作线程处理完取消后才变为 cancelled 状态)。
+        """
+        with self._lock:
+            process = self._running.get(job_id)
+            cancelled = process is None and self.store.cancel(job_id)
+            job = self._jobs.get(job_id)
+        if process is not None:
+            return process.cancel(job_id)
+        if not cancelled:
+            return False
+        if job is not None:
+            job.update_from(self.store.get(job_id))
+            job.publish()
+        logger.info(f"任务已取消: {job_id}")
+        return True
+
+    def _prune(self):
+        finished = [job for job in self._jobs.values() if not job.active]
+        for job in sorted(finished, key=lambda job: job.seq)[:max(len(finished) - self.max_history, 0)]:
+            del self._jobs[job.id]
+        self.store.prune(self.max_history)
+
+    def _job(self, record):
+        """任务记录对应的 Job 对象，本进程中的任务返回同一个对象"""
+        with self._lock:
+            job = self._jobs.get(record['id'])
+        return job or Job.from_record(record, store=self.store, events=self.events)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        record = self.store.get(job_id)
+        return Job.from_record(record, store=self.store, events=self.events) if record else None
+
+    def list(self, job_type=None, status=None):
+        """按提交顺序倒序返回任务列表 (包括服务重启前的任务)，可按类型和状态过滤"""
+        return [self._job(record) for record in self.store.list(job_type, status)]
+
+    def latest(self, job_type):
+        records = self.store.list(job_type, limit=1)
+        return self._job(records[0]) if records else None
+
+    def shutdown(self, wait=True):
+        """停止接收新任务，等待工作线程处理完已排队的任务后退出，并停止工作进程"""
+        with self._lock:
+            self._closing = True
+            self._wakeup.notify_all()
+        if wait:
+            for job_kind in self._types.values():
+                for thread in job_kind['threads']:
+                    thread.join()
+                for process in job_kind['processes']:
+                    if process is not None:
+                        process.stop()
@@ -0,0 +1,183 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from loguru import logger
+
+
+DEFAULT_JOBS_PATH = 'data/jobs.db'
+
+
+class JobStore:
+    """
+    持久化的任务队列 (SQLite, WAL 模式)。
+    保存提交的任务、状态变化、进度和结果，服务重启后排队中的任务继续执行，运行中断的任务重新排队。
+    领取任务在一个 IMMEDIATE 事务内完成，多个工作线程 (或进程) 不会领取到同一个任务。
+    """
+
+    def __init__(self, db_path=DEFAULT_JOBS_PATH):
+        self.db_path = db_path
+        if db_path != ':memory:' and os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        # isolation_level=None: 每条语句自动提交，需要多条语句原子执行时显式开启事务
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        if db_path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' seq INTEGER PRIMARY KEY AUTOINCREMENT,'
+            ' id TEXT UNIQUE NOT NULL,'
+            ' type TEXT NOT NULL,'
+            ' params TEXT,'
+            ' status TEXT NOT NULL,'
+            ' progress TEXT,'
+            ' results TEXT,'
+            ' error TEXT,'
+            ' attempts INTEGER DEFAULT 0,'
+            ' worker TEXT,'
+            ' created_at REAL,'
+            ' started_at REAL,'
+            ' finished_at REAL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_type_status ON jobs (type, status, seq)')
+
+    @classmethod
+    def from_config(cls, config):
+        return cls((config.get('jobs') or {}).get('db_path', DEFAULT_JOBS_PATH))
+
+    @staticmethod
+    def _decode(row):
+        if row is None:
+            return None
+        job = dict(row)
+        for field in ('params', 'progress', 'results'):
+            job[field] = json.loads(job[field]) if job[field] is not None else None
+        return job
+
+    def add(self, job_id, job_type, params, max_active=None):
+        """
+        加入一个排队中的任务，返回其序号。
+        给出 max_active 时在同一事务内检查该类型排队和运行中的任务数，已达到上限时不加入并返回 None。
+        """
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                if max_active is not None:
+                    active = self._conn.execute(
+                        "SELECT COUNT(*) FROM jobs WHERE type = ? AND status IN ('queued', 'running')", (job_type,)
+                    ).fetchone()[0]
+                    if active >= max_active:
+                        self._conn.execute('ROLLBACK')
+                        return None
+                cursor = self._conn.execute(
+                    "INSERT INTO jobs (id, type, params, status, progress, created_at) VALUES (?, ?, ?, 'queued', '{}', ?)",
+                    (job_id, job_type, json.dumps(params, ensure_ascii=False), time.time())
+                )
+                self._conn.execute('COMMIT')
+                return cursor.lastrowid
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def claim(self, job_type, worker):
+        """领取该类型最早排队的任务并标记为运行中，没有排队任务时返回 None"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute(
+                    "SELECT seq FROM jobs WHERE type = ? AND status = 'queued' ORDER BY seq LIMIT 1", (job_type,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, attempts = attempts + 1 "
+                        "WHERE seq = ?", (worker, time.time(), row['seq'])
+                    )
+                    row = self._conn.execute('SELECT * FROM jobs WHERE seq = ?', (row['seq'],)).fetchone()
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return self._decode(row)
+
+    def update_progress(self, job_id, progress):
+        with self._lock:
+            self._conn.execute('UPDATE jobs SET progress = ? WHERE id = ?',
+                               (json.dumps(progress, ensure_ascii=False), job_id))
+
+    def finish(self, job_id, status, results=None, error=None):
+        with self._lock:
+            self._conn.execute(
+                'UPDATE jobs SET status = ?, results = ?, error = ?, finished_at = ? WHERE id = ?',
+                (status, json.dumps(results, ensure_ascii=False) if results is not None else None, error,
+                 time.time(), job_id)
+            )
+
+    def cancel(self, job_id):
+        """取消一个排队中的任务，返回是否取消成功 (任务已开始或已结束时不会被修改)"""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', error = '任务已取消', finished_at = ? "
+                "WHERE id = ? AND status = 'queued'", (time.time(), job_id)
+            ).rowcount == 1
+
+    def recover(self, max_attempts=3):
+        """
+        服务启动时调用: 上次运行中断的任务重新排队，已经尝试 max_attempts 次的标记为失败。
+        返回重新排队的任务数。
+        """
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                failed = self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = '服务重启时任务中断，已达到最大尝试次数', finished_at = ? "
+                    "WHERE status = 'running' AND attempts >= ?", (time.time(), max_attempts)
+                ).rowcount
+                requeued = self._conn.execute(
+                    "UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running'"
+                ).rowcount
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        if requeued or failed:
+            logger.warning(f"恢复任务队列: {requeued} 个中断的任务重新排队, {failed} 个标记为失败")
+        return requeued
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._decode(row)
+
+    def list(self, job_type=None, status=None, limit=None):
+        """按提交顺序倒序返回任务，可按类型和状态过滤"""
+        query, args = 'SELECT * FROM jobs WHERE 1 = 1', []
+        if job_type is not None:
+            query += ' AND type = ?'
+            args.append(job_type)
+        if status is not None:
+            query += ' AND status = ?'
+            args.append(status)
+        query += ' ORDER BY seq DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            args.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+        return [self._decode(row) for row in rows]
+
+    def prune(self, keep):
+        """只保留最近 keep 个已结束的任务"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('completed', 'failed', 'cancelled') AND seq NOT IN "
+                "(SELECT seq FROM jobs WHERE status IN ('completed', 'failed', 'cancelled') ORDER BY seq DESC LIMIT ?)",
+                (keep,)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from loguru import logger
+from utils.product_index import link_product_id
+
+
+DEFAULT_CACHE_PATH = 'data/link_cache.json'
+DEFAULT_TTL = 7 * 24 * 3600
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/120.0 Safari/537.36')
+
+
+class ResolvedLink:
+    """一个链接的解析结果: 原链接、跳转后的规范链接和商品ID (无法解析时为 None)"""
+
+    def __init__(self, link, canonical=None, product_id=None, cached=False, error=None):
+        self.link = link
+        self.canonical = canonical
+        self.product_id = product_id
+        self.cached = cached
+        self.error = error
+
+    @property
+    def url(self):
+        """用于打开的链接: 解析成功时为规范链接，否则为原链接"""
+        return self.canonical or self.link
+
+    @property
+    def key(self):
+        """去重键: 优先使用商品ID"""
+        return self.product_id or self.url
+
+    def __repr__(self):
+        return f"ResolvedLink({self.link} -> {self.product_id or self.canonical}, cached={self.cached})"
+
+
+class LinkCache:
+    """短链接到规范链接的磁盘缓存 (JSON)，条目超过 ttl 秒后失效"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def get(self, link):
+        with self._lock:
+            entry = self._entries.get(link)
+        if not entry or time.time() - entry['resolved_at'] > self.ttl:
+            return None
+        return entry
+
+    def put(self, link, canonical, product_id):
+        with self._lock:
+            self._entries[link] = {'canonical': canonical, 'product_id': product_id, 'resolved_at': time.time()}
+
+    def save(self):
+        with self._lock:
+            now = time.time()
+            data = {link: entry for link, entry in self._entries.items() if now - entry['resolved_at'] <= self.ttl}
+        try:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"保存链接缓存失败: {e}")
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class LinkResolver:
+    """
+    异步短链接解析器。
+    跟随 vt.tiktok.com 等短链接的跳转得到规范的商品链接并提取商品ID，结果按 TTL 缓存到磁盘。
+    HTTP 请求在线程池中通过共享连接池的 requests.Session 执行，同时进行的请求数不超过 concurrency。
+    """
+
+    def __init__(self, cache=None, concurrency=8, timeout=10, proxy=None):
+        self.cache = cache if cache is not None else LinkCache()
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if proxy:
+            self.session.proxies = {'http': proxy, 'https': proxy}
+
+    @classmethod
+    def from_config(cls, config):
+        """config 为 web_automation 配置，解析选项位于其中的 resolver 项"""
+        options = config.get('resolver') or {}
+        cache = LinkCache(options.get('cache_path', DEFAULT_CACHE_PATH), options.get('ttl', DEFAULT_TTL))
+        return cls(cache, concurrency=options.get('concurrency', 8), timeout=options.get('timeout', 10),
+                   proxy=config.get('proxy_server') or None)
+
+    def _follow(self, link):
+        """跟随跳转，返回最终的链接。先用 HEAD，服务器不支持时改用 GET (不读取响应体)"""
+        response = self.session.head(link, allow_redirects=True, timeout=self.timeout)
+        if response.status_code in (403, 404, 405) or response.status_code >= 500:
+            response = self.session.get(link, allow_redirects=True, timeout=self.timeout, stream=True)
+            response.close()
+        response.raise_for_status()
+        return response.url
+
+    def resolve_one(self, link):
+        product_id = link_product_id(link)
+        if product_id:
+            return ResolvedLink(link, link, product_id)
+        entry = self.cache.get(link)
+        if entry:
+            return ResolvedLink(link, entry['canonical'], entry['product_id'], cached=True)
+        try:
+            canonical = self._follow(link)
+        except Exception as e:
+            logger.warning(f"解析短链接失败 {link}: {e}")
+            return ResolvedLink(link, error=str(e))
+        product_id = link_product_id(canonical)
+        self.cache.put(link, canonical, product_id)
+        return ResolvedLink(link, canonical, product_id)
+
+    async def resolve(self, links):
+        """并发解析链接列表，按输入顺序返回 ResolvedLink 列表 (重复的链接只请求一次)"""
+        unique = list(dict.fromkeys(links))
+        semaphore = asyncio.Semaphore(self.concurrency)
+        loop = asyncio.get_running_loop()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='link-resolver') as executor:
+            async def resolve_limited(link):
+                async with semaphore:
+                    return await loop.run_in_executor(executor, self.resolve_one, link)
+            resolved = await asyncio.gather(*(resolve_limited(link) for link in unique))
+
+        self.cache.save()
+        by_link = dict(zip(unique, resolved))
+        return [by_link[link] for link in links]
+
+    def close(self):
+        self.session.close()
+
+
+def dedupe_resolved(resolved):
+    """按商品ID去重，保留每个商品第一次出现的链接"""
+    seen = set()
+    unique = []
+    for item in resolved:
+        if item.key in seen:
+            continue
+        seen.add(item.key)
+        unique.append(item)
+    return unique
+
+
+async def resolve_unique_links(links, config=None):
+    """
+    解析并按商品ID去重链接，返回要打开的链接 (规范链接，解析失败的保留原链接)。
+    config 为 web_automation 配置，resolve_links 为 false 时原样返回。
+    """
+    config = config or {}
+    if not config.get('resolve_links', True) or not links:
+        return list(links)
+    resolver = LinkResolver.from_config(config)
+    try:
+        start = time.perf_counter()
+        resolved = await resolver.resolve(links)
+    finally:
+        resolver.close()
+    unique = dedupe_resolved(resolved)
+    cached = sum(1 for item in resolved if item.cached)
+    failed = sum(1 for item in resolved if item.error)
+    logger.info(f"解析 {len(links)} 个链接耗时 {time.perf_counter() - start:.2f}s: 去重后 {len(unique)} 个商品, "
+                f"缓存命中 {cached} 个, 解析失败 {failed} 个")
+    return [item.url for item in unique]
@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+import time
+from appium.webdriver.common.appiumby import AppiumBy
+from loguru import logger
+
+
+DEFAULT_STATS_PATH = 'data/locator_stats.json'
+
+# 未测量过的定位策略的先验耗时 (秒)，用于决定首次尝试的顺序: resource-id 最快，XPath 最慢
+STRATEGY_PRIOR_LATENCY = {
+    AppiumBy.ID: 0.05,
+    AppiumBy.ACCESSIBILITY_ID: 0.08,
+    AppiumBy.ANDROID_UIAUTOMATOR: 0.1,
+    AppiumBy.XPATH: 0.5,
+}
+
+
+def strategy_key(locator):
+    by, value = locator
+    return f"{by}::{value}"
+
+
+class LocatorStats:
+    """某个定位策略的统计: 尝试次数、命中次数、命中时的累计耗时"""
+
+    def __init__(self, attempts=0, hits=0, hit_latency=0.0):
+        self.attempts = attempts
+        self.hits = hits
+        self.hit_latency = hit_latency
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.attempts if self.attempts else 0.0
+
+    @property
+    def avg_latency(self):
+        return self.hit_latency / self.hits if self.hits else None
+
+    def to_dict(self):
+        return {'attempts': self.attempts, 'hits': self.hits, 'hit_latency': self.hit_latency}
+
+
+class LocatorRegistry:
+    """
+    逻辑元素定位注册表。
+    每个逻辑元素可以有多个候选定位策略 (resource-id、UiSelector、accessibility id、XPath)，
+    按实测的命中率和耗时排序，优先尝试最快且有效的策略。统计数据持久化到 JSON 文件。
+    """
+
+    def __init__(self, stats_path=DEFAULT_STATS_PATH, save_every=50):
+        self.stats_path = stats_path
+        self.save_every = save_every
+        self._lock = threading.Lock()
+        self._candidates = {}
+        self._stats = {}
+        self._unsaved = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.stats_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for name, strategies in data.items():
+            self._stats[name] = {key: LocatorStats(**value) for key, value in strategies.items()}
+
+    def save(self):
+        """把统计数据写入磁盘"""
+        with self._lock:
+            data = {name: {key: stats.to_dict() for key, stats in strategies.items()}
+                    for name, strategies in self._stats.items()}
+            self._unsaved = 0
+        try:
+            if os.path.dirname(self.stats_path):
+                os.makedirs(os.path.dirname(self.stats_path), exist_ok=True)
+            tmp_path = self.stats_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.stats_path)
+        except OSError as e:
+            logger.warning(f"保存定位统计失败: {e}")
+
+    def register(self, name, candidates):
+        """注册逻辑元素及其候选定位器列表 [(by, value), ...]"""
+        with self._lock:
+            self._candidates[name] = list(candidates)
+
+    def register_many(self, locators):
+        for name, candidates in locators.items():
+            self.register(name, candidates)
+
+    def is_registered(self, name):
+        return name in self._candidates
+
+    def _expected_cost(self, name, locator):
+        stats = self._stats.get(name, {}).get(strategy_key(locator))
+        if not stats or not stats.attempts:
+            return STRATEGY_PRIOR_LATENCY.get(locator[0], 0.5)
+        latency = stats.avg_latency if stats.avg_latency is not None else STRATEGY_PRIOR_LATENCY.get(locator[0], 0.5)
+        return latency / max(stats.hit_rate, 0.05)
+
+    def ordered(self, name):
+        """按期望耗时 (平均命中耗时 / 命中率) 从低到高返回候选定位器"""
+        with self._lock:
+            candidates = list(self._candidates.get(name, []))
+            return sorted(candidates, key=lambda locator: self._expected_cost(name, locator))
+
+    def record(self, name, attempts, hit_locator):
+        """
+        记录一次查找中各策略的结果。attempts 为 [(locator, latency), ...]。
+        只有在某个策略命中时才记录未命中，避免页面尚未加载时误伤所有策略的命中率。
+        """
+        if hit_locator is None:
+            return
+        with self._lock:
+            strategies = self._stats.setdefault(name, {})
+            for locator, latency in attempts:
+                stats = strategies.setdefault(strategy_key(locator), LocatorStats())
+                stats.attempts += 1
+                if locator == hit_locator:
+                    stats.hits += 1
+                    stats.hit_latency += latency
+            self._unsaved += 1
+            should_save = self._unsaved >= self.save_every
+        if should_save:
+            self.save()
+
+    def report(self):
+        """返回 {name: [(strategy, hit_rate, avg_latency), ...]}，按当前优先顺序排列"""
+        result = {}
+        for name in list(self._candidates):
+            rows = []
+            for locator in self.ordered(name):
+                stats = self._stats.get(name, {}).get(strategy_key(locator), LocatorStats())
+                rows.append((strategy_key(locator), stats.hit_rate, stats.avg_latency))
+            result[name] = rows
+        return result
+
+
+locator_registry = LocatorRegistry()
+
+
+def timed_find(driver, locator):
+    """执行一次不等待的查找，返回 (元素或 None, 耗时)"""
+    start = time.perf_counter()
+    try:
+        elements = driver.find_elements(*locator)
+    except Exception as e:
+        logger.debug(f"定位策略 {locator} 执行出错: {e}")
+        elements = []
+    return (elements[0] if elements else None), time.perf_counter() - start
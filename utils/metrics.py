@@ -0,0 +1,181 @@
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+
+
+# 直方图分桶 (秒)，覆盖从一次设备请求 (几毫秒) 到整个采集任务 (数分钟)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# span 的类别: device 设备/Appium往返, wait 条件等待, sleep 固定等待, navigation 页面流程, share 分享, browser Playwright
+SPAN_METRIC = 'autocollect_span_seconds'
+ERROR_METRIC = 'autocollect_span_errors_total'
+
+
+class Histogram:
+    """累计分桶的直方图"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=None):
+    items = sorted(labels) + ([extra] if extra else [])
+    if not items:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in items) + '}'
+
+
+class MetricsRegistry:
+    """
+    进程内的 span 耗时统计。
+    每个 (span, kind) 一个直方图，出错的 span 另外计数；render() 输出 Prometheus 文本格式。
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._errors = {}
+
+    def observe(self, span, kind, duration, error=False):
+        labels = (('kind', kind), ('span', span))
+        with self._lock:
+            histogram = self._histograms.get(labels)
+            if histogram is None:
+                histogram = self._histograms[labels] = Histogram(self.buckets)
+            histogram.observe(duration)
+            if error:
+                self._errors[labels] = self._errors.get(labels, 0) + 1
+
+    @contextmanager
+    def span(self, name, kind='navigation'):
+        """记录一段代码的耗时，代码抛出异常时同时计入错误数"""
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observe(name, kind, time.perf_counter() - start, error)
+
+    def timed(self, name, kind='navigation'):
+        """装饰器形式的 span，同时支持普通函数和协程函数"""
+        def decorator(fn):
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(name, kind):
+                        return await fn(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name, kind):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def sleep(self, seconds, name):
+        """代替 time.sleep 的固定等待，耗时计入 sleep 类别，便于和设备耗时对比"""
+        with self.span(name, 'sleep'):
+            time.sleep(seconds)
+
+    def snapshot(self):
+        """返回 {(span, kind): (count, sum)}"""
+        with self._lock:
+            return {(dict(labels)['span'], dict(labels)['kind']): (h.count, h.sum)
+                    for labels, h in self._histograms.items()}
+
+    def export(self, reset=False):
+        """可 JSON 序列化的全部统计 (用于把工作进程中的统计汇总到 Web 服务进程)，reset 时导出后清空"""
+        with self._lock:
+            exported = [[dict(labels)['span'], dict(labels)['kind'], histogram.counts, histogram.count, histogram.sum,
+                         self._errors.get(labels, 0)] for labels, histogram in self._histograms.items()]
+            if reset:
+                self._histograms.clear()
+                self._errors.clear()
+        return exported
+
+    def merge(self, exported):
+        """合并 export() 的结果 (分桶须相同)"""
+        with self._lock:
+            for span, kind, counts, count, total, errors in exported:
+                labels = (('kind', kind), ('span', span))
+                histogram = self._histograms.get(labels)
+                if histogram is None:
+                    histogram = self._histograms[labels] = Histogram(self.buckets)
+                histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+                histogram.count += count
+                histogram.sum += total
+                if errors:
+                    self._errors[labels] = self._errors.get(labels, 0) + errors
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._errors.clear()
+
+    def render(self):
+        """Prometheus 文本格式 (version 0.0.4)"""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            errors = sorted(self._errors.items())
+            lines = [
+                f'# HELP {SPAN_METRIC} Duration of instrumented operations in seconds.',
+                f'# TYPE {SPAN_METRIC} histogram',
+            ]
+            for labels, histogram in histograms:
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'{SPAN_METRIC}_bucket{_format_labels(labels, ("le", bound))} {count}')
+                lines.append(f'{SPAN_METRIC}_bucket{_format_labels(labels, ("le", "+Inf"))} {histogram.count}')
+                lines.append(f'{SPAN_METRIC}_sum{_format_labels(labels)} {histogram.sum}')
+                lines.append(f'{SPAN_METRIC}_count{_format_labels(labels)} {histogram.count}')
+            lines.append(f'# HELP {ERROR_METRIC} Instrumented operations that raised an exception or timed out.')
+            lines.append(f'# TYPE {ERROR_METRIC} counter')
+            for labels, count in errors:
+                lines.append(f'{ERROR_METRIC}{_format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+span = metrics.span
+timed = metrics.timed
+
+
+def instrument_driver(driver, registry=None):
+    """
+    记录 Appium 驱动的每一次设备往返。
+    所有 WebDriver 命令 (包括元素上的操作) 都经过 driver.execute，在这里按命令名计时。
+    没有 execute 方法的驱动 (如回放驱动) 原样返回。
+    """
+    registry = registry or metrics
+    execute = getattr(driver, 'execute', None)
+    if execute is None or getattr(execute, '_instrumented', False):
+        return driver
+
+    @functools.wraps(execute)
+    def timed_execute(driver_command, params=None):
+        with registry.span(f"appium.{driver_command}", 'device'):
+            return execute(driver_command, params)
+
+    timed_execute._instrumented = True
+    driver.execute = timed_execute
+    return driver
@@ -0,0 +1,33 @@
+from loguru import logger
+from utils.metrics import timed
+
+
+@timed('miaoshou.login', 'browser')
+async def login(context, page, url, username, password):
+    """处理插件的初始设置页面并登录妙手，失败时抛出异常"""
+    await page.wait_for_timeout(5000) 
+    all_pages = context.pages
+    logger.info(f"浏览器启动后有 {len(all_pages)} 个页面。")
+    
+    for p_item in all_pages:
+        if p_item != page:
+            try:
+                logger.info(f"正在检查页面: {p_item.url}")
+                await p_item.locator("label span").nth(1).click(timeout=5000)
+                await p_item.get_by_role("button", name="确认开启").click(timeout=5000)
+                logger.success("成功处理插件的初始设置页面。")
+                await p_item.close()
+                break
+            except Exception:
+                logger.warning(f"页面 {p_item.url} 不是插件设置页，或无法执行操作。将忽略。")
+
+    logger.info(f"正在导航到妙手登录页面: {url}")
+    await page.goto(url, timeout=60000)
+    
+    await page.get_by_role("textbox", name="手机号/子账号/邮箱").fill(username)
+    await page.get_by_role("textbox", name="密码").fill(password)
+    await page.locator(".remember-check-box").click()
+    await page.get_by_role("button", name="立即登录").click()
+
+    await page.wait_for_url("**/welcome**", timeout=60000)
+    logger.success("妙手网站登录成功！")
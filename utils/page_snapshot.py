@@ -0,0 +1,132 @@
+import re
+import time
+import xml.etree.ElementTree as ET
+from loguru import logger
+
+
+_BOUNDS_RE = re.compile(r'\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]')
+
+# 商品卡片在页面树中的路径 (与原 base_xpath 一致):
+# FrameLayout[@resource-id 以 TikTok 包名开头]/FrameLayout/FrameLayout/UIComponent
+PRODUCT_CARD_CLASS = 'com.lynx.tasm.behavior.ui.view.UIComponent'
+PRODUCT_CARD_PATH = ('android.widget.FrameLayout', 'android.widget.FrameLayout', 'android.widget.FrameLayout')
+PRODUCT_CONTAINER_ID_PREFIX = 'com.zhiliaoapp.musically:id/'
+
+
+def parse_bounds(bounds):
+    """解析 UiAutomator2 的 bounds 属性 '[x1,y1][x2,y2]'，失败返回 None"""
+    match = _BOUNDS_RE.match(bounds or '')
+    if not match:
+        return None
+    return tuple(int(v) for v in match.groups())
+
+
+class ProductCard:
+    """页面快照中的一个商品卡片"""
+
+    def __init__(self, index, bounds, texts):
+        self.index = index
+        self.bounds = bounds
+        self.texts = texts
+
+    @property
+    def center(self):
+        x1, y1, x2, y2 = self.bounds
+        return (x1 + x2) // 2, (y1 + y2) // 2
+
+    @property
+    def width(self):
+        return self.bounds[2] - self.bounds[0]
+
+    @property
+    def height(self):
+        return self.bounds[3] - self.bounds[1]
+
+    @property
+    def key(self):
+        """卡片的去重标识: 优先使用卡片内的文本 (标题/价格)，没有文本时退回到 bounds"""
+        if self.texts:
+            return '|'.join(self.texts)
+        return 'bounds:{},{},{},{}'.format(*self.bounds)
+
+    def __repr__(self):
+        return f"ProductCard(index={self.index}, bounds={self.bounds}, texts={self.texts})"
+
+
+class PageSnapshot:
+    """
+    一次性获取的页面源码快照。
+    通过 driver.page_source 拉取一次 XML，在本地解析，避免逐个元素的 XPath 往返。
+    """
+
+    def __init__(self, page_source):
+        self.page_source = page_source
+        self.root = ET.fromstring(page_source)
+        self._parents = {child: parent for parent in self.root.iter() for child in parent}
+
+    @classmethod
+    def capture(cls, driver):
+        """从驱动获取当前页面快照"""
+        start = time.perf_counter()
+        snapshot = cls(driver.page_source)
+        logger.debug(f"页面快照获取完成，耗时 {(time.perf_counter() - start) * 1000:.0f} ms")
+        return snapshot
+
+    def parent(self, node):
+        return self._parents.get(node)
+
+    def iter_nodes(self):
+        return self.root.iter()
+
+    def bounds_of(self, node):
+        return parse_bounds(node.get('bounds'))
+
+    def texts_of(self, node):
+        """收集节点及其子孙节点上的 text / content-desc，按文档顺序去重"""
+        texts = []
+        for item in node.iter():
+            for attr in ('text', 'content-desc'):
+                value = (item.get(attr) or '').strip()
+                if value and value not in texts:
+                    texts.append(value)
+        return texts
+
+    def _matches_card_path(self, node):
+        ancestor = node
+        for expected_tag in PRODUCT_CARD_PATH:
+            ancestor = self.parent(ancestor)
+            if ancestor is None or ancestor.tag != expected_tag:
+                return None
+        if not (ancestor.get('resource-id') or '').startswith(PRODUCT_CONTAINER_ID_PREFIX):
+            return None
+        return ancestor
+
+    def find_product_cards(self, min_height=50):
+        """
+        一次遍历找出所有完整可见的商品卡片。
+        只返回完全位于列表容器内、且包含文本的卡片，露出一半的卡片留到下次滑动后处理。
+        """
+        cards = []
+        for node in self.root.iter(PRODUCT_CARD_CLASS):
+            container = self._matches_card_path(node)
+            if container is None:
+                continue
+
+            bounds = self.bounds_of(node)
+            container_bounds = self.bounds_of(container)
+            if not bounds or not container_bounds:
+                continue
+
+            x1, y1, x2, y2 = bounds
+            cx1, cy1, cx2, cy2 = container_bounds
+            if y2 - y1 < min_height or x2 <= x1:
+                continue
+            if x1 < cx1 or y1 < cy1 or x2 > cx2 or y2 > cy2:
+                continue
+
+            texts = self.texts_of(node)
+            if not texts:
+                continue
+
+            cards.append(ProductCard(len(cards), bounds, texts))
+        return cards
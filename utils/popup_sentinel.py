@@ -0,0 +1,105 @@
+from loguru import logger
+from utils.page_snapshot import PageSnapshot
+
+
+DEFAULT_POPUP_KEYWORDS = [
+    '关闭', '跳过', '我知道了', '同意', '允许', '以后再说',
+    'close', 'Close', 'skip', 'Skip', 'Agree', 'Allow'
+]
+
+# 哨兵只在这些等待步骤 (商城、相册、搜索结果列表) 中检查页面源码；
+# 商品详情页和分享面板里的 "关闭"、"允许" 等按钮是流程本身的一部分，不能当作弹窗点击
+WATCHED_STEPS = (
+    'app_launch', 'shop_loaded', 'gallery_loaded', 'search_results', 'search_results_settled', 'best_sell',
+    'swipe', 'scroll', 'popup',
+)
+
+
+class PopupSentinel:
+    """
+    弹窗哨兵。
+    检查已经拿到的页面源码快照中是否有可关闭的弹窗按钮，只有确实存在弹窗时才点击，
+    不额外发起设备请求，正常流程中几乎没有开销。
+    """
+
+    def __init__(self, driver, keywords=None, match='exact', max_repeats=2):
+        self.driver = driver
+        self.keywords = list(keywords or DEFAULT_POPUP_KEYWORDS)
+        self.match = match
+        self.max_repeats = max_repeats
+        self._lowered = [k.lower() for k in self.keywords]
+        self._repeats = {}
+        self.dismissed = 0
+
+    @classmethod
+    def from_config(cls, driver, config):
+        options = config.get('popups') or {}
+        keywords = list(options.get('keywords') or DEFAULT_POPUP_KEYWORDS)
+        keywords.extend(options.get('extra_keywords') or [])
+        return cls(driver, keywords=keywords, match=options.get('match', 'exact'))
+
+    def attach(self, waiter, steps=WATCHED_STEPS):
+        """检查 waiter 在 steps 中的等待步骤里获取的每一份页面源码"""
+        steps = set(steps)
+        waiter.observers.append(lambda page_source: waiter.step in steps and self.observe(page_source))
+
+    def _matches(self, value):
+        value = value.strip().lower()
+        if not value:
+            return False
+        if self.match == 'contains':
+            return any(k in value for k in self._lowered)
+        return value in self._lowered
+
+    def find(self, snapshot):
+        """在快照中查找弹窗按钮，返回 (x, y, 文本) 或 None"""
+        for node in snapshot.iter_nodes():
+            if node.get('enabled') == 'false':
+                continue
+            for attr in ('text', 'content-desc'):
+                value = node.get(attr) or ''
+                if self._matches(value):
+                    bounds = snapshot.bounds_of(node)
+                    if bounds and bounds[2] > bounds[0] and bounds[3] > bounds[1]:
+                        return (bounds[0] + bounds[2]) // 2, (bounds[1] + bounds[3]) // 2, value
+        return None
+
+    def observe(self, page_source):
+        """
+        检查一份页面源码，发现弹窗时点击关闭并返回 True。
+        先做一次字符串预检，页面中不包含任何关键字时不解析 XML。
+        """
+        if not page_source:
+            return False
+        lowered = page_source.lower()
+        if not any(k in lowered for k in self._lowered):
+            return False
+        return self.dismiss(PageSnapshot(page_source))
+
+    def dismiss(self, snapshot):
+        """在快照中发现弹窗时点击关闭，返回是否点击了弹窗"""
+        found = self.find(snapshot)
+        if not found:
+            return False
+        x, y, label = found
+        key = (x, y, label)
+        self._repeats[key] = self._repeats.get(key, 0) + 1
+        if self._repeats[key] > self.max_repeats:
+            # 同一个位置的同一按钮反复出现，说明它不是弹窗或点击无效，不再处理
+            return False
+        try:
+            self.driver.tap([(x, y)])
+            self.dismissed += 1
+            logger.info(f"发现弹窗并点击关闭: '{label}' ({x}, {y})")
+            return True
+        except Exception as e:
+            logger.warning(f"点击弹窗按钮失败 '{label}': {e}")
+            return False
+
+    def check_now(self):
+        """主动获取一次页面源码并检查弹窗，仅在操作失败后使用"""
+        try:
+            return self.observe(self.driver.page_source)
+        except Exception as e:
+            logger.warning(f"检查弹窗失败: {e}")
+            return False
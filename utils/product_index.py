@@ -0,0 +1,91 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from loguru import logger
+
+
+DEFAULT_INDEX_PATH = 'data/product_index.db'
+
+_PRODUCT_ID_PATTERNS = [
+    re.compile(r'/product/(\d+)'),
+    re.compile(r'[?&]product_id=(\d+)'),
+    re.compile(r'/pdp/[^/?#]*?/?(\d{8,})'),
+]
+
+
+def link_product_id(link):
+    """从规范的商品链接中提取商品ID，vt.tiktok.com 等短链接需要先解析跳转 (见 LinkResolver)，否则返回 None"""
+    for pattern in _PRODUCT_ID_PATTERNS:
+        match = pattern.search(link or '')
+        if match:
+            return match.group(1)
+    return None
+
+
+def card_fingerprint(card):
+    """根据商品卡片上的标题/价格文本生成稳定的指纹"""
+    normalized = '|'.join(' '.join(text.split()).lower() for text in card.texts)
+    return 'card:' + hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+class ProductIndex:
+    """
+    跨任务持久化的商品去重索引 (SQLite)。
+    以商品指纹为键记录已经采集过的商品，下次任务在点击商品卡片前查询，已采集的商品直接跳过。
+    分享得到的是短链接，采集时无法从中得到商品ID，所以只按卡片指纹去重。
+    每次任务打开一个索引，任务结束时调用 close() 关闭连接。
+    """
+
+    def __init__(self, db_path=DEFAULT_INDEX_PATH):
+        self.db_path = db_path
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS products ('
+            ' fingerprint TEXT PRIMARY KEY,'
+            ' link TEXT,'
+            ' first_seen REAL,'
+            ' last_seen REAL)'
+        )
+        self._conn.commit()
+
+    @classmethod
+    def from_config(cls, config):
+        """按配置打开索引，task.skip_known_products 为 false 时返回 None"""
+        if not config['task'].get('skip_known_products', True):
+            return None
+        return cls(config['task'].get('product_index_path', DEFAULT_INDEX_PATH))
+
+    def contains(self, fingerprint):
+        with self._lock:
+            row = self._conn.execute('SELECT 1 FROM products WHERE fingerprint = ?', (fingerprint,)).fetchone()
+        return row is not None
+
+    def add(self, fingerprint, link=None):
+        """记录一个已采集的商品，已存在时更新链接和最后出现时间"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO products (fingerprint, link, first_seen, last_seen) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(fingerprint) DO UPDATE SET '
+                ' link = COALESCE(excluded.link, products.link),'
+                ' last_seen = excluded.last_seen',
+                (fingerprint, link, now, now)
+            )
+            self._conn.commit()
+        logger.debug(f"商品已加入去重索引: {fingerprint} -> {link}")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM products').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,325 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from loguru import logger
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+
+
+SESSION_FILE = 'session.json'
+
+# 需要录制的驱动方法 (本项目实际用到的 WebDriver API 子集)
+RECORDED_DRIVER_METHODS = {
+    'find_element', 'find_elements', 'get_clipboard_text', 'tap', 'swipe', 'back',
+    'push_file', 'activate_app', 'terminate_app', 'press_keycode', 'get_window_size',
+    'execute_script', 'get_screenshot_as_png',
+}
+RECORDED_DRIVER_PROPERTIES = {'page_source', 'current_package'}
+RECORDED_ELEMENT_METHODS = {'click', 'clear', 'send_keys', 'set_value', 'get_attribute', 'is_displayed', 'is_enabled'}
+RECORDED_ELEMENT_PROPERTIES = {'text', 'location', 'size', 'rect'}
+
+
+def call_key(command, args):
+    """事件的匹配键: 命令名 + 参数。push_file 只使用设备端路径，与录制机器上的源文件位置无关"""
+    if command == 'push_file':
+        args = args[:1]
+    return f"{command}:{json.dumps(args, ensure_ascii=False, default=str)}"
+
+
+class _Timeouts:
+    def __init__(self, implicit_wait=0):
+        self.implicit_wait = implicit_wait
+
+
+class SessionRecorder:
+    """
+    录制一个 Appium 会话: 每个命令的参数、返回值和耗时按顺序写入 session.json，
+    页面源码和截图另存为文件 (相同的页面源码只保存一份)。
+    """
+
+    def __init__(self, capture_dir, flush_every=20):
+        self.capture_dir = capture_dir
+        self.flush_every = flush_every
+        self.events = []
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._element_count = 0
+        os.makedirs(os.path.join(capture_dir, 'pages'), exist_ok=True)
+        os.makedirs(os.path.join(capture_dir, 'screenshots'), exist_ok=True)
+
+    def next_element_ref(self):
+        with self._lock:
+            self._element_count += 1
+            return f"e{self._element_count}"
+
+    def _store_page_source(self, source):
+        digest = hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]
+        relative = f"pages/{digest}.xml"
+        path = os.path.join(self.capture_dir, relative)
+        if not os.path.exists(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(source)
+        return {'file': relative}
+
+    def _store_screenshot(self, png_bytes):
+        relative = f"screenshots/{len(self.events):05d}.png"
+        with open(os.path.join(self.capture_dir, relative), 'wb') as f:
+            f.write(png_bytes)
+        return {'file': relative}
+
+    def record(self, command, args, start, end, result=None, error=None):
+        event = {
+            'command': command,
+            'key': call_key(command, args),
+            'start': start - self.started,
+            'end': end - self.started,
+        }
+        if error is not None:
+            event['error'] = {'type': type(error).__name__, 'message': str(error).splitlines()[0] if str(error) else ''}
+        elif command == 'page_source':
+            event['result'] = self._store_page_source(result)
+        elif command == 'get_screenshot_as_png':
+            event['result'] = self._store_screenshot(result)
+        else:
+            event['result'] = result
+        with self._lock:
+            self.events.append(event)
+            should_flush = len(self.events) % self.flush_every == 0
+        if should_flush:
+            self.save()
+
+    def save(self):
+        with self._lock:
+            data = {'version': 1, 'events': list(self.events)}
+        tmp_path = os.path.join(self.capture_dir, SESSION_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1, default=str)
+        os.replace(tmp_path, os.path.join(self.capture_dir, SESSION_FILE))
+
+
+class RecordingElement:
+    """包装真实元素，录制其方法调用和属性读取"""
+
+    def __init__(self, element, ref, recorder):
+        self._element = element
+        self.ref = ref
+        self._recorder = recorder
+
+    def describe(self):
+        return {'ref': self.ref}
+
+    def _call(self, name, args, fn):
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            self._recorder.record(f"element.{name}", [self.ref] + list(args), start, time.perf_counter(), error=e)
+            raise
+        self._recorder.record(f"element.{name}", [self.ref] + list(args), start, time.perf_counter(), result=result)
+        return result
+
+    def __getattr__(self, name):
+        if name in RECORDED_ELEMENT_PROPERTIES:
+            return self._call(name, [], lambda: getattr(self._element, name))
+        attr = getattr(self._element, name)
+        if name in RECORDED_ELEMENT_METHODS:
+            return lambda *args: self._call(name, args, lambda: attr(*args))
+        return attr
+
+
+class RecordingDriver:
+    """
+    包装真实的 Appium 驱动，透明地转发所有调用，同时录制本项目用到的命令，
+    供 ReplayDriver 在没有设备的环境下回放。
+    """
+
+    def __init__(self, driver, capture_dir, screenshot_every_page=False):
+        self._driver = driver
+        self.recorder = SessionRecorder(capture_dir)
+        self.screenshot_every_page = screenshot_every_page
+        logger.info(f"正在录制Appium会话到: {capture_dir}")
+
+    def _wrap_result(self, command, result):
+        if command == 'find_element':
+            return RecordingElement(result, self.recorder.next_element_ref(), self.recorder)
+        if command == 'find_elements':
+            return [RecordingElement(e, self.recorder.next_element_ref(), self.recorder) for e in result]
+        return result
+
+    def _serialize(self, command, result):
+        if command == 'find_element':
+            return result.describe()
+        if command == 'find_elements':
+            return [element.describe() for element in result]
+        if command == 'execute_script':
+            try:
+                json.dumps(result)
+            except (TypeError, ValueError):
+                return None
+        return result
+
+    def _call(self, command, args, fn):
+        start = time.perf_counter()
+        try:
+            result = self._wrap_result(command, fn())
+        except Exception as e:
+            self.recorder.record(command, list(args), start, time.perf_counter(), error=e)
+            raise
+        self.recorder.record(command, list(args), start, time.perf_counter(), result=self._serialize(command, result))
+        return result
+
+    @property
+    def page_source(self):
+        source = self._call('page_source', [], lambda: self._driver.page_source)
+        if self.screenshot_every_page:
+            self.get_screenshot_as_png()
+        return source
+
+    @property
+    def current_package(self):
+        return self._call('current_package', [], lambda: self._driver.current_package)
+
+    def save_screenshot(self, filename):
+        png = self.get_screenshot_as_png()
+        with open(filename, 'wb') as f:
+            f.write(png)
+        return True
+
+    def quit(self):
+        self.recorder.save()
+        logger.info(f"会话录制已保存: {self.recorder.capture_dir} ({len(self.recorder.events)} 个事件)")
+        return self._driver.quit()
+
+    def __getattr__(self, name):
+        attr = getattr(self._driver, name)
+        if name in RECORDED_DRIVER_METHODS:
+            def recorded(*args, **kwargs):
+                return self._call(name, list(args) + ([kwargs] if kwargs else []), lambda: attr(*args, **kwargs))
+            return recorded
+        return attr
+
+
+class ReplayElement:
+    """回放时的元素，方法调用从录制的事件中取结果"""
+
+    def __init__(self, driver, ref):
+        self._driver = driver
+        self.ref = ref
+
+    def _replay(self, name, args=()):
+        return self._driver.replay(f"element.{name}", [self.ref] + list(args))
+
+    def __getattr__(self, name):
+        if name in RECORDED_ELEMENT_PROPERTIES:
+            return self._replay(name)
+        if name in RECORDED_ELEMENT_METHODS:
+            return lambda *args: self._replay(name, args)
+        raise AttributeError(name)
+
+    def __repr__(self):
+        return f"ReplayElement({self.ref})"
+
+
+class ReplayDriver:
+    """
+    离线回放驱动。
+    读取 SessionRecorder 录制的会话，实现本项目使用的 WebDriver API 子集，按录制顺序确定性地返回结果。
+    每个 (命令, 参数) 有独立的先进先出队列；录制中没有的多余调用返回该命令最近一次的结果。
+    speed=0 时不等待，speed=1 时按录制时的真实耗时回放；Waiter 使用回放时钟，轮询次数与录制时一致。
+    """
+
+    def __init__(self, capture_dir, speed=0.0):
+        self.capture_dir = capture_dir
+        self.speed = speed
+        self.session_id = f"replay-{os.path.basename(os.path.normpath(capture_dir))}"
+        self.timeouts = _Timeouts()
+        with open(os.path.join(capture_dir, SESSION_FILE), 'r', encoding='utf-8') as f:
+            self.events = json.load(f)['events']
+        self._queues = {}
+        for event in self.events:
+            self._queues.setdefault(event['key'], []).append(event)
+        self._last = {}
+        self._virtual_time = 0.0
+        self._page_cache = {}
+        self.calls = []
+        self.unmatched = []
+
+    # --- 回放时钟，供 Waiter 使用 ---
+    def clock(self):
+        return self._virtual_time
+
+    def sleep(self, seconds):
+        self._virtual_time += seconds
+        if self.speed:
+            time.sleep(seconds * self.speed)
+
+    def _load_file(self, relative, binary=False):
+        if relative not in self._page_cache:
+            with open(os.path.join(self.capture_dir, relative), 'rb' if binary else 'r',
+                      **({} if binary else {'encoding': 'utf-8'})) as f:
+                self._page_cache[relative] = f.read()
+        return self._page_cache[relative]
+
+    def _materialize(self, command, result):
+        if command in ('page_source', 'get_screenshot_as_png') and isinstance(result, dict):
+            return self._load_file(result['file'], binary=command == 'get_screenshot_as_png')
+        if command == 'find_element' and isinstance(result, dict):
+            return ReplayElement(self, result['ref'])
+        if command == 'find_elements':
+            return [ReplayElement(self, item['ref']) for item in result or []]
+        return result
+
+    def replay(self, command, args):
+        key = call_key(command, args)
+        self.calls.append(key)
+        queue = self._queues.get(key)
+        if queue:
+            event = queue.pop(0)
+            self._last[key] = event
+        elif key in self._last:
+            event = self._last[key]
+        else:
+            self.unmatched.append(key)
+            logger.debug(f"回放中没有录制的调用: {key}")
+            if command == 'find_element':
+                raise NoSuchElementException(f"No recorded element for {key}")
+            return [] if command == 'find_elements' else None
+
+        duration = max(event['end'] - event['start'], 0)
+        self._virtual_time = max(self._virtual_time + duration, event['end'])
+        if self.speed and duration:
+            time.sleep(duration * self.speed)
+
+        if 'error' in event:
+            if event['error']['type'] == 'NoSuchElementException':
+                raise NoSuchElementException(event['error']['message'])
+            raise WebDriverException(event['error']['message'])
+        return self._materialize(command, event.get('result'))
+
+    @property
+    def page_source(self):
+        return self.replay('page_source', [])
+
+    @property
+    def current_package(self):
+        return self.replay('current_package', [])
+
+    def implicitly_wait(self, seconds):
+        self.timeouts.implicit_wait = seconds
+
+    def save_screenshot(self, filename):
+        png = self.get_screenshot_as_png()
+        if png:
+            with open(filename, 'wb') as f:
+                f.write(png)
+        return True
+
+    def quit(self):
+        logger.info(f"回放结束: {len(self.calls)} 次调用, {len(self.unmatched)} 次未录制的调用")
+
+    def __getattr__(self, name):
+        if name in RECORDED_DRIVER_METHODS:
+            return lambda *args, **kwargs: self.replay(name, list(args) + ([kwargs] if kwargs else []))
+        raise AttributeError(name)
+
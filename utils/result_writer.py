@@ -0,0 +1,135 @@
+import json
+import os
+import threading
+from datetime import datetime
+from loguru import logger
+
+
+RESULTS_DIR = 'shared_links'
+RESULT_FORMATS = ('jsonl', 'txt')
+FSYNC_POLICIES = ('always', 'batch', 'never')
+
+
+def result_path(filename, fmt='jsonl', results_dir=RESULTS_DIR):
+    """结果文件路径，扩展名与格式一致 (collected_links_xxx.txt -> collected_links_xxx.jsonl)"""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return os.path.join(results_dir, f"{stem}.{fmt}")
+
+
+def is_result_file(name):
+    """结果列表中显示的文件: 每次任务的结果文件，以及旧版每个链接一个的 links-*.txt"""
+    return (name.startswith('collected_links_') and name.endswith(('.jsonl', '.txt'))) or \
+        (name.startswith('links-') and name.endswith('.txt'))
+
+
+def parse_result_line(line):
+    """解析结果文件中的一行，返回 {'link', 'timestamp', 'image', 'device'}；空行返回 None"""
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith('{'):
+        try:
+            return json.loads(line)
+        except ValueError:
+            return None
+    # txt 格式: 链接在第一列，其后是以制表符分隔的元数据 (旧文件只有链接)
+    fields = line.split('\t')
+    keys = ('link', 'timestamp', 'image', 'device')
+    return {key: (fields[i] if i < len(fields) and fields[i] else None) for i, key in enumerate(keys)}
+
+
+def read_links(path):
+    """读取结果文件 (jsonl 或 txt) 中的全部链接"""
+    with open(path, 'r', encoding='utf-8') as f:
+        records = [parse_result_line(line) for line in f]
+    return [record['link'] for record in records if record and record.get('link')]
+
+
+class ResultWriter:
+    """
+    一次任务的结果文件。
+    文件只打开一次，以追加、行缓冲方式写入，每行一个链接及其元数据 (时间、搜索图片、设备)。
+    fsync 策略: always 每行落盘; batch 每 fsync_every 行及关闭时落盘; never 只依赖行缓冲。
+    同一路径的多个任务 (如设备池中的并发任务) 共用一个写入器，写入时加锁，行不会交错。
+    """
+
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, path, fmt='jsonl', fsync='batch', fsync_every=10):
+        if fmt not in RESULT_FORMATS:
+            raise ValueError(f"不支持的结果格式: {fmt}")
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"不支持的 fsync 策略: {fsync}")
+        self.path = path
+        self.fmt = fmt
+        self.fsync = fsync
+        self.fsync_every = fsync_every
+        self.lines = 0
+        self._unsynced = 0
+        self._refs = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8', buffering=1)
+
+    @classmethod
+    def open(cls, path, fmt='jsonl', fsync='batch', fsync_every=10):
+        """获取路径对应的共享写入器，用完后调用 close()"""
+        key = os.path.abspath(path)
+        with cls._registry_lock:
+            writer = cls._registry.get(key)
+            if writer is None:
+                writer = cls._registry[key] = cls(path, fmt, fsync, fsync_every)
+            writer._refs += 1
+            return writer
+
+    @classmethod
+    def from_config(cls, config, filename):
+        options = config['task'].get('results') or {}
+        fmt = options.get('format', 'jsonl')
+        return cls.open(result_path(filename, fmt, options.get('dir', RESULTS_DIR)), fmt,
+                        options.get('fsync', 'batch'), options.get('fsync_every', 10))
+
+    def format_line(self, link, image=None, device=None):
+        timestamp = datetime.now().isoformat(timespec='seconds')
+        if self.fmt == 'jsonl':
+            return json.dumps({'link': link, 'timestamp': timestamp, 'image': image, 'device': device},
+                              ensure_ascii=False)
+        return '\t'.join([link, timestamp, image or '', device or ''])
+
+    def write(self, link, image=None, device=None):
+        line = self.format_line(link, image, device)
+        with self._lock:
+            self._file.write(line + '\n')
+            self.lines += 1
+            self._unsynced += 1
+            if self.fsync == 'always' or (self.fsync == 'batch' and self._unsynced >= self.fsync_every):
+                self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def flush(self):
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+
+    def close(self):
+        """释放写入器；最后一个使用者关闭时落盘并关闭文件"""
+        key = os.path.abspath(self.path)
+        with self._registry_lock:
+            self._refs -= 1
+            if self._refs > 0:
+                return
+            if self._registry.get(key) is self:
+                del self._registry[key]
+        with self._lock:
+            if self._file.closed:
+                return
+            if self.fsync != 'never':
+                self._sync()
+            self._file.close()
+        logger.info(f"结果文件已关闭: {self.path} (本次写入 {self.lines} 行)")
@@ -0,0 +1,119 @@
+import atexit
+import threading
+from loguru import logger
+from utils.driver_manager import DriverManager
+
+
+def session_signature(config, device=None):
+    """会话的配置签名，签名变化 (如改了设备或Appium地址) 时需要重建会话"""
+    merged = dict(config['device'])
+    merged.update(device or {})
+    return (
+        config['appium']['server_url'],
+        tuple(sorted((k, str(v)) for k, v in merged.items())),
+        config['tiktok']['app_package'],
+        config['tiktok']['app_activity'],
+        str(config.get('replay') or {}),
+    )
+
+
+def session_key(config, device=None):
+    merged = dict(config['device'])
+    merged.update(device or {})
+    return str(merged.get('udid') or merged.get('device_name'))
+
+
+class _SessionEntry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.manager = None
+        self.signature = None
+
+
+class SessionManager:
+    """
+    按设备保持长期存活的 Appium 会话。
+    交出会话前先做健康检查，只有会话失效或配置变化时才重新创建，
+    这样连续的任务无需每次都付出 10-30 秒的 UiAutomator2 会话创建开销。
+    同一设备同一时间只会被一个任务占用。
+    """
+
+    def __init__(self, factory=None):
+        self.factory = factory or (lambda config, device: DriverManager(config=config, device=device))
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def _entry(self, key):
+        with self._lock:
+            return self._entries.setdefault(key, _SessionEntry())
+
+    def acquire(self, config, device=None):
+        """
+        获取设备的驱动管理器，返回前会确保会话可用。
+        返回的 DriverManager.reused 表示会话是否为复用的热会话。创建失败返回 None。
+        """
+        key = session_key(config, device)
+        signature = session_signature(config, device)
+        entry = self._entry(key)
+        entry.lock.acquire()
+        try:
+            manager = self._prepare(entry, key, signature, config, device)
+        except BaseException:
+            # 创建会话时出错 (如Appium服务不可达)，不能让设备一直被占用
+            entry.manager = None
+            entry.lock.release()
+            raise
+        if manager is None:
+            entry.lock.release()
+        return manager
+
+    def _prepare(self, entry, key, signature, config, device):
+        """在持有设备锁时检查、复用或重建会话，创建失败返回 None"""
+        manager = entry.manager
+        if manager is not None:
+            if entry.signature != signature:
+                logger.info(f"[{key}] 设备配置已变化，重建Appium会话")
+                manager.quit_driver()
+                manager = None
+            elif not manager.is_alive():
+                logger.warning(f"[{key}] Appium会话已失效，重建会话")
+                manager.quit_driver()
+                manager = None
+
+        if manager is None:
+            entry.manager = None
+            manager = self.factory(config, device)
+            if not manager.create_driver():
+                return None
+            manager.reused = False
+            manager.session_key = key
+            entry.manager = manager
+            entry.signature = signature
+        else:
+            logger.info(f"[{key}] 复用已有的Appium会话: {manager.driver.session_id}")
+            # 刷新本次任务的配置 (如采集数量、搜索图片)
+            manager.config = config
+            manager.reused = True
+        return manager
+
+    def release(self, manager, discard=False):
+        """归还会话；discard=True 时关闭会话，下次使用时重新创建"""
+        entry = self._entry(manager.session_key)
+        if discard or entry.manager is not manager:
+            manager.quit_driver()
+            if entry.manager is manager:
+                entry.manager = None
+        entry.lock.release()
+
+    def close_all(self):
+        """关闭所有保持中的会话"""
+        with self._lock:
+            entries = list(self._entries.values())
+        for entry in entries:
+            if entry.manager is not None:
+                entry.manager.quit_driver()
+                entry.manager = None
+
+
+session_manager = SessionManager()
+atexit.register(session_manager.close_all)
@@ -6,6 +6,8 @@ import time
 from appium.webdriver.common.appiumby import AppiumBy
 
 from datetime import datetime
+from utils.metrics import timed
+from utils.result_writer import ResultWriter
 
 class ShareService:
     """
@@ -16,7 +18,22 @@ class ShareService:
         self.config = config
         self.driver = driver_manager.driver
         self.output_filename = output_filename
+        # wechat_batch 目标: 等待一起发送的链接及其中最早一条的入队时间
+        batch = config['task'].get('wechat_batch') or {}
+        self.batch_size = batch.get('size', 10)
+        self.batch_interval = batch.get('interval', 300)
+        self.pending = []
+        self.pending_since = None
+        # 本次任务的结果文件及写入每行元数据用的搜索图片 (批量模式下随图片更新)
+        self.writer = None
+        self.source_image = config['task'].get('pc_image_path')
 
+    def attach(self, driver_manager):
+        """会话重建后换用新的驱动，缓冲中的链接保留"""
+        self.driver_manager = driver_manager
+        self.driver = driver_manager.driver
+
+    @timed('share.link', 'share')
     def share_link(self, link):
         """
         根据配置的分享目标，执行相应的分享操作。
@@ -26,12 +43,15 @@ class ShareService:
 
         if target == 'wechat':
             return self._share_to_wechat(link)
+        elif target == 'wechat_batch':
+            return self._queue_for_wechat(link)
         elif target == 'file':
             return self._save_to_file(link)
         else:
             logger.error(f"不支持的分享目标: {target}")
             return False
 
+    @timed('share.wechat', 'share')
     def _share_to_wechat(self, link):
         """
         私有方法：分享链接到微信。
@@ -39,43 +59,114 @@ class ShareService:
         try:
             pyperclip.copy(link) # 确保剪贴板内容是当前链接
             wechat_page = WeChatPage(self.driver)
-            contact_name = self.config['task']['contact_name']
-
-            # 检查是否已在聊天页面
-            if wechat_page.helper.find_element_safe((AppiumBy.XPATH, f"//android.widget.TextView[@text='{contact_name}']"), timeout=3):
-                return wechat_page.send_message("")
-
-            # 如果不在，执行完整流程
-            self.driver_manager.terminate_app(self.config['wechat']['app_package'])
-            self.driver_manager.press_home()
-            self.driver_manager.switch_to_app(self.config['wechat']['app_package'])
-            time.sleep(5)
-            
-            if wechat_page.search_contact(contact_name) and wechat_page.send_message(""):
+            if self._open_chat(wechat_page) and wechat_page.send_message(""):
                 return True
         except Exception as e:
             logger.error(f"分享到微信失败: {e}")
         
         return False
 
-    def _save_to_file(self, link):
+    def _queue_for_wechat(self, link):
+        """
+        私有方法：缓冲链接，攒够 batch_size 条或最早一条已等待 batch_interval 秒时，
+        一次进入微信把它们作为一条多行消息发出，其余时间TikTok保持在前台。
+        """
+        if not self.pending:
+            self.pending_since = time.monotonic()
+        self.pending.append(link)
+        logger.info(f"链接已加入微信发送队列 ({len(self.pending)}/{self.batch_size})")
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        else:
+            self.flush_if_due()
+        return True
+
+    def flush_if_due(self):
+        """
+        最早的缓冲链接已等待 batch_interval 秒时发送。
+        由采集循环定期调用，长时间没有新链接 (如连续跳过已采集的商品) 时缓冲中的链接也能按时发出。
+        """
+        if self.pending and time.monotonic() - self.pending_since >= self.batch_interval:
+            return self.flush()
+        return True
+
+    @timed('share.wechat_batch', 'share')
+    def flush(self):
+        """
+        把缓冲中的链接一次发送到微信，然后切回TikTok。
+        发送失败时链接留在缓冲中，下次发送时重试。返回是否已无待发送的链接。
         """
-        私有方法：将链接保存到本地文件。
-        每次调用都会生成一个带时间戳的新文件。
+        if not self.pending:
+            return True
+        links = list(self.pending)
+        logger.info(f"进入微信批量发送 {len(links)} 个链接...")
+        try:
+            wechat_package = self.config['wechat']['app_package']
+            self.driver_manager.switch_to_app(wechat_package)
+            wechat_page = WeChatPage(self.driver)
+            if not self._open_chat(wechat_page, timeout=1):
+                logger.error("未能打开微信聊天窗口，链接保留到下次发送")
+                return False
+            if not wechat_page.send_message("\n".join(links), prefer_clipboard=False):
+                logger.error("微信批量发送失败，链接保留到下次发送")
+                return False
+            logger.success(f"已通过一条微信消息发送 {len(links)} 个链接")
+            del self.pending[:len(links)]
+            self.pending_since = time.monotonic() if self.pending else None
+            return True
+        except Exception as e:
+            logger.error(f"微信批量发送失败: {e}")
+            return False
+        finally:
+            try:
+                self.driver_manager.switch_to_app(self.config['tiktok']['app_package'])
+            except Exception as e:
+                logger.error(f"切回TikTok失败: {e}")
+
+    def close(self):
+        """
+        任务结束时发送缓冲中剩余的链接 (微信发送失败时保存到文件，避免丢失)，并关闭结果文件。
         """
         try:
-            links_dir = 'shared_links'
-            os.makedirs(links_dir, exist_ok=True)
+            if self.flush():
+                return True
+            logger.warning(f"{len(self.pending)} 个链接未能发送到微信，改为保存到文件")
+            saved = all([self._save_to_file(link) for link in self.pending])
+            if saved:
+                self.pending.clear()
+                self.pending_since = None
+            return saved
+        finally:
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
 
-            # 生成带时间戳的文件名
-            timestamp = datetime.now().strftime("%m%d%H%M%S")
-            filename = f"links-{timestamp}.txt"
-            file_path = os.path.join(links_dir, filename)
+    def _open_chat(self, wechat_page, timeout=3):
+        """进入与 contact_name 的聊天窗口；已在该聊天窗口时直接返回"""
+        contact_name = self.config['task']['contact_name']
+        # 检查是否已在聊天页面
+        if wechat_page.helper.find_element_safe((AppiumBy.XPATH, f"//android.widget.TextView[@text='{contact_name}']"), timeout=timeout):
+            return True
+        # 如果不在，执行完整流程
+        self.driver_manager.terminate_app(self.config['wechat']['app_package'])
+        self.driver_manager.press_home()
+        self.driver_manager.switch_to_app(self.config['wechat']['app_package'])
+        wechat_page.open_wechat()
+        return wechat_page.search_contact(contact_name)
 
-            with open(file_path, 'a', encoding='utf-8') as f:
-                f.write(f"{link}\n")
-            
-            logger.success(f"链接已保存到: {file_path}")
+    @timed('share.file', 'share')
+    def _save_to_file(self, link):
+        """
+        私有方法：将链接追加到本次任务的结果文件 (shared_links/ 下，以 output_filename 命名)。
+        文件在第一次保存时打开，任务结束时由 close() 关闭。
+        """
+        try:
+            if self.writer is None:
+                filename = self.output_filename or f"collected_links_{datetime.now().strftime('%Y%m%d%H%M%S')}.txt"
+                self.writer = ResultWriter.from_config(self.config, filename)
+            device = getattr(self.driver_manager, 'device', None) or {}
+            self.writer.write(link, image=self.source_image, device=device.get('udid') or device.get('device_name'))
+            logger.success(f"链接已保存到: {self.writer.path}")
             return True
         except Exception as e:
             logger.error(f"保存链接到文件失败: {e}")
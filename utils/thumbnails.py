@@ -0,0 +1,136 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps, features
+from loguru import logger
+from utils.metrics import timed
+
+
+DEFAULT_THUMBNAIL_DIR = 'data/thumbnails'
+THUMBNAIL_WIDTHS = (150, 300, 600)
+
+
+def thumbnail_width(requested, widths=THUMBNAIL_WIDTHS):
+    """把请求的宽度归到最接近的预设尺寸 (不小于请求值)，缓存中每张图片最多只有几种尺寸"""
+    for width in widths:
+        if requested <= width:
+            return width
+    return widths[-1]
+
+
+class ThumbnailCache:
+    """
+    上传图片的缩略图缓存。
+    缩略图由线程池在后台生成 (Pillow 解码和缩放时释放 GIL)，保存在 cache_dir/<文件名哈希>/<版本>-<宽度>.<格式>，
+    版本是源文件修改时间和大小的哈希: 源图片被修改后版本变化，生成新缩略图并删除旧版本。
+    同一缩略图的并发请求只生成一次。
+    """
+
+    def __init__(self, source_dir, cache_dir=DEFAULT_THUMBNAIL_DIR, fmt='webp', quality=80, workers=2):
+        if fmt == 'webp' and not features.check('webp'):
+            logger.warning("Pillow 不支持 WebP，缩略图改用 JPEG")
+            fmt = 'jpeg'
+        # 绝对路径: Flask 的 send_file 按应用目录而不是当前工作目录解析相对路径
+        self.source_dir = os.path.abspath(source_dir)
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.fmt = fmt
+        self.quality = quality
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='thumbnail')
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, source_dir):
+        options = config.get('thumbnails') or {}
+        return cls(source_dir, options.get('dir', DEFAULT_THUMBNAIL_DIR), options.get('format', 'webp'),
+                   options.get('quality', 80), options.get('workers', 2))
+
+    @property
+    def mimetype(self):
+        return f"image/{self.fmt}"
+
+    def version(self, name):
+        """源图片的版本号 (修改时间和大小的哈希)，源文件不存在时返回 None"""
+        try:
+            stat = os.stat(os.path.join(self.source_dir, name))
+        except OSError:
+            return None
+        return hashlib.sha1(f"{stat.st_mtime_ns}:{stat.st_size}".encode()).hexdigest()[:12]
+
+    def _folder(self, name):
+        return os.path.join(self.cache_dir, hashlib.sha1(name.encode('utf-8')).hexdigest()[:16])
+
+    def path_for(self, name, width, version):
+        extension = 'jpg' if self.fmt == 'jpeg' else self.fmt
+        return os.path.join(self._folder(name), f"{version}-{width}.{extension}")
+
+    def get(self, name, width, timeout=30):
+        """
+        返回缩略图路径和版本 (path, version)，需要时在线程池中生成并等待完成。
+        源图片不存在时返回 (None, None)，生成失败时抛出异常。
+        """
+        version = self.version(name)
+        if version is None:
+            return None, None
+        path = self.path_for(name, width, version)
+        if os.path.exists(path):
+            return path, version
+        return self._submit(name, width, version, path).result(timeout), version
+
+    def prefetch(self, names, width):
+        """在后台为一批图片生成缩略图 (如图片目录有新文件时)"""
+        for name in names:
+            version = self.version(name)
+            if version is not None:
+                path = self.path_for(name, width, version)
+                if not os.path.exists(path):
+                    self._submit(name, width, version, path)
+
+    def _submit(self, name, width, version, path):
+        with self._lock:
+            future = self._pending.get(path)
+            if future is not None:
+                return future
+            future = self._pending[path] = self._executor.submit(self._generate, name, width, version, path)
+        # 在锁外注册: 已完成的 future 会在当前线程中立即调用回调，而回调也要取得这把锁
+        future.add_done_callback(lambda done: self._forget(path, done))
+        return future
+
+    def _forget(self, path, future):
+        with self._lock:
+            if self._pending.get(path) is future:
+                del self._pending[path]
+
+    @timed('thumbnail.generate', 'render')
+    def _generate(self, name, width, version, path):
+        source = os.path.join(self.source_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with Image.open(source) as image:
+            # JPEG 在解码时直接缩小到接近目标尺寸，大图的解码量减少到几十分之一
+            image.draft('RGB', (width, width))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((width, width), Image.LANCZOS)
+            if self.fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            elif image.mode not in ('RGB', 'RGBA', 'L'):
+                image = image.convert('RGBA')
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            image.save(tmp_path, self.fmt.upper(), quality=self.quality)
+        os.replace(tmp_path, path)
+        self._remove_old_versions(path, version)
+        logger.debug(f"已生成缩略图: {name} ({width}px) -> {path}")
+        return path
+
+    @staticmethod
+    def _remove_old_versions(path, version):
+        folder = os.path.dirname(path)
+        for entry in os.listdir(folder):
+            if not entry.startswith(version + '-') and not entry.endswith('.tmp'):
+                try:
+                    os.remove(os.path.join(folder, entry))
+                except OSError:
+                    pass
+
+    def close(self):
+        self._executor.shutdown(wait=True)
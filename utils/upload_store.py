@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+from loguru import logger
+from PIL import Image
+from werkzeug.sansio.multipart import MultipartDecoder, File, Data, Epilogue, NeedData
+
+
+DEFAULT_HASH_INDEX = 'data/upload_hashes.json'
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif')
+CHUNK_SIZE = 64 * 1024
+TEMP_PREFIX = '.upload-'
+
+
+def safe_name(filename):
+    """上传文件名的最后一段路径，去掉控制字符和 Windows 不允许的字符 (保留中文)；不可用时返回 None"""
+    name = (filename or '').replace('\\', '/').rsplit('/', 1)[-1]
+    name = re.sub(r'[\x00-\x1f<>:"|?*]', '', name).strip()
+    if not name or name.startswith('.'):
+        return None
+    return name
+
+
+class UploadWriter:
+    """正在写入的一个上传文件: 分块写到上传目录中的临时文件，同时计算 SHA-256"""
+
+    def __init__(self, folder, filename):
+        self.filename = filename
+        self.path = os.path.join(folder, f"{TEMP_PREFIX}{uuid.uuid4().hex}.part")
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._file = open(self.path, 'wb')
+
+    def write(self, data):
+        self._file.write(data)
+        self._digest.update(data)
+        self.size += len(data)
+
+    @property
+    def sha256(self):
+        return self._digest.hexdigest()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def discard(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class UploadStore:
+    """
+    上传目录和按内容哈希的去重索引。
+    上传的文件边接收边写入磁盘并计算哈希，内容与已有图片完全相同时不保存，返回已有的文件名。
+    索引保存在 index_path，按文件名记录 (修改时间, 大小, 哈希)，只有新出现或被修改的文件 (如手动复制进来的) 才重新计算哈希。
+    """
+
+    def __init__(self, folder, index_path=DEFAULT_HASH_INDEX, extensions=IMAGE_EXTENSIONS,
+                 max_file_size=50 * 1024 * 1024):
+        self.folder = folder
+        self.index_path = index_path
+        self.extensions = extensions
+        self.max_file_size = max_file_size
+        self._lock = threading.Lock()
+        self._entries = None
+        self._by_hash = {}
+
+    @classmethod
+    def from_config(cls, config, folder):
+        options = config.get('uploads') or {}
+        return cls(folder, options.get('hash_index', DEFAULT_HASH_INDEX),
+                   max_file_size=int(options.get('max_file_mb', 50)) * 1024 * 1024)
+
+    def refresh(self):
+        """同步索引和上传目录，返回是否有变化"""
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self):
+        if self._entries is None:
+            self._entries = self._load_index()
+        entries = {}
+        changed = False
+        os.makedirs(self.folder, exist_ok=True)
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if not entry.is_file() or not entry.name.lower().endswith(self.extensions):
+                    continue
+                stat = entry.stat()
+                known = self._entries.get(entry.name)
+                if known is not None and known[:2] == [stat.st_mtime_ns, stat.st_size]:
+                    entries[entry.name] = known
+                    continue
+                try:
+                    entries[entry.name] = [stat.st_mtime_ns, stat.st_size, self._file_hash(entry.path)]
+                except OSError as e:
+                    logger.warning(f"无法计算文件哈希 {entry.path}: {e}")
+                    continue
+                changed = True
+        changed = changed or len(entries) != len(self._entries)
+        self._entries = entries
+        self._by_hash = {}
+        for name in sorted(entries):
+            self._by_hash.setdefault(entries[name][2], name)
+        if changed:
+            self._save_index()
+        return changed
+
+    @staticmethod
+    def _file_hash(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"上传哈希索引无法读取，将重新计算: {e}")
+            return {}
+
+    def _save_index(self):
+        try:
+            os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.error(f"保存上传哈希索引失败: {e}")
+
+    def open(self, filename):
+        return UploadWriter(self.folder, filename)
+
+    def commit(self, writer):
+        """
+        保存写完的文件，返回 {'filename', 'stored', 'status', 'sha256'}，status 为 stored、duplicate 或 rejected。
+        内容相同的图片已存在时删除临时文件并返回已有的文件名；同名但内容不同时在文件名后加哈希前缀。
+        """
+        writer.close()
+        result = {'filename': writer.filename, 'stored': None, 'sha256': writer.sha256}
+        try:
+            with Image.open(writer.path) as image:
+                image.verify()
+        except Exception:
+            writer.discard()
+            return dict(result, status='rejected', reason='不是有效的图片文件')
+
+        with self._lock:
+            if self._entries is None:
+                self._refresh()
+            existing = self._by_hash.get(writer.sha256)
+            if existing is not None and os.path.exists(os.path.join(self.folder, existing)):
+                writer.discard()
+                return dict(result, stored=existing, status='duplicate')
+
+            name = safe_name(writer.filename)
+            stem, extension = os.path.splitext(name)
+            if os.path.exists(os.path.join(self.folder, name)):
+                name = f"{stem}-{writer.sha256[:8]}{extension}"
+            path = os.path.join(self.folder, name)
+            os.replace(writer.path, path)
+            stat = os.stat(path)
+            self._entries[name] = [stat.st_mtime_ns, stat.st_size, writer.sha256]
+            self._by_hash[writer.sha256] = name
+            self._save_index()
+        logger.info(f"已保存上传图片: {writer.filename} -> {name} ({writer.size} 字节)")
+        return dict(result, stored=name, status='stored')
+
+    def receive_multipart(self, stream, boundary, chunk_size=CHUNK_SIZE):
+        """
+        从 multipart/form-data 请求体流中逐块接收所有文件 (不会把整个文件读入内存)，返回每个文件的结果 (顺序同请求)。
+        非文件字段被忽略；扩展名不支持或超过 max_file_size 的文件被拒绝。
+        """
+        self.refresh()
+        decoder = MultipartDecoder(boundary.encode('latin-1'), max_form_memory_size=1024 * 1024)
+        results = []
+        writer = None
+        skipping = None
+        try:
+            while True:
+                chunk = stream.read(chunk_size)
+                decoder.receive_data(chunk or None)
+                event = decoder.next_event()
+                while not isinstance(event, (NeedData, Epilogue)):
+                    if isinstance(event, File):
+                        writer, skipping = self._start_file(event.filename)
+                    elif isinstance(event, Data):
+                        if writer is not None:
+                            writer.write(event.data)
+                            if writer.size > self.max_file_size:
+                                writer.discard()
+                                writer, skipping = None, {'filename': writer.filename, 'stored': None,
+                                                          'status': 'rejected', 'reason': '文件过大'}
+                        if not event.more_data:
+                            if writer is not None:
+                                results.append(self.commit(writer))
+                            elif skipping is not None:
+                                results.append(skipping)
+                            writer = skipping = None
+                    event = decoder.next_event()
+                if isinstance(event, Epilogue) or not chunk:
+                    break
+        finally:
+            if writer is not None:
+                writer.discard()
+        return results
+
+    def _start_file(self, filename):
+        """开始接收一个文件，返回 (writer, None)；文件不被接受时返回 (None, 拒绝结果)"""
+        name = safe_name(filename)
+        if name is None or not name.lower().endswith(self.extensions):
+            logger.warning(f"拒绝上传文件: {filename}")
+            return None, {'filename': filename, 'stored': None, 'status': 'rejected', 'reason': '不支持的文件类型'}
+        return self.open(filename), None
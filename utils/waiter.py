@@ -0,0 +1,161 @@
+import hashlib
+import time
+from loguru import logger
+from utils.metrics import metrics
+
+
+# 各步骤的默认最长等待时间 (秒)，可通过 config.yaml 的 task.wait_max 覆盖
+DEFAULT_MAX_WAITS = {
+    'app_launch': 15,
+    'app_stopped': 3,
+    'home': 2,
+    'gallery_refresh': 3,
+    'shop_loaded': 5,
+    'gallery_loaded': 5,
+    'search_results': 10,
+    'product_detail': 5,
+    'share_panel': 5,
+    'clipboard': 2,
+    'go_back': 3,
+    'swipe': 3,
+    'wechat_home': 8,
+    'wechat_search': 3,
+    'wechat_chat': 3,
+}
+DEFAULT_MAX_WAIT = 5
+
+
+class WaitRecord:
+    """一次等待的记录"""
+
+    def __init__(self, name, elapsed, satisfied, max_wait):
+        self.name = name
+        self.elapsed = elapsed
+        self.satisfied = satisfied
+        self.max_wait = max_wait
+
+    def __repr__(self):
+        state = "满足" if self.satisfied else "超时"
+        return f"WaitRecord({self.name}, {self.elapsed:.2f}s/{self.max_wait}s, {state})"
+
+
+class Waiter:
+    """
+    基于可观察条件的等待器，用于替代固定的 time.sleep。
+    条件满足即返回，最多等待该步骤配置的最长时间，并记录每次等待的实际耗时。
+    """
+
+    def __init__(self, driver, max_waits=None, poll_interval=0.25):
+        self.driver = driver
+        self.poll_interval = poll_interval
+        self.max_waits = dict(DEFAULT_MAX_WAITS)
+        self.max_waits.update(max_waits or {})
+        self.records = []
+        self.last_page_source = None
+        # 由 ElementHelper 设置，支持定位注册表中的逻辑元素名
+        self.locate = None
+        # 每次获取到页面源码后都会调用的观察者 (如弹窗哨兵)，复用已有的快照而不额外请求设备
+        self.observers = []
+        # 正在进行的等待步骤名，观察者据此只在部分步骤中工作
+        self.step = None
+        # 回放驱动 (ReplayDriver) 提供虚拟时钟，使回放时的轮询次数与录制时一致
+        self._clock = getattr(driver, 'clock', None) or time.perf_counter
+        self._sleep = getattr(driver, 'sleep', None) or time.sleep
+
+    def max_wait_for(self, name):
+        return self.max_waits.get(name, DEFAULT_MAX_WAIT)
+
+    def until(self, name, condition, max_wait=None):
+        """
+        轮询 condition 直到其返回真值或超时。
+        返回 condition 的结果，超时返回 None。condition 抛出的异常视为条件未满足。
+        """
+        if max_wait is None:
+            max_wait = self.max_wait_for(name)
+        start = self._clock()
+        deadline = start + max_wait
+        result = None
+        previous_step, self.step = self.step, name
+        try:
+            while True:
+                try:
+                    result = condition()
+                except Exception as e:
+                    logger.debug(f"等待 {name} 时条件检查出错: {e}")
+                    result = None
+                if result or self._clock() >= deadline:
+                    break
+                self._sleep(self.poll_interval)
+        finally:
+            self.step = previous_step
+
+        record = WaitRecord(name, self._clock() - start, bool(result), max_wait)
+        self.records.append(record)
+        metrics.observe(f"wait.{name}", 'wait', record.elapsed, error=not record.satisfied)
+        if record.satisfied:
+            logger.debug(f"等待 {name} 完成，耗时 {record.elapsed:.2f}s")
+        else:
+            logger.warning(f"等待 {name} 超时 ({max_wait}s)")
+        return result or None
+
+    def page_source(self):
+        """获取页面源码并缓存，供快照和弹窗检测复用"""
+        self.last_page_source = self.driver.page_source
+        for observer in self.observers:
+            observer(self.last_page_source)
+        return self.last_page_source
+
+    def for_element(self, name, locator, max_wait=None):
+        """等待目标元素出现，返回元素或 None"""
+        def present():
+            if self.locate is not None:
+                return self.locate(locator)
+            elements = self.driver.find_elements(*locator)
+            return elements[0] if elements else None
+        return self.until(name, present, max_wait)
+
+    def for_page_stable(self, name, max_wait=None, stable_polls=2):
+        """等待页面源码的哈希连续 stable_polls 次保持不变 (即界面不再变化)"""
+        state = {'hash': None, 'count': 0}
+
+        def stable():
+            digest = hashlib.md5(self.page_source().encode('utf-8')).hexdigest()
+            if digest == state['hash']:
+                state['count'] += 1
+            else:
+                state['hash'] = digest
+                state['count'] = 1
+            return state['count'] >= stable_polls
+        return self.until(name, stable, max_wait)
+
+    def for_ui_idle(self, name, max_wait=None):
+        """
+        等待界面空闲。
+        UiAutomator2 在返回页面源码前会等待无障碍事件流空闲 (waitForIdleTimeout)，
+        因此空闲即表现为连续两次获取到相同的页面源码。
+        """
+        return self.for_page_stable(name, max_wait)
+
+    def for_clipboard_change(self, name, previous, max_wait=None):
+        """等待设备剪贴板内容不同于 previous，返回新的剪贴板内容或 None"""
+        def changed():
+            text = self.driver.get_clipboard_text()
+            return text if text and text != previous else None
+        return self.until(name, changed, max_wait)
+
+    def summary(self):
+        """按步骤汇总等待耗时: {name: {'count', 'total', 'max', 'timeouts'}}"""
+        result = {}
+        for record in self.records:
+            item = result.setdefault(record.name, {'count': 0, 'total': 0.0, 'max': 0.0, 'timeouts': 0})
+            item['count'] += 1
+            item['total'] += record.elapsed
+            item['max'] = max(item['max'], record.elapsed)
+            if not record.satisfied:
+                item['timeouts'] += 1
+        return result
+
+    def log_summary(self):
+        for name, item in self.summary().items():
+            logger.info(f"等待统计 {name}: {item['count']} 次, 共 {item['total']:.2f}s, "
+                        f"最长 {item['max']:.2f}s, 超时 {item['timeouts']} 次")
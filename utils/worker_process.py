@@ -0,0 +1,306 @@
+import argparse
+import json
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import time
+from loguru import logger
+
+from utils.backends import load_target
+from utils.metrics import metrics
+
+# 项目根目录，工作进程从这里导入任务函数
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class JobCancelled(Exception):
+    """任务在运行中被取消 (工作进程已被终止)"""
+
+
+class WorkerError(Exception):
+    """工作进程中的任务失败: 任务函数抛出异常、超时、超出内存上限或工作进程异常退出"""
+
+
+def process_group_rss(pgid):
+    """
+    进程组 (工作进程以及它启动的浏览器、驱动等子进程) 的常驻内存总和，字节。
+    通过 /proc 读取，没有 /proc 的系统 (如 Windows) 返回 None。
+    """
+    if not os.path.isdir('/proc'):
+        return None
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    total = 0
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'rb') as f:
+                stat = f.read()
+            # 进程名可能含空格，从最后一个 ')' 之后开始解析: 第 5 列是进程组，第 24 列是常驻内存页数
+            fields = stat[stat.rindex(b')') + 2:].split()
+            if int(fields[2]) == pgid:
+                total += int(fields[21]) * page_size
+        except (OSError, ValueError, IndexError):
+            continue
+    return total
+
+
+class WorkerProcess:
+    """
+    在独立进程中执行任务函数的工作进程 (由 JobManager 的一个工作线程独占)。
+    子进程运行 `python -m utils.worker_process`，通过 stdin/stdout 上的 JSON 行通信:
+    父进程发送 run/exit，子进程回传 progress 和 result (含该任务期间的 metrics 统计)。
+    子进程在第一次运行任务时启动，之后保持运行以复用已导入的模块和会话；
+    任务超时 (timeout 秒)、进程组内存超过 max_memory_mb 或任务被取消时终止整个进程组 (包括浏览器等子进程)，
+    运行了 max_jobs 个任务或任务结束后内存超过上限时重启 (回收)。
+    """
+
+    def __init__(self, target, name='worker', timeout=None, max_memory_mb=None, max_jobs=None, initializer=None,
+                 check_interval=1.0):
+        self.target = target
+        self.name = name
+        self.timeout = timeout
+        self.max_memory = max_memory_mb * 1024 * 1024 if max_memory_mb else None
+        self.max_jobs = max_jobs
+        self.initializer = initializer
+        self.check_interval = check_interval
+        self.jobs_run = 0
+        self.restarts = 0
+        self._process = None
+        self._messages = None
+        self._job_id = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+
+    @property
+    def pid(self):
+        return self._process.pid if self._process is not None else None
+
+    @property
+    def alive(self):
+        return self._process is not None and self._process.poll() is None
+
+    def _start(self):
+        env = dict(os.environ, PYTHONIOENCODING='utf-8')
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+        args = [sys.executable, '-m', 'utils.worker_process'] + (['--init', self.initializer] if self.initializer else [])
+        # 单独的进程组/会话: 终止时连同浏览器、驱动等子进程一起结束
+        if os.name == 'posix':
+            group = {'start_new_session': True}
+        else:
+            group = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+        self._process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env,
+                                         text=True, encoding='utf-8', bufsize=1, **group)
+        self._messages = queue.Queue()
+        threading.Thread(target=self._read, args=(self._process, self._messages),
+                         name=f"{self.name}-reader", daemon=True).start()
+        self.jobs_run = 0
+        logger.info(f"工作进程 {self.name} 已启动 (pid {self._process.pid})")
+
+    @staticmethod
+    def _read(process, messages):
+        for line in process.stdout:
+            try:
+                messages.put(json.loads(line))
+            except ValueError:
+                logger.warning(f"工作进程输出无法解析: {line.rstrip()}")
+        messages.put({'op': 'exit'})
+
+    def assign(self, job_id):
+        """登记将要在本工作进程中运行的任务 (在 run 之前)，此后即可取消它"""
+        with self._lock:
+            self._job_id = job_id
+            self._cancelled = False
+
+    def run(self, job):
+        """在工作进程中执行任务，返回任务函数的返回值；任务出错时抛出 WorkerError，被取消时抛出 JobCancelled"""
+        with self._lock:
+            if self._job_id != job.id:
+                self._job_id, self._cancelled = job.id, False
+            if self._cancelled:
+                # 登记后、开始运行前已被取消
+                self._job_id = None
+                raise JobCancelled('任务已取消')
+            if not self.alive:
+                if self._process is not None:
+                    self.restarts += 1
+                self._start()
+            messages = self._messages
+        try:
+            self._send({'op': 'run', 'target': self.target,
+                        'job': {'id': job.id, 'type': job.type, 'params': job.params, 'progress': job.progress}})
+            result = self._wait(job, messages)
+        finally:
+            with self._lock:
+                self._job_id = None
+        self.jobs_run += 1
+        metrics.merge(result.get('metrics') or [])
+        if self.max_jobs and self.jobs_run >= self.max_jobs:
+            logger.info(f"工作进程 {self.name} 已运行 {self.jobs_run} 个任务，重启")
+            self.stop()
+        elif self._over_memory():
+            logger.warning(f"工作进程 {self.name} 任务结束后内存仍超过上限，重启")
+            self.stop()
+        if result.get('error'):
+            raise WorkerError(result['error'])
+        return result.get('results')
+
+    def _wait(self, job, messages):
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        while True:
+            try:
+                message = messages.get(timeout=self.check_interval)
+            except queue.Empty:
+                message = None
+            if message is not None:
+                if message['op'] == 'progress':
+                    job.set_progress(**message['progress'])
+                elif message['op'] == 'result':
+                    return message
+                elif message['op'] == 'cancel' and message['job_id'] == job.id:
+                    self._kill()
+                    raise JobCancelled('任务已取消')
+                elif message['op'] == 'exit':
+                    # 同时结束它留下的子进程
+                    self._kill()
+                    code = self._process.returncode
+                    raise WorkerError(f"工作进程异常退出 (退出码 {code})")
+                continue
+            if deadline is not None and time.monotonic() > deadline:
+                self._kill()
+                raise WorkerError(f"任务超时 ({self.timeout} 秒)，已终止工作进程")
+            if self._over_memory():
+                self._kill()
+                raise WorkerError(f"工作进程内存超过上限 ({self.max_memory // (1024 * 1024)} MB)，已终止")
+
+    def _over_memory(self):
+        if self.max_memory is None or not self.alive:
+            return False
+        rss = process_group_rss(self._process.pid)
+        return rss is not None and rss > self.max_memory
+
+    def _send(self, message):
+        try:
+            self._process.stdin.write(json.dumps(message, ensure_ascii=False) + '\n')
+            self._process.stdin.flush()
+        except (OSError, ValueError) as e:
+            # 子进程已退出，读取线程会放入 exit 消息
+            logger.error(f"无法向工作进程 {self.name} 发送消息: {e}")
+
+    def cancel(self, job_id):
+        """取消正在运行的任务，返回是否找到该任务"""
+        with self._lock:
+            if self._job_id != job_id:
+                return False
+            self._cancelled = True
+            if self._messages is not None:
+                self._messages.put({'op': 'cancel', 'job_id': job_id})
+            return True
+
+    def _kill(self):
+        process = self._process
+        if process is None:
+            return
+        logger.warning(f"终止工作进程 {self.name} (pid {process.pid})")
+        try:
+            if os.name == 'posix':
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                subprocess.run(['taskkill', '/F', '/T', '/PID', str(process.pid)], capture_output=True)
+        except OSError:
+            pass
+        process.wait()
+
+    def stop(self, timeout=10):
+        """让空闲的工作进程退出，超时未退出时终止"""
+        process = self._process
+        if process is None or process.poll() is not None:
+            return
+        self._send({'op': 'exit'})
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self._kill()
+            return
+        if os.name == 'posix':
+            # 清理工作进程留下的子进程 (如未关闭的浏览器驱动)
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+
+class RemoteJob:
+    """工作进程中传给任务函数的 Job: 进度更新发回父进程"""
+
+    def __init__(self, data, send):
+        self.id = data['id']
+        self.type = data['type']
+        self.params = data['params'] or {}
+        self.progress = dict(data.get('progress') or {})
+        self._send = send
+        self._lock = threading.Lock()
+
+    def set_progress(self, **progress):
+        with self._lock:
+            self.progress.update(progress)
+        self._send({'op': 'progress', 'progress': progress})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='后台任务的工作进程 (由 WorkerProcess 启动)')
+    parser.add_argument('--init', help="启动时调用的初始化函数 ('模块:函数名')")
+    args = parser.parse_args(argv)
+
+    # 通信只使用原来的 stdin/stdout；任务代码 (及其启动的子进程) 的输出改到 stderr，不会混入消息
+    commands = os.fdopen(os.dup(0), 'r', encoding='utf-8')
+    channel = os.fdopen(os.dup(1), 'w', encoding='utf-8')
+    os.dup2(os.open(os.devnull, os.O_RDONLY), 0)
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+    send_lock = threading.Lock()
+
+    def send(message):
+        line = json.dumps(message, ensure_ascii=False, default=str)
+        with send_lock:
+            channel.write(line + '\n')
+            channel.flush()
+
+    messages = queue.Queue()
+    running = threading.Event()
+
+    def read_commands():
+        for line in commands:
+            messages.put(json.loads(line))
+        # stdin 被关闭: Web 服务进程已退出，正在运行的任务 (连同浏览器等子进程) 直接终止，不再占用设备
+        if running.is_set():
+            logger.warning("Web 服务进程已退出，终止工作进程")
+            if os.name == 'posix':
+                os.killpg(0, signal.SIGKILL)
+            os._exit(1)
+        messages.put({'op': 'exit'})
+
+    threading.Thread(target=read_commands, name='commands', daemon=True).start()
+    if args.init:
+        load_target(args.init)()
+    while True:
+        message = messages.get()
+        if message['op'] == 'exit':
+            break
+        if message['op'] == 'run':
+            job = RemoteJob(message['job'], send)
+            running.set()
+            try:
+                results, error = load_target(message['target'])(job, **job.params), None
+            except Exception as e:
+                logger.exception(f"任务 {job.id} 异常: {e}")
+                results, error = None, str(e) or type(e).__name__
+            running.clear()
+            send({'op': 'result', 'results': results, 'error': error, 'metrics': metrics.export(reset=True)})
+
+
+if __name__ == '__main__':
+    main()